@@ -12,9 +12,10 @@ from qfluentwidgets import FastCalendarPicker, CompactDoubleSpinBox, ComboBox
 
 from application.interfaces.range_input_dialog import RangeInputDialog
 from application.interfaces.range_list_dialog import RangeListDialog
-from application.tools.algorithm.calc_normal_range import CalcNormalRange
+from application.tools.algorithm.calc_normal_range import CalcNormalRange, normal_range_cache
 from application.tools.algorithm.jenks_breakpoint import JenksBreakpoint
-from application.utils.threading_utils import Worker
+from application.utils.process_pool import get_process_pool
+from application.utils.threading_utils import Worker, ProcessWorker
 from application.utils.utils import get_icon, get_button_style_sheet
 from application.widgets.draggable_lines import DraggableLine
 from application.widgets.histogram_plot_widget import HistogramPlotWidget
@@ -39,7 +40,10 @@ class IntervalPartitionDialog(QDialog):
         self.cut_lines: List[DraggableLine] = []
         self.bar_item = None
         self.current_data: np.ndarray | None = None  # 最近一次载入的 y 值
+        self.current_window = None  # 最近一次载入数据的 (开始, 结束, 采样数)
         self.thread_pool = QThreadPool.globalInstance()
+        self._ai_worker = None
+        get_process_pool()  # 预热算法进程池
 
         self.setWindowTitle("划分区间")
         self.resize(1200, 650)
@@ -96,6 +100,14 @@ class IntervalPartitionDialog(QDialog):
         self.ai_partition.clicked.connect(self._on_ai_clicked)
         ctrl.addWidget(self.ai_partition)
 
+        # 正常范围估计方式（仅范围模式）
+        self.cmb_ai_mode = ComboBox(self)
+        for text, mode in (("快速", "fast"), ("精确", "full"), ("分位数", "quantile")):
+            self.cmb_ai_mode.addItem(text, userData=mode)
+        self.cmb_ai_mode.setToolTip("快速：抽样拟合高斯混合模型并热启动\n精确：全量拟合高斯混合模型\n分位数：中位数±MAD，近乎瞬时")
+        self.cmb_ai_mode.setVisible(self.type == "range")
+        ctrl.addWidget(self.cmb_ai_mode)
+
         manual = QPushButton("输入")
         manual.setIcon(get_icon("手动设置"))
         manual.setToolTip("手动选择时间范围")
@@ -174,20 +186,57 @@ class IntervalPartitionDialog(QDialog):
             QToolTip.showText(self.ai_partition.mapToGlobal(QPoint(0, 0)), "请先刷新并载入数据")
             return
 
+        if self.type == "range":
+            self._estimate_normal_range()
+            return
+
         self.ai_partition.setEnabled(False)
 
-        # Worker 异步计算 AI 断点
-        worker = Worker(self._compute_ai_breaks, self.current_data.copy(), self.type)
+        # 在算法进程池中异步计算 AI 断点
+        worker = ProcessWorker(JenksBreakpoint(), self.current_data)
         worker.signals.finished.connect(self._on_ai_finished)
         worker.signals.error.connect(self._reset_ai_btn)
+        self._ai_worker = worker
         self.thread_pool.start(worker)
 
-    def _compute_ai_breaks(self, data: np.ndarray, type_: str):
-        if type_ == "partition":
-            return JenksBreakpoint().call(data)
-        else:
+    def _estimate_normal_range(self):
+        """正常范围估计：结果按 (测点, 时间窗口, 模式) 缓存，命中时直接使用"""
+        mode = self.cmb_ai_mode.currentData()
+        # 以数据内容摘要区分同一窗口下的不同数据（如结束日期为当天时数据仍在增长）
+        fingerprint = hash(np.ascontiguousarray(self.current_data).tobytes())
+        window = (self.point_name,) + tuple(self.current_window or ()) + (fingerprint,)
+        key = window + (mode,)
+        cached = normal_range_cache.get(key)
+        if cached is not None:
+            self._on_range_estimated(cached)
+            return
 
-            return CalcNormalRange().call(data)
+        self.ai_partition.setEnabled(False)
+        worker = ProcessWorker(
+            CalcNormalRange().estimate,
+            self.current_data,
+            mode=mode,
+            warm_start=normal_range_cache.warm_start(self.point_name),
+            reference=normal_range_cache.gmm_range(window),
+        )
+        worker.signals.finished.connect(lambda result: self._on_range_estimated(result, key))
+        worker.signals.error.connect(self._reset_ai_btn)
+        self._ai_worker = worker
+        self.thread_pool.start(worker)
+
+    def _on_range_estimated(self, result: dict, key=None):
+        if key is not None:
+            normal_range_cache.put(self.point_name, key, result)
+        agreement = result.get("agreement")
+        if agreement:
+            other = "高斯混合模型" if result["mode"] == "quantile" else "分位数估计"
+            self.ai_partition.setToolTip(
+                f"AI智能划分\n与{other}的区间交并比: {agreement['iou']:.2f}，"
+                f"覆盖率差异: {agreement['coverage_diff']:.2%}"
+            )
+        else:
+            self.ai_partition.setToolTip("AI智能划分")
+        self._on_ai_finished(result["range"])
 
     def _on_ai_finished(self, breaks):
         self._reset_ai_btn()
@@ -198,6 +247,7 @@ class IntervalPartitionDialog(QDialog):
 
     def _reset_ai_btn(self, *args):
         # *args absorbs possible error tuple
+        self._ai_worker = None
         self.ai_partition.setEnabled(True)
 
     def update_histogram_async(self):
@@ -207,7 +257,9 @@ class IntervalPartitionDialog(QDialog):
         end = self.end_dt.getDate().toPyDate()
         sample = self.cmb_sample.currentData()
         worker = Worker(self.dfs, self.point_name, start, end, sample, policy="update")
-        worker.signals.finished.connect(self._on_data_fetched)
+        worker.signals.finished.connect(
+            lambda data: self._on_data_fetched(data, (start.isoformat(), end.isoformat(), sample))
+        )
         worker.signals.error.connect(self._reset_apply_btn)
         self.thread_pool.start(worker)
 
@@ -215,18 +267,20 @@ class IntervalPartitionDialog(QDialog):
         self.btn_apply.setEnabled(True)
         self.btn_apply.setIcon(get_icon("change"))
 
-    def _on_data_fetched(self, data):
+    def _on_data_fetched(self, data, window=None):
         if self.bar_item:
             self.plot.removeItem(self.bar_item)
 
         ts, ys = data.get(self.point_name, (None, None))
         if ys is None or len(ys) == 0:
             self.current_data = None
+            self.current_window = None
             self._reset_apply_btn()
             return
 
         arr = np.asarray(ys)
         self.current_data = arr
+        self.current_window = window
 
         w = self.spin_bin.value()
         mn, mx = arr.min(), arr.max()
@@ -332,3 +386,9 @@ class IntervalPartitionDialog(QDialog):
         if self.btn_partition.isChecked():
             self.btn_partition.setChecked(False)
         super().accept()
+
+    def done(self, result):
+        # 关闭对话框时取消仍在计算的推荐任务
+        if self._ai_worker is not None:
+            self._ai_worker.cancel()
+        super().done(result)
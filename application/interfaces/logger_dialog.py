@@ -1,18 +1,28 @@
 from collections import deque
 from PyQt5.QtGui import QTextCharFormat, QColor, QTextCursor
-from PyQt5.QtCore import QObject, pyqtSignal, Qt
+from PyQt5.QtCore import QObject, QTimer
 import logging
 
 
 class QTextEditLogger(QObject):
-    """线程安全的日志记录器，专为Qt应用设计（无空白行版）"""
+    """线程安全的日志记录器，专为Qt应用设计（批量刷新版）
 
-    log_signal = pyqtSignal(str, str)  # (level, message)
+    write 可被任意线程调用，只把日志行追加到无锁队列（deque 的 append/popleft 为原子操作）；
+    主线程定时器每 flush_interval 毫秒取出全部待显示行，作为一次文档编辑写入，
+    并按整块删除超出 max_lines 的旧行。单次待刷新行数超过 pressure_threshold 时，
+    丢弃 DEBUG 日志并以一行汇总提示被抑制的条数。待刷新队列最多保留 2 * max_lines 行，
+    溢出的旧行计入抑制条数；文本控件销毁后自动停止刷新并丢弃待刷新行。
+    """
 
-    def __init__(self, text_edit, max_lines=1000):
+    def __init__(self, text_edit, max_lines=1000, flush_interval=100, pressure_threshold=500):
         super().__init__()
         self.text_edit = text_edit
+        self.max_lines = max_lines
+        self.pressure_threshold = pressure_threshold
         self.buffer = deque(maxlen=max_lines)
+        self._pending = deque(maxlen=2 * max_lines)  # 待刷新到界面的 (level, text)，有界
+        self._overflow = 0  # 待刷新队列溢出而被挤掉的行数（近似值，仅用于提示）
+        self.suppressed_count = 0  # 累计被抑制（未显示）的日志行数
         self.is_scrolling = True  # 跟踪用户是否手动滚动
 
         # 级别对应颜色
@@ -23,9 +33,22 @@ class QTextEditLogger(QObject):
             "ERROR": QColor("#FF4500"),
             "CRITICAL": QColor("#FF1493"),
         }
-
-        # 连接信号到安全处理槽
-        self.log_signal.connect(self._safe_append_line, Qt.QueuedConnection)
+        # 预先生成各级别字符格式，刷新时直接复用
+        self._formats = {}
+        for lvl, color in self.colors.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(color)
+            self._formats[lvl] = fmt
+        self._default_format = QTextCharFormat()
+        self._default_format.setForeground(QColor("#FFFFFF"))
+        self._summary_format = QTextCharFormat()
+        self._summary_format.setForeground(QColor("#808080"))
+
+        # 主线程定时批量刷新
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self._flush_pending)
+        self._flush_timer.start()
 
         # 连接滚动条信号
         self.text_edit.verticalScrollBar().valueChanged.connect(self._on_scroll_value_changed)
@@ -46,88 +69,83 @@ class QTextEditLogger(QObject):
         # 缓存到内存
         self.buffer.append((level, text))
 
-        # 通过信号安全传递到主线程
-        self.log_signal.emit(level, text)
+        # 放入待刷新队列，由主线程定时器批量写入；队列满时最旧的一行被挤掉
+        if self.text_edit is None:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self._overflow += 1
+        self._pending.append((level, text))
 
     def _on_scroll_value_changed(self, value):
         """当用户滚动时更新状态"""
         max_value = self.text_edit.verticalScrollBar().maximum()
         self.is_scrolling = (value >= max_value - 2)
 
-    def _safe_text_cursor(self) -> QTextCursor:
-        """安全获取文本游标"""
-        if not self._is_widget_valid():
-            return None
-        try:
-            return self.text_edit.textCursor()
-        except RuntimeError:
-            return None
-
-    def _safe_append_line(self, level: str, line: str):
-        """主线程执行的日志追加（正确处理换行和空白）"""
-        # 1. 检查UI对象是否有效
+    def _take_pending(self):
+        """取出当前全部待刷新行，压力过大时抑制 DEBUG 并截断到 max_lines"""
+        batch = []
+        for _ in range(len(self._pending)):
+            batch.append(self._pending.popleft())
+
+        suppressed, self._overflow = self._overflow, 0
+        if len(batch) > self.pressure_threshold:
+            kept = [item for item in batch if item[0] != "DEBUG"]
+            suppressed += len(batch) - len(kept)
+            batch = kept
+        if len(batch) > self.max_lines:
+            # 超出部分写入后也会被裁掉，直接跳过
+            suppressed += len(batch) - self.max_lines
+            batch = batch[-self.max_lines:]
+        return batch, suppressed
+
+    def _flush_pending(self):
+        """主线程执行：把一批日志作为一次文档编辑写入"""
         if not self._is_widget_valid():
+            # 控件已销毁：停止定时器并丢弃待刷新行，避免队列继续堆积
+            self.close()
+            return
+        if not self._pending:
             return
 
-        # 2. 检查日志级别有效性
-        color = self.colors.get(level, QColor("#FFFFFF"))
-
-        # 3. 创建格式化对象
-        fmt = QTextCharFormat()
-        fmt.setForeground(color)
-
-        # 4. 安全获取文档
+        batch, suppressed = self._take_pending()
         doc = self.text_edit.document()
         if not doc:
             return
 
-        # 5. 直接操作文档
         cursor = QTextCursor(doc)
+        cursor.beginEditBlock()
         cursor.movePosition(QTextCursor.End)
+        # 每行前插入换行符，避免文档末尾残留空行
+        separator = "" if doc.isEmpty() else "\n"
+        if suppressed:
+            self.suppressed_count += suppressed
+            cursor.insertText(
+                f"{separator}... 日志过多，已抑制 {suppressed} 条（累计 {self.suppressed_count} 条）",
+                self._summary_format
+            )
+            separator = "\n"
+        for level, line in batch:
+            cursor.insertText(separator + line, self._formats.get(level, self._default_format))
+            separator = "\n"
+
+        # 按整块删除超出上限的旧行
+        excess = doc.blockCount() - self.max_lines
+        if excess > 0:
+            cursor.movePosition(QTextCursor.Start)
+            cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, excess)
+            cursor.removeSelectedText()
+        cursor.endEditBlock()
 
-        # 关键修复：总是添加换行符（确保每条日志独占一行）
-        # 注意：QPlainTextEdit需要显式换行符才能分行显示
-        cursor.insertText(line + "\n", fmt)
-
-        # 6. 清理底部空白（关键：在滚动前清理）
-        self._clean_trailing_empty_lines()
-
-        # 7. 滚动到底部（使用更可靠的方法）
         self._safe_scroll_to_bottom()
 
-    def _clean_trailing_empty_lines(self):
-        """清理文档末尾的额外空白行（只清理QPlainTextEdit自动添加的）"""
+    def _safe_text_cursor(self) -> QTextCursor:
+        """安全获取文本游标"""
         if not self._is_widget_valid():
-            return
-
-        doc = self.text_edit.document()
-        if not doc or doc.blockCount() <= 1:
-            return
-
-        # 保存当前滚动位置
-        scroll_pos = self.text_edit.verticalScrollBar().value()
-        max_scroll = self.text_edit.verticalScrollBar().maximum()
-
-        # 如果当前在底部附近，标记为自动滚动
-        at_bottom = (scroll_pos >= max_scroll - 2)
-
-        cursor = QTextCursor(doc)
-        cursor.movePosition(QTextCursor.End)
-
-        # 检查最后一行是否为空（由QPlainTextEdit自动添加的）
-        last_block = doc.lastBlock()
-        if last_block.text().endswith("\n\n"):
-            # 移除空行
-            cursor.setPosition(last_block.position())
-            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
-            cursor.removeSelectedText()
-            cursor.deleteChar()  # 删除段落结束符
-
-        # 恢复滚动位置（如果之前在底部）
-        if at_bottom:
-            self.text_edit.verticalScrollBar().setValue(
-                self.text_edit.verticalScrollBar().maximum()
-            )
+            return None
+        try:
+            return self.text_edit.textCursor()
+        except RuntimeError:
+            return None
 
     def _safe_scroll_to_bottom(self):
         """安全滚动到底部（确保保留正常换行）"""
@@ -179,10 +197,12 @@ class QTextEditLogger(QObject):
 
     def close(self):
         """安全关闭（清理资源）"""
+        self._flush_timer.stop()
         try:
-            self.log_signal.disconnect()
             self.text_edit.verticalScrollBar().valueChanged.disconnect(self._on_scroll_value_changed)
         except:
             pass
         self.text_edit = None
-        self.buffer.clear()
\ No newline at end of file
+        self.buffer.clear()
+        self._pending.clear()
+        self._overflow = 0
\ No newline at end of file
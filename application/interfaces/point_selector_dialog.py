@@ -4,7 +4,7 @@ import pyqtgraph as pg
 from PyQt5.QtCore import Qt, QThreadPool, QPropertyAnimation, QEasingCurve, QDate, QTimer
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableView,
     QHeaderView, QAbstractItemView, QListWidget, QWidget, QSplitter
 )
 from qfluentwidgets import (
@@ -12,8 +12,13 @@ from qfluentwidgets import (
     InfoBarPosition, FastCalendarPicker, FluentIcon as FIF
 )
 
+from application.utils.compact_series import CompactSeries, series_size
+from application.utils.point_catalog import get_point_catalog
+from application.utils.point_index import get_point_index
+from application.utils.point_search_service import get_point_search_service
 from application.utils.threading_utils import Worker
-from application.utils.utils import load_point_cache, save_point_cache, get_icon
+from application.utils.utils import get_icon
+from application.widgets.point_table_model import PointTableModel
 from application.widgets.trend_plot_widget import TrendPlotWidget
 
 
@@ -32,10 +37,14 @@ class PointSelectorDialog(QDialog):
         self.selected_point = None
         self.selected_point_description = ""
 
-        # ✅ 加载本地缓存
-        self.raw_points = load_point_cache() or {}
-        self.remote_cache = {}
-        self.current_view = []
+        # ✅ 本地测点目录（进程内共享）
+        self.catalog = get_point_catalog()
+        self.point_index = get_point_index()
+        # 界面构建完成后在后台预建搜索索引，首次搜索无需等待
+        QTimer.singleShot(0, lambda: self.thread_pool.start(Worker(self.point_index.build)))
+        self.search_service = get_point_search_service()
+        self.remote_cache = {}  # 远程搜索结果，用于查找测点描述
+        self._remote_keyword = None  # 表格当前显示的远程搜索关键词
 
         # 防抖
         self.fetch_debounce_timer = QTimer()
@@ -77,6 +86,11 @@ class PointSelectorDialog(QDialog):
         self.search_input.setPlaceholderText("输入关键词搜索测点...")
         self.search_input.searchSignal.connect(self.on_search)
         self.search_input.clearSignal.connect(self.on_search_clear)
+        # 本地搜索时边输入边搜索（防抖）
+        self.search_input.textChanged.connect(lambda _: self.local_search_timer.start(200))
+        self.local_search_timer = QTimer(self)
+        self.local_search_timer.setSingleShot(True)
+        self.local_search_timer.timeout.connect(self._on_search_text_idle)
 
         top_layout.addWidget(QLabel("搜索类型:"))
         top_layout.addWidget(self.cmb_search_type)
@@ -156,20 +170,25 @@ class PointSelectorDialog(QDialog):
         right_layout.addLayout(manual_layout)
 
         # 表格
-        self.table = QTableWidget()
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        # 虚拟化表格：只渲染可见行，未点击表头排序时保持数据原有顺序（搜索结果按相关度）
+        self.table_model = PointTableModel(self.catalog, self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.table.setSortingEnabled(True)
-        self.table.cellClicked.connect(self._on_table_clicked)
-        self.table.cellDoubleClicked.connect(self._on_table_double_clicked)
+        self.table.clicked.connect(lambda index: self._on_table_clicked(index.row(), index.column()))
+        self.table.doubleClicked.connect(lambda index: self._on_table_double_clicked(index.row(), index.column()))
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalScrollBar().valueChanged.connect(self._on_table_scrolled)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: white;
                 border: 1px solid #ccc;
                 gridline-color: #eee;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #0078d7;
                 color: white;
             }
@@ -274,46 +293,68 @@ class PointSelectorDialog(QDialog):
     def start_fetching(self, fetchers, current_text: str):
         current_text = current_text.strip().split("\n")[0]
         self.manual_input.setText(current_text)
-        self.pending_fetch_params = (fetchers, current_text)
+        if current_text:
+            # 关键词搜索交给搜索服务（防抖、取消过期请求、缓存、分页）
+            self.search_service.search(self, fetchers, current_text, self._on_remote_results, self._on_remote_error)
+            return
+        self.pending_fetch_params = fetchers
         self.fetch_debounce_timer.start(300)
 
     def _execute_pending_fetch(self):
         if not self.pending_fetch_params:
             return
-        fetchers, current_text = self.pending_fetch_params
-        is_search = bool(current_text)
-        worker = Worker(fetchers, **({"search_text": current_text} if is_search else {}))
-        worker.signals.finished.connect(
-            lambda results: self._on_fetch_complete(results, is_search, current_text)
-        )
+        worker = Worker(self.pending_fetch_params)
+        worker.signals.finished.connect(self._on_fetch_complete)
         self.thread_pool.start(worker)
         self.pending_fetch_params = None
 
-    def _on_fetch_complete(self, results, is_search: bool, keyword: str):
-        if is_search:
-            flat_results = [item for sublist in results.values() for item in sublist]
-            self.remote_cache[keyword] = flat_results
-            self.current_view = flat_results
-            self.refresh_table(flat_results)
+    def _on_fetch_complete(self, results):
+        # 测点搜索器（同步）与摄像头搜索器都已在工作线程中将结果写入测点目录，这里只从目录刷新视图
+        self.catalog.refresh()
+        self.populate_type_list()
+        if self.type_list.count() > 0:
+            self.type_list.setCurrentRow(0)
+            self.on_type_selected(self.type_list.item(0))
+
+    def _on_remote_results(self, keyword: str, results: dict, complete: bool):
+        flat_results = [item for sublist in results.values() for item in sublist]
+        shown = self.remote_cache.get(keyword)
+        self.remote_cache[keyword] = flat_results
+        if (
+                self._remote_keyword == keyword and shown
+                and len(flat_results) > len(shown) and all(a is b for a, b in zip(shown, flat_results))
+        ):
+            # 下一页：只在末尾追加，保持滚动位置
+            self.table_model.extend_items([("", p) for p in flat_results[len(shown):]])
         else:
-            self.raw_points.update(results)
-            save_point_cache(results)
-            self.populate_type_list()
-            if self.type_list.count() > 0:
-                self.type_list.setCurrentRow(0)
-                self.on_type_selected(self.type_list.item(0))
+            self.refresh_table(flat_results)
+        self._remote_keyword = keyword
+
+    def _on_remote_error(self, message: str):
+        InfoBar.error(
+            title="搜索失败",
+            content=message.strip().splitlines()[-1] if message.strip() else "",
+            parent=self,
+            position=InfoBarPosition.TOP,
+            duration=3000
+        )
+
+    def _on_table_scrolled(self, value):
+        # 远程搜索结果滚动到底部时加载下一页
+        if value == self.table.verticalScrollBar().maximum() and self.search_service.has_more(self):
+            self.search_service.fetch_more(self)
 
     def populate_type_list(self):
         self.type_list.clear()
-        for t in sorted(self.raw_points.keys()):
+        for t in self.catalog.types():
             self.type_list.addItem(t)
 
     def on_type_selected(self, item):
         if not item:
             return
-        data = self.raw_points.get(item.text(), [])
-        self.current_view = data
-        self.refresh_table(data)
+        self.search_service.cancel(self)
+        self._remote_keyword = None
+        self.table_model.set_rows(self.catalog.rows(item.text()))
 
     def on_search_type_changed(self, index):
         self.search_input.searchSignal.disconnect()
@@ -336,32 +377,21 @@ class PointSelectorDialog(QDialog):
         if item:
             self.on_type_selected(item)
 
+    def _on_search_text_idle(self):
+        if self.cmb_search_type.currentIndex() == 0:
+            self.filter_table_offline()
+
     def filter_table_offline(self):
-        kw = self.search_input.text().strip().lower()
+        kw = self.search_input.text().strip()
         if not kw:
             self.on_search_clear()
             return
-        filtered = [
-            p for pts in self.raw_points.values() for p in pts
-            if any(kw in str(v).lower() for v in p.values())
-        ]
-        self.current_view = filtered
-        self.refresh_table(filtered)
+        self.search_service.cancel(self)
+        self._remote_keyword = None
+        self.table_model.set_rows(self.point_index.search(kw))
 
     def refresh_table(self, data_list):
-        self.table.clearContents()
-        self.table.setRowCount(0)
-        if not data_list:
-            return
-        headers = list(data_list[0].keys())
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
-        for p in data_list:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            for col, h in enumerate(headers):
-                self.table.setItem(row, col, QTableWidgetItem(str(p.get(h, ""))))
-        self.table.setSortingEnabled(True)
+        self.table_model.set_items([("", p) for p in data_list or []])
 
     def _on_table_clicked(self, row, col):
         name = self.get_point_name_from_row(row)
@@ -378,14 +408,13 @@ class PointSelectorDialog(QDialog):
             self.accept()
 
     def get_point_name_from_row(self, row):
-        for col in range(self.table.columnCount()):
-            if self.table.horizontalHeaderItem(col).text() == "测点名":
-                item = self.table.item(row, col)
-                return item.text() if item else ""
-        return self.table.item(row, 0).text() if self.table.item(row, 0) else ""
+        return self.table_model.name(row)
 
     def get_description_for_point(self, name):
-        for pts in list(self.raw_points.values()) + list(self.remote_cache.values()):
+        pt = self.catalog.find(name)
+        if pt is not None:
+            return " | ".join(str(v) for v in pt.values())
+        for pts in self.remote_cache.values():
             for pt in pts:
                 if name in pt.values():
                     return " | ".join(str(v) for v in pt.values())
@@ -462,23 +491,29 @@ class PointSelectorDialog(QDialog):
 
     def _on_data_fetched(self, data):
         self.trend_plot.clear()
-        ts, ys = data.get(self.selected_point, (None, None))
-        if ts is None or len(ts) == 0:
+        series = data.get(self.selected_point, (None, None))
+        if series_size(series) == 0:
             self.clear_stats()
             self.btn_apply_trend.setEnabled(True)
             self.btn_apply_trend.setIcon(get_icon("change"))
             return
 
         self.trend_plot.plot_multiple(data)
-        self.update_stats(ys)
+        self.update_stats(series)
         self.btn_apply_trend.setEnabled(True)
         self.btn_apply_trend.setIcon(get_icon("change"))
 
-    def update_stats(self, data):
-        mean_val = np.mean(data)
-        max_val = np.max(data)
-        min_val = np.min(data)
-        std_val = np.std(data)
+    def update_stats(self, series):
+        if isinstance(series, CompactSeries):
+            # 紧凑存储直接按游程计算，不展开
+            stats = series.stats() or dict.fromkeys(("mean", "max", "min", "std"), np.nan)
+            mean_val, max_val, min_val, std_val = stats["mean"], stats["max"], stats["min"], stats["std"]
+        else:
+            data = series[1]
+            mean_val = np.mean(data)
+            max_val = np.max(data)
+            min_val = np.min(data)
+            std_val = np.std(data)
         self.mean_label.setText(f"平均值: {mean_val:.2f}")
         self.max_label.setText(f"最大值: {max_val:.2f}")
         self.min_label.setText(f"最小值: {min_val:.2f}")
@@ -1,18 +1,20 @@
 import time
-from datetime import datetime
 
 from PyQt5.QtCore import Qt, QTimer, QThreadPool
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (QTableWidget, QTableWidgetItem, QHeaderView,
                              QVBoxLayout, QHBoxLayout, QWidget,
                              QSizePolicy, QLabel)
 from loguru import logger
 from qfluentwidgets import (FluentIcon as FIF,
                             PushButton,
-                            InfoBar, InfoBarPosition, TogglePushButton, SwitchButton, ComboBox, TableWidget)
+                            InfoBar, InfoBarPosition, TogglePushButton, SwitchButton, ComboBox, TableWidget,
+                            TableView)
 
 from application.tools.api_service.servicves_test import ServicesTest
+from application.utils.monitor_store import MonitorRecordStore, RECORD_RETENTION_DAYS
 from application.utils.threading_utils import Worker
+from application.widgets.monitor_record_model import MonitorRecordTableModel
 
 
 class ServiceStatusMonitor(QWidget):
@@ -37,13 +39,16 @@ class ServiceStatusMonitor(QWidget):
         self.monitoring_services = {}  # 存储监控服务信息
         self.monitoring_timer = QTimer(self)
         self.thread_pool = QThreadPool.globalInstance()
-        self.monitoring_records = []  # 存储监控记录
+        self.record_store = MonitorRecordStore()  # 监控记录持久化存储
         self.current_service_filter = None  # 当前服务过滤器
         self.current_record_btn = None  # 当前选中的记录按钮
         self.last_selected_service_id = None  # 保存上次选中的服务ID
         self.loading_services = False  # 标记是否正在加载服务
-        self.record_limit = 1000  # 默认记录保留数量
+        self.record_limit = 1000  # 默认记录显示数量，None 表示全部
+        self.stats_window = 24 * 3600  # 统计窗口（秒），None 表示全部
+        self._stats_generation = 0  # 统计查询序号，丢弃过期的后台查询结果
         self.log_panel_visible = False  # 标记日志面板是否可见
+        self.retention_days = RECORD_RETENTION_DAYS  # 监控记录保留天数，None 表示不清理
 
         # 初始化UI
         self.init_ui()
@@ -52,9 +57,26 @@ class ServiceStatusMonitor(QWidget):
         self.monitoring_timer.timeout.connect(self.check_all_services)
         self.monitoring_timer.setInterval(10000)  # 10秒
 
+        # 过期记录清理：启动时执行一次，之后每天一次
+        self.prune_timer = QTimer(self)
+        self.prune_timer.timeout.connect(self.prune_records)
+        self.prune_timer.start(24 * 3600 * 1000)
+        self.prune_records()
+
         # 自动加载服务列表
         self.load_services()
 
+    def prune_records(self):
+        """在后台线程中删除超过保留天数的监控记录"""
+        if not self.retention_days:
+            return
+        worker = Worker(self.record_store.prune, time.time() - self.retention_days * 24 * 3600)
+        worker.signals.finished.connect(
+            lambda count: count and logger.info(f"已清理 {count} 条超过 {self.retention_days} 天的监控记录")
+        )
+        worker.signals.error.connect(lambda e: logger.warning(f"清理监控记录失败: {e}"))
+        self.thread_pool.start(worker)
+
     def init_ui(self):
         """初始化UI界面"""
         main_layout = QVBoxLayout(self)
@@ -181,41 +203,65 @@ class ServiceStatusMonitor(QWidget):
         record_limit_layout.addWidget(QLabel("记录保留数量:"))
 
         self.record_limit_combo = ComboBox()
-        self.record_limit_combo.addItems(["1000行", "2000行", "5000行"])
+        self.record_limit_combo.addItems(["1000行", "2000行", "5000行", "全部"])
         self.record_limit_combo.setCurrentIndex(0)  # 默认1000行
         self.record_limit_combo.currentIndexChanged.connect(self.on_record_limit_changed)
         record_limit_layout.addWidget(self.record_limit_combo)
 
         record_title_layout.addLayout(record_limit_layout)
+
+        # 统计窗口下拉框
+        stats_window_layout = QHBoxLayout()
+        stats_window_layout.addWidget(QLabel("统计窗口:"))
+
+        self.stats_window_combo = ComboBox()
+        self.stats_window_combo.addItems(["近1小时", "近24小时", "近7天", "全部"])
+        self.stats_window_combo.setCurrentIndex(1)  # 默认24小时
+        self.stats_window_combo.currentIndexChanged.connect(self.on_stats_window_changed)
+        stats_window_layout.addWidget(self.stats_window_combo)
+
+        record_title_layout.addLayout(stats_window_layout)
         record_title_layout.addStretch()
 
         log_container_layout.addLayout(record_title_layout)
 
-        self.record_table = TableWidget()
-        self.record_table.setColumnCount(4)
-        self.record_table.setHorizontalHeaderLabels(["时间", "服务名称", "状态", "操作"])
+        # 当前选中服务的可用率与延迟分位数
+        self.record_stats_label = QLabel("")
+        self.record_stats_label.setFont(QFont("微软雅黑", 9))
+        self.record_stats_label.setStyleSheet("color: #555555;")
+        log_container_layout.addWidget(self.record_stats_label)
+
+        # 记录表格使用虚拟化模型，只渲染可见行
+        self.record_model = MonitorRecordTableModel(self.record_store, self.STATUS_COLORS, self)
+        self.record_table = TableView()
+        self.record_table.setModel(self.record_model)
         self.record_table.verticalHeader().setVisible(False)
         self.record_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.record_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.record_table.setAlternatingRowColors(True)
-        self.record_table.setWordWrap(True)
+        self.record_table.setWordWrap(False)
+        self.record_table.horizontalHeader().setSortIndicator(0, Qt.DescendingOrder)
         self.record_table.setSortingEnabled(True)
 
-        # 设置记录表格列宽
-        self.record_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        # 设置记录表格列宽（固定宽度，避免 ResizeToContents 遍历全部行）
+        self.record_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
         self.record_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.record_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.record_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        self.record_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Interactive)
+        self.record_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Interactive)
+        self.record_table.setColumnWidth(0, 170)
+        self.record_table.setColumnWidth(2, 110)
+        self.record_table.setColumnWidth(3, 260)
+        self.record_table.verticalHeader().setDefaultSectionSize(32)
 
         # 设置记录表格样式
         self.record_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 1px solid #e0e0e0;
                 border-radius: 6px;
                 gridline-color: #e0e0e0;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 6px;
             }
             QHeaderView::section {
@@ -262,13 +308,15 @@ class ServiceStatusMonitor(QWidget):
 
     def on_record_limit_changed(self, index):
         """记录保留数量变化处理"""
-        limits = [1000, 2000, 5000]
+        limits = [1000, 2000, 5000, None]
         self.record_limit = limits[index]
+        self.update_record_table()
 
-        # 限制现有记录数量
-        if len(self.monitoring_records) > self.record_limit:
-            self.monitoring_records = self.monitoring_records[:self.record_limit]
-            self.update_record_table()
+    def on_stats_window_changed(self, index):
+        """统计窗口变化处理"""
+        windows = [3600, 24 * 3600, 7 * 24 * 3600, None]
+        self.stats_window = windows[index]
+        self.update_record_stats()
 
     def load_services(self):
         """加载服务列表"""
@@ -582,56 +630,51 @@ class ServiceStatusMonitor(QWidget):
         if not self.log_panel_visible:
             return
 
-        self.record_table.setRowCount(0)  # 先清空
-
-        # 筛选记录
-        if self.current_service_filter:
-            filtered_records = [r for r in self.monitoring_records if r['service_name'] == self.current_service_filter]
-        else:
-            filtered_records = self.monitoring_records
-
-        # 修复记录时间顺序问题 - 确保最新记录在最上面
-        # 按时间降序排序（最新记录在最前面）
-        filtered_records.sort(key=lambda x: x['time'], reverse=True)
-
-        # 显示最近记录
-        records_to_show = filtered_records[:self.record_limit]
-
-        for record in records_to_show:
-            row = self.record_table.rowCount()
-            self.record_table.insertRow(row)
-
-            # 时间
-            time_item = QTableWidgetItem(record['time'])
-            time_item.setFlags(time_item.flags() & ~Qt.ItemIsEditable)
-            self.record_table.setItem(row, 0, time_item)
-
-            # 服务名称
-            service_item = QTableWidgetItem(record['service_name'])
-            service_item.setFlags(service_item.flags() & ~Qt.ItemIsEditable)
-            self.record_table.setItem(row, 1, service_item)
-
-            # 状态
-            status_item = QTableWidgetItem(record['status'])
-            status_item.setFlags(status_item.flags() & ~Qt.ItemIsEditable)
-            # 根据状态设置颜色
-            if record['status'] == "成功":
-                status_item.setForeground(QColor(self.STATUS_COLORS['成功']))
-            elif record['status'] in ["失败", "警告"]:
-                status_item.setForeground(QColor(self.STATUS_COLORS['失败']))
-            elif record['status'] == "未监控":
-                status_item.setForeground(QColor(self.STATUS_COLORS['未监控']))
-            self.record_table.setItem(row, 2, status_item)
-
-            # 操作 - 修复空操作问题
-            operation = record['operation'] or "未知操作"
-            operation_item = QTableWidgetItem(operation)
-            operation_item.setFlags(operation_item.flags() & ~Qt.ItemIsEditable)
-            self.record_table.setItem(row, 3, operation_item)
+        # 模型按页从存储中懒加载，这里只重置过滤条件和行数
+        self.record_model.set_filter(self.current_service_filter, self.record_limit)
+        self.update_record_stats()
 
         # 滚动到最新记录
         self.record_table.scrollToTop()
 
+    def update_record_stats(self):
+        """更新当前选中服务的可用率和延迟分位数"""
+        if not self.log_panel_visible:
+            return
+
+        sid = self.last_selected_service_id if self.current_service_filter else None
+        if sid is None:
+            self._stats_generation += 1
+            self.record_stats_label.setText("")
+            return
+
+        # 分位数聚合查询放到后台线程执行，只采用最近一次请求的结果
+        self._stats_generation += 1
+        generation = self._stats_generation
+        service_name = self.current_service_filter
+        start = time.time() - self.stats_window if self.stats_window else None
+        worker = Worker(self.record_store.service_summary, sid, start=start)
+        worker.signals.finished.connect(
+            lambda summary: self._on_record_stats(generation, service_name, summary)
+        )
+        worker.signals.error.connect(lambda e: logger.warning(f"监控统计查询失败: {e}"))
+        self.thread_pool.start(worker)
+
+    def _on_record_stats(self, generation, service_name, summary):
+        if generation != self._stats_generation or not self.log_panel_visible:
+            return  # 已有更新的查询或面板已隐藏
+        if summary.get("uptime") is None:
+            self.record_stats_label.setText(f"{service_name}: 统计窗口内暂无检查记录")
+            return
+
+        def fmt_ms(value):
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        self.record_stats_label.setText(
+            f"{service_name}: 可用率 {summary['uptime'] * 100:.2f}%  |  "
+            f"P50 {fmt_ms(summary.get('p50'))}  P95 {fmt_ms(summary.get('p95'))}  P99 {fmt_ms(summary.get('p99'))}"
+        )
+
     def on_interval_changed(self, index):
         """监控间隔下拉框变化处理"""
         combo = self.sender()
@@ -703,7 +746,9 @@ class ServiceStatusMonitor(QWidget):
         self.add_monitoring_record(
             service_name=info['service_name'],
             status="手动重启",
-            operation="执行手动重启"
+            operation="执行手动重启",
+            service_id=sid,
+            event="restart"
         )
 
         # 更新状态为"重启中..."
@@ -731,7 +776,9 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="成功",
-                operation="手动重启成功"
+                operation="手动重启成功",
+                service_id=sid,
+                event="restart"
             )
 
             # 重启后状态暂时设为检查中
@@ -752,7 +799,9 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="失败",
-                operation=f"手动重启失败: {str(error)}"
+                operation=f"手动重启失败: {str(error)}",
+                service_id=sid,
+                event="restart"
             )
 
             # 重启失败后状态仍为失败
@@ -813,13 +862,16 @@ class ServiceStatusMonitor(QWidget):
                 self.add_monitoring_record(
                     service_name=f"批量操作",
                     status="批量操作",
-                    operation=operation
+                    operation=operation,
+                    event="switch"
                 )
             else:
                 self.add_monitoring_record(
                     service_name=info['service_name'],
                     status="监控状态变更",
-                    operation=operation
+                    operation=operation,
+                    service_id=sid,
+                    event="switch"
                 )
 
         # 更新定时器
@@ -860,13 +912,16 @@ class ServiceStatusMonitor(QWidget):
                     self.add_monitoring_record(
                         service_name=f"批量操作",
                         status="批量操作",
-                        operation=operation
+                        operation=operation,
+                        event="switch"
                     )
                 else:
                     self.add_monitoring_record(
                         service_name=info['service_name'],
                         status="自动重启",
-                        operation=f"{operation}自动重启"
+                        operation=f"{operation}自动重启",
+                        service_id=sid,
+                        event="switch"
                     )
 
     def start_all_monitoring(self):
@@ -899,7 +954,8 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name="所有服务",
                 status="监控状态变更",
-                operation="开启全部监控"
+                operation="开启全部监控",
+                event="switch"
             )
             self.create_infobar("服务监控", "已开启所有服务监控")
 
@@ -933,7 +989,8 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name="所有服务",
                 status="监控状态变更",
-                operation="关闭全部监控"
+                operation="关闭全部监控",
+                event="switch"
             )
             self.create_infobar("服务监控", "已停止所有服务监控")
 
@@ -967,41 +1024,50 @@ class ServiceStatusMonitor(QWidget):
             self.thread_pool.start(worker)
 
     def check_service_status(self, sid, service_path):
-        """检查单个服务状态"""
+        """检查单个服务状态，返回 (sid, 是否健康, 耗时秒数)"""
+        start = time.perf_counter()
         try:
             # 使用空请求测试服务
             result = self.service_tester._test_single(service_path, {"data": {}})
+            latency = time.perf_counter() - start
             if ("data" in result and not result["data"]["flag"] and
                     result["data"][
                         "result"] == "模型调用异常, 原因:ConnectException: Connection refused (Connection refused)"):
-                return sid, False
+                return sid, False, latency
 
-            return sid, True  # 服务正常
+            return sid, True, latency  # 服务正常
         except Exception as e:
             logger.warning(f"服务 {sid} 状态检查失败: {str(e)}")
-            return sid, False  # 服务异常
+            return sid, False, time.perf_counter() - start  # 服务异常
 
     def handle_service_status_result(self, result):
         """处理服务状态检查结果"""
-        sid, is_healthy = result
+        sid, is_healthy, latency = result
         if sid not in self.monitoring_services:
             return
 
         info = self.monitoring_services[sid]
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # 记录监控结果
         if is_healthy:
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="成功",
-                operation="服务正常"
+                operation=f"服务正常 ({latency * 1000:.0f}ms)",
+                service_id=sid,
+                healthy=True,
+                latency=latency,
+                event="check"
             )
         else:
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="失败",
-                operation="服务异常"
+                operation="服务异常",
+                service_id=sid,
+                healthy=False,
+                latency=latency,
+                event="check"
             )
 
         # 更新状态显示
@@ -1047,7 +1113,9 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="警告",
-                operation=warning_msg
+                operation=warning_msg,
+                service_id=sid,
+                event="restart"
             )
             return
 
@@ -1059,7 +1127,9 @@ class ServiceStatusMonitor(QWidget):
         self.add_monitoring_record(
             service_name=info['service_name'],
             status="自动重启",
-            operation=f"第 {info['restart_count']}/{info['max_restart']} 次自动重启"
+            operation=f"第 {info['restart_count']}/{info['max_restart']} 次自动重启",
+            service_id=sid,
+            event="restart"
         )
 
         # 更新状态为"重启中..."
@@ -1086,7 +1156,9 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="成功",
-                operation="自动重启成功"
+                operation="自动重启成功",
+                service_id=sid,
+                event="restart"
             )
 
             # 重启后状态暂时设为检查中
@@ -1108,7 +1180,9 @@ class ServiceStatusMonitor(QWidget):
             self.add_monitoring_record(
                 service_name=info['service_name'],
                 status="失败",
-                operation=f"自动重启失败: {str(error)}"
+                operation=f"自动重启失败: {str(error)}",
+                service_id=sid,
+                event="restart"
             )
 
             # 重启失败后状态仍为失败
@@ -1128,28 +1202,35 @@ class ServiceStatusMonitor(QWidget):
                 restart_switch.setChecked(state)
                 break
 
-    def add_monitoring_record(self, service_name, status, operation):
-        """添加监控记录"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
+    def add_monitoring_record(self, service_name, status, operation, service_id=None,
+                              healthy=None, latency=None, event=None):
+        """添加监控记录（持久化到本地存储）"""
         # 确保操作描述不为空
         if not operation:
             operation = "未知操作"
 
-        # 添加到记录列表
-        self.monitoring_records.insert(0, {
-            'time': timestamp,
-            'service_name': service_name,
-            'status': status,
-            'operation': operation
-        })
+        try:
+            self.record_store.add_record(
+                service_name=service_name,
+                status=status,
+                operation=operation,
+                service_id=service_id,
+                healthy=healthy,
+                latency=latency,
+                event=event
+            )
+        except Exception as e:
+            logger.error(f"监控记录写入失败: {e}")
+            return
 
-        # 限制记录数量
-        if len(self.monitoring_records) > self.record_limit:
-            self.monitoring_records = self.monitoring_records[:self.record_limit]
+        # 日志面板不可见时不刷新，展开时会整体刷新
+        if not self.log_panel_visible:
+            return
 
-        # 更新记录表格
-        self.update_record_table()
+        # 增量插入一行，不重建表格
+        self.record_model.record_added(service_name)
+        if healthy is not None and service_id is not None and service_id == self.last_selected_service_id:
+            self.update_record_stats()
 
     # ===== 通知方法 =====
     def create_successbar(self, title: str, content: str = "", duration: int = 5000):
@@ -1,11 +1,11 @@
-import html
 import json
-import re
 import sys
+from bisect import bisect_left
 from collections import deque
+from itertools import repeat
 
 from PyQt5.QtCore import Qt, QTimer, QThreadPool
-from PyQt5.QtGui import QFont, QTextCursor, QColor, QTextCharFormat, QKeySequence, QTextDocument
+from PyQt5.QtGui import QFont, QKeySequence
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -14,32 +14,32 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QPlainTextEdit,
-    QTextEdit,
     QLabel,
     QSplitter,
     QShortcut,
+    QAbstractItemView,
 )
 from loguru import logger
-from qfluentwidgets import ComboBox, PushButton, SearchLineEdit, InfoBar, InfoBarPosition, CaptionLabel
+from qfluentwidgets import ComboBox, PushButton, SearchLineEdit, InfoBar, InfoBarPosition, CaptionLabel, \
+    CompactSpinBox
 
-from application.tools.api_service.servicves_test import ServicesTest
+from application.tools.api_service.service_logger import LogTailer
+from application.tools.api_service.servicves_test import ServicesTest, ServiceTestFetchWorker
+from application.utils.log_index import parse_log_line, parse_log_lines
 from application.utils.threading_utils import Worker
 from application.utils.utils import get_icon, get_button_style_sheet
+from application.widgets.log_view import LogLineModel, LogListView
 
 
 class JSONServiceTester(QMainWindow):
-    LOG_PATTERN = re.compile(
-        r"(?P<datetime>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\.\d+\s*\|\s*(?P<level>[A-Z]+)\s*\|\s*[^:]+:(?P<func>\w+):\d+\s*-\s*(?P<msg>.*)"
-    )
-
-    LEVEL_COLORS = {
-        'DEBUG': '#808080',
-        'INFO': '#9cdcfe',
-        'WARNING': '#ffcb6b',
-        'WARN': '#ffcb6b',
-        'ERROR': '#f44747',
-        'Error': '#f44747',
-        'CRITICAL': '#f44747',
+    LOG_BUFFER_LINES = 200000  # 日志环形缓冲区容量
+    # 级别过滤选项 -> 显示的级别集合，None 表示全部
+    LEVEL_FILTERS = {
+        "全部级别": None,
+        "DEBUG 及以上": {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"},
+        "INFO 及以上": {"INFO", "WARNING", "ERROR", "CRITICAL"},
+        "WARNING 及以上": {"WARNING", "ERROR", "CRITICAL"},
+        "仅 ERROR": {"ERROR", "CRITICAL"},
     }
 
     def __init__(self, current_text: str, editor=None, home=None):
@@ -53,10 +53,12 @@ class JSONServiceTester(QMainWindow):
         self.setWindowTitle("📡 JSON 服务测试工具")
         self.resize(1200, 800)
         self.current_text = current_text or "{}"
-        self.search_results = []  # List[Tuple[int, int, int]]
+        self.search_results = []  # 匹配行的绝对行号
+        self.search_keywords = []  # 当前搜索关键字
         self.current_result_index = -1
-        self._all_match_selections = []
+        self.log_tailer = LogTailer()  # 日志增量偏移
         self.thread_pool = QThreadPool.globalInstance()
+        self.replay_worker = None  # 当前批量回放任务
         self.setStyleSheet(self.get_stylesheet())
         self.log_update_queue = deque()  # 日志更新队列
         self.is_processing_queue = False  # 队列处理状态
@@ -190,7 +192,29 @@ class JSONServiceTester(QMainWindow):
         self.send_btn.setStyleSheet(get_button_style_sheet())
         self.send_btn.setToolTip("发送请求到所选服务")
         self.send_btn.setMinimumHeight(36)
-        result_inner.addWidget(self.send_btn)
+
+        # 批量回放/压测：data 中取值为等长列表时逐行回放，否则重复发送当前请求
+        replay_layout = QHBoxLayout()
+        replay_layout.addWidget(self.send_btn, 3)
+        replay_layout.addWidget(CaptionLabel("次数:"))
+        self.replay_count_spin = CompactSpinBox()
+        self.replay_count_spin.setRange(1, 1000000)
+        self.replay_count_spin.setValue(100)
+        self.replay_count_spin.setToolTip("请求取值为标量时的重复发送次数")
+        replay_layout.addWidget(self.replay_count_spin)
+        replay_layout.addWidget(CaptionLabel("并发:"))
+        self.replay_concurrency_spin = CompactSpinBox()
+        self.replay_concurrency_spin.setRange(1, 64)
+        self.replay_concurrency_spin.setValue(5)
+        self.replay_concurrency_spin.setToolTip("同时在途的最大请求数")
+        replay_layout.addWidget(self.replay_concurrency_spin)
+        self.replay_btn = QPushButton("回放压测")
+        self.replay_btn.setIcon(get_icon("趋势分析"))
+        self.replay_btn.setStyleSheet(get_button_style_sheet())
+        self.replay_btn.setToolTip("按行回放请求数据并统计吞吐量、错误率与延迟分布")
+        self.replay_btn.setMinimumHeight(36)
+        replay_layout.addWidget(self.replay_btn, 2)
+        result_inner.addLayout(replay_layout)
 
         # 添加面板样式
         for panel in [input_container, result_container]:
@@ -248,6 +272,12 @@ class JSONServiceTester(QMainWindow):
         self.search_status_label.setFont(QFont("微软雅黑", 12))
         log_toolbar.addWidget(self.search_status_label)
 
+        self.level_filter_combo = ComboBox()
+        self.level_filter_combo.addItems(list(self.LEVEL_FILTERS.keys()))
+        self.level_filter_combo.setMinimumWidth(120)
+        self.level_filter_combo.currentTextChanged.connect(self.on_level_filter_changed)
+        log_toolbar.addWidget(self.level_filter_combo)
+
         log_toolbar.addStretch()
 
         # 自动刷新切换按钮
@@ -275,65 +305,67 @@ class JSONServiceTester(QMainWindow):
 
         log_layout.addLayout(log_toolbar)
 
-        # 日志显示区域
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
-        self.log_display.setFont(QFont("Consolas", 11))
-        self.log_display.setPlaceholderText("日志内容将显示在这里...")
+        # 日志显示区域（虚拟化列表，只绘制可见行）
+        self.log_model = LogLineModel(self.LOG_BUFFER_LINES, self)
+        self.log_display = LogListView()
+        self.log_display.setModel(self.log_model)
         self.log_display.setStyleSheet(
             """
-            QTextEdit {
+            QListView {
                 background-color: #1e1e1e;
                 color: #d4d4d4;
                 font-family: Consolas, Courier, monospace;
                 font-size: 12pt;
                 border: none;
             }
+            QListView::item:selected {
+                background-color: #264f78;
+            }
             /* 纵向滚动条 */
-            QTextEdit QScrollBar:vertical {
+            QListView QScrollBar:vertical {
                 background: transeditor;
                 width: 8px;
                 margin: 0px;
             }
-            QTextEdit QScrollBar::handle:vertical {
+            QListView QScrollBar::handle:vertical {
                 background: #555555;
                 border-radius: 4px;
                 min-height: 20px;
             }
-            QTextEdit QScrollBar::handle:vertical:hover {
+            QListView QScrollBar::handle:vertical:hover {
                 background: #888888;
             }
-            QTextEdit QScrollBar::add-line:vertical,
-            QTextEdit QScrollBar::sub-line:vertical {
+            QListView QScrollBar::add-line:vertical,
+            QListView QScrollBar::sub-line:vertical {
                 height: 0px;
                 background: none;
                 border: none;
             }
-            QTextEdit QScrollBar::add-page:vertical, QTextEdit QScrollBar::sub-page:vertical {
+            QListView QScrollBar::add-page:vertical, QListView QScrollBar::sub-page:vertical {
                 background: none;
             }
 
             /* 横向滚动条 */
-            QTextEdit QScrollBar:horizontal {
+            QListView QScrollBar:horizontal {
                 background: transeditor;
                 height: 8px;
                 margin: 0px;
             }
-            QTextEdit QScrollBar::handle:horizontal {
+            QListView QScrollBar::handle:horizontal {
                 background: #555555;
                 border-radius: 4px;
                 min-width: 20px;
             }
-            QTextEdit QScrollBar::handle:horizontal:hover {
+            QListView QScrollBar::handle:horizontal:hover {
                 background: #888880;
             }
-            QTextEdit QScrollBar::add-line:horizontal,
-            QTextEdit QScrollBar::sub-line:horizontal {
+            QListView QScrollBar::add-line:horizontal,
+            QListView QScrollBar::sub-line:horizontal {
                 width: 0px;
                 background: none;
                 border: none;
             }
-            QTextEdit QScrollBar::add-page:horizontal, QTextEdit QScrollBar::sub-page:horizontal {
+            QListView QScrollBar::add-page:horizontal, QListView QScrollBar::sub-page:horizontal {
                 background: none;
             }
             """
@@ -369,6 +401,7 @@ class JSONServiceTester(QMainWindow):
         # 信号绑定
         self.format_btn.clicked.connect(self.format_json)
         self.send_btn.clicked.connect(self.send_request)
+        self.replay_btn.clicked.connect(self.toggle_replay)
         self.toggle_log_btn.clicked.connect(self.toggle_log_refresh)
         self.search_up_btn.clicked.connect(lambda: self.navigate_search(-1))
         self.search_down_btn.clicked.connect(lambda: self.navigate_search(1))
@@ -462,8 +495,25 @@ class JSONServiceTester(QMainWindow):
     def on_service_changed(self):
         if self.service_combo.count() > 0:
             self.current_service_id = self.service_combo.currentData()[0]
+            self.reset_log_view()
             self.create_successbar(f"已选择服务: {self.service_combo.currentText()}")
 
+    def reset_log_view(self):
+        """切换服务时清空日志缓冲与偏移"""
+        self.log_tailer = LogTailer()
+        self.log_update_queue.clear()
+        self.log_model.clear()
+        self.search_results = []
+        self.current_result_index = -1
+        self.update_search_status()
+
+    @staticmethod
+    def fetch_log_records(service_logger, service_id, tailer):
+        """工作线程中执行：增量获取日志并解析为结构化记录"""
+        service_id, reset, lines, pending = service_logger.tail(service_id, tailer)
+        pending_record = parse_log_line(pending) if pending.strip() else None
+        return service_id, reset, parse_log_lines(lines), pending_record
+
     def send_request(self):
         """发送服务请求并处理响应"""
         # 检查服务是否已选择
@@ -504,6 +554,75 @@ class JSONServiceTester(QMainWindow):
         QApplication.processEvents()  # 立即更新UI
         self.thread_pool.start(worker)
 
+    def toggle_replay(self):
+        """开始或停止批量回放"""
+        if self.replay_worker is not None:
+            self.replay_worker.cancel()
+            self.replay_btn.setEnabled(False)
+            self.statusBar().showMessage("正在停止回放...")
+            return
+
+        if self.service_combo.count() == 0:
+            self.create_warningbar("警告", "没有可用的服务，请先加载服务列表")
+            return
+
+        try:
+            request_data = json.loads(self.json_input.toPlainText())
+        except json.JSONDecodeError as e:
+            self.create_warningbar("JSON格式错误", f"请检查JSON格式是否正确:\n{str(e)}")
+            return
+
+        data = request_data.get("data") if isinstance(request_data, dict) else None
+        if not isinstance(data, dict) or not data:
+            self.create_warningbar("警告", "请求数据需包含非空的 data 字段")
+            return
+
+        points = list(data.keys())
+        values = list(data.values())
+        if all(isinstance(v, list) for v in values):
+            # 每个测点一个取值序列：按行回放历史数据
+            n_rows = min(len(v) for v in values)
+            values_list = values
+        else:
+            # 标量请求：重复发送
+            n_rows = self.replay_count_spin.value()
+            values_list = [repeat(v, n_rows) for v in values]
+        if n_rows == 0:
+            self.create_warningbar("警告", "回放数据为空")
+            return
+
+        service_path = self.service_combo.currentData()[1]
+        # 使用独立的测试器，取消回放不会影响单次请求
+        self.replay_worker = ServiceTestFetchWorker(
+            ServicesTest(timeout=self.service_tester.timeout),
+            service_path,
+            points=points,
+            values_list=values_list,
+            ts_list=range(n_rows),
+            max_in_flight=self.replay_concurrency_spin.value(),
+        )
+        self.replay_worker.signals.progress.connect(self.on_replay_progress)
+        self.replay_worker.signals.report.connect(self.on_replay_report)
+        self.replay_worker.signals.finished.connect(self.on_replay_finished)
+        self.replay_btn.setText("停止回放")
+        self.result_display.setPlainText(f"正在回放 {n_rows} 条请求...")
+        self.thread_pool.start(self.replay_worker)
+
+    def on_replay_progress(self, done, total):
+        self.statusBar().showMessage(f"回放进度: {done}/{total}")
+
+    def on_replay_report(self, report):
+        self.result_display.setPlainText(json.dumps(report, indent=4, ensure_ascii=False))
+        self.statusBar().showMessage(
+            f"回放完成: {report['total']} 条, {report['requests_per_sec']:.1f} req/s, "
+            f"错误率 {report['error_rate'] * 100:.2f}%", 10000
+        )
+
+    def on_replay_finished(self):
+        self.replay_worker = None
+        self.replay_btn.setEnabled(True)
+        self.replay_btn.setText("回放压测")
+
     def handle_response(self, result):
         """处理成功的响应结果"""
         try:
@@ -554,21 +673,22 @@ class JSONServiceTester(QMainWindow):
         if self.is_loading or self.home.stackedWidget.currentWidget().objectName() != self.objectName():
             return
 
-        if self.service_combo.count() == 0 or not self.editor.config.api_tools.get("service_logger"):
-            if not hasattr(self, "_log_warning_shown"):
-                self.log_display.setPlainText("日志服务不可用或未选择服务")
+        service_logger = self.editor.config.api_tools.get("service_logger")
+        if self.service_combo.count() == 0 or not service_logger:
+            if not self._log_warning_shown:
+                self.statusBar().showMessage("日志服务不可用或未选择服务", 3000)
                 self._log_warning_shown = True
             return
 
         try:
-            self.is_loading = True
             service_id = self.current_service_id
             if not service_id:
-                self.log_display.setPlainText("当前服务没有可用的日志")
+                self.statusBar().showMessage("当前服务没有可用的日志", 3000)
                 return
+            self.is_loading = True
 
-            # 执行异步日志获取
-            worker = Worker(self.editor.config.api_tools.get("service_logger"), service_id)
+            # 异步获取日志，工作线程中按偏移量切出增量并完成解析
+            worker = Worker(self.fetch_log_records, service_logger, service_id, self.log_tailer)
             worker.signals.finished.connect(self.on_loggers_load)
             worker.signals.error.connect(self.handle_log_error)
             self.thread_pool.start(worker)
@@ -576,145 +696,71 @@ class JSONServiceTester(QMainWindow):
         except Exception as e:
             self.is_loading = False
             logger.error(f"更新日志异常: {e}")
-            self.log_display.setPlainText(f"获取日志时发生错误: {str(e)}")
+            self.statusBar().showMessage(f"获取日志时发生错误: {str(e)}", 3000)
 
     def handle_log_error(self, error):
         """处理日志获取失败的情况"""
         self.is_loading = False
-        self.log_display.setPlainText(f"获取日志失败: {str(error)}")
-        self.statusBar().showMessage("日志获取失败", 3000)
+        self.statusBar().showMessage(f"日志获取失败: {str(error).strip().splitlines()[-1]}", 3000)
 
     # 优化后的日志刷新方法
-    def on_loggers_load(self, new_log_content):
+    def on_loggers_load(self, result):
         self.is_loading = False
-        # 将新日志加入队列
-        self.log_update_queue.append(new_log_content)
+        service_id, reset, records, pending = result
+        # 切换服务后返回的旧结果直接丢弃
+        if service_id != self.current_service_id:
+            return
+        # 将增量加入队列
+        self.log_update_queue.append((reset, records, pending))
 
     def process_log_queue(self):
         if not self.log_update_queue or self.is_processing_queue:
             return
         self.is_processing_queue = True
         try:
-            # 合并所有待处理日志
-            combined_logs = []
+            follow = self.log_display.is_at_bottom()
             while self.log_update_queue:
-                combined_logs.append(self.log_update_queue.popleft())
-            # 合并日志内容
-            if combined_logs:
-                full_log = "\n".join(combined_logs)
-                self._update_log_display(full_log)
+                reset, records, pending = self.log_update_queue.popleft()
+                if reset:
+                    self.log_model.clear()
+                    follow = True
+                self.log_model.append_records(records, pending)
+            # 搜索结果随新日志增量更新（索引只扫描新增行）
+            if self.search_keywords:
+                self.refresh_search_results()
+            # 仅在视图原本位于底部时自动滚动，便于查看历史日志
+            if follow:
+                self.scroll_to_bottom()
         finally:
             self.is_processing_queue = False
 
-    def traditional_log_line(self, line: str) -> str:
-        safe_line = line.replace(" ", "&nbsp;")  # 替换空格
-        for key, value in self.LEVEL_COLORS.items():
-            if key in line:
-                return f'<span style="color:{value};">{safe_line}</span>'
-
-        return safe_line
-
-    def transform_log_to_html(self, log: str) -> str:
-        html_lines = log.splitlines()
-        processed_lines = []
-        for line in html_lines:
-            match = self.LOG_PATTERN.match(line)
-            if not match:
-                # 这里去掉对空格替换，直接html转义，防止标签被破坏
-                safe_line = html.escape(line)
-                processed_lines.append(f"<div>{self.traditional_log_line(safe_line)}</div>")
-            else:
-                parts = match.groupdict()
-                time = parts['datetime'][5:]  # MM-DD...
-                level = parts['level']
-                msg = html.escape(parts['msg'])  # 转义避免标签干扰
-                color = self.LEVEL_COLORS.get(level, '#cccccc')
-                processed_lines.append(f"<div><span style='color:{color};'>[{time}] | {level} | {msg}</span></div>")
-
-        return f"""
-                <div style="white-space: pre-wrap; font-family: Consolas, monospace; font-size: 12pt; margin:0; padding:0;">
-                    {''.join(processed_lines)}
-                </div>
-                """
-
-    def _update_log_display(self, new_log_content):
-        if hasattr(self, "_raw_log_content") and new_log_content == self._raw_log_content:
-            return
-        # 原始增量更新逻辑
-        if not hasattr(self, "_raw_log_content"):
-            self._raw_log_content = new_log_content
-            self.log_display.setHtml(self.transform_log_to_html(new_log_content))
-            # 仅在初始化时触发一次滚动
-            QTimer.singleShot(0, self.scroll_to_bottom)
-            return
-
-        if new_log_content.startswith(self._raw_log_content):
-            added_text = new_log_content[len(self._raw_log_content):]
-            if added_text.strip():  # 确认有新增内容才插入
-                self._raw_log_content = new_log_content
-                added_html = self.transform_log_to_html(added_text)
-                cursor = self.log_display.textCursor()
-                cursor.movePosition(QTextCursor.End)
-                cursor.insertHtml(added_html)
-                self.log_display.setTextCursor(cursor)
-                QTimer.singleShot(0, self.scroll_to_bottom)
-            else:
-                # 没有新增内容，啥都不做，避免闪烁
-                pass
-        else:
-            # 全量更新时保留滚动位置
-            self._raw_log_content = new_log_content
-            self.log_display.setHtml(self.transform_log_to_html(new_log_content))
-            QTimer.singleShot(0, self.scroll_to_bottom)
+    def on_level_filter_changed(self, text):
+        self.log_model.set_level_filter(self.LEVEL_FILTERS.get(text))
+        self.apply_filter(" ".join(self.search_keywords))
+        self.scroll_to_bottom()
+
+    def refresh_search_results(self):
+        """重新查询索引，保持当前定位的匹配行"""
+        current = self.search_results[self.current_result_index] if self.search_results else None
+        self.search_results = self.log_model.search(self.search_keywords)
+        self.log_model.set_highlights(self.search_results)
+        if current is not None and self.search_results:
+            self.current_result_index = min(bisect_left(self.search_results, current), len(self.search_results) - 1)
+        self.update_search_status()
 
     def apply_filter(self, keyword):
-        self._all_match_selections.clear()
-        self.search_results.clear()
+        self.search_results = []
         self.current_result_index = -1
+        self.search_keywords = [k.strip() for k in keyword.split() if k.strip()]
 
-        if len(keyword.strip()) == 0:
-            self.search_results = []
+        if not self.search_keywords:
+            self.log_model.set_highlights([])
             self.update_search_status()
-            if hasattr(self, "_raw_log_content"):
-                self.log_display.setHtml(self.transform_log_to_html(self._raw_log_content))
             return
 
         try:
-            keywords = [k.strip() for k in keyword.split() if k.strip()]
-            if not keywords:
-                return
-
-            highlight_colors = [
-                QColor("#ffff00"),
-                QColor("#90EE90"),
-                QColor("#ADD8E6"),
-                QColor("#FFB6C1"),
-                QColor("#E6E6FA"),
-            ]
-
-            doc = self.log_display.document()
-
-            for idx, kw in enumerate(keywords):
-                color = highlight_colors[idx % len(highlight_colors)]
-                pos = 0
-                while True:
-                    cursor = doc.find(kw, pos, QTextDocument.FindCaseSensitively)
-                    if cursor.isNull():
-                        break
-                    sel = QTextEdit.ExtraSelection()
-                    sel.cursor = cursor
-                    fmt = QTextCharFormat()
-                    fmt.setBackground(color)
-                    sel.format = fmt
-                    self._all_match_selections.append(sel)
-
-                    # 存储基于文档的字符位置
-                    self.search_results.append((cursor.selectionStart(), cursor.selectionEnd()))
-
-                    pos = cursor.selectionEnd()
-
-            self.log_display.setExtraSelections(self._all_match_selections)
-            self.search_results.sort(key=lambda x: x[0])
+            self.search_results = self.log_model.search(self.search_keywords)
+            self.log_model.set_highlights(self.search_results)
             self.update_search_status()
 
             if self.search_results:
@@ -729,57 +775,15 @@ class JSONServiceTester(QMainWindow):
             return
 
         self.current_result_index = (self.current_result_index + direction) % len(self.search_results)
-        start, end = self.search_results[self.current_result_index]
-
-        cursor = self.log_display.textCursor()
-        cursor.setPosition(start)
-        cursor.setPosition(end, QTextCursor.KeepAnchor)
-
-        self._current_selection = QTextEdit.ExtraSelection()
-        self._current_selection.cursor = cursor
-        fmt = QTextCharFormat()
-        fmt.setBackground(QColor("#ff4444"))
-        fmt.setForeground(QColor("#ffffff"))
-        self._current_selection.format = fmt
-
-        extras = [self._current_selection] + self._all_match_selections
-        self.log_display.setExtraSelections(extras)
-
-        self.log_display.setTextCursor(cursor)
-        self.log_display.ensureCursorVisible()
+        row = self.log_model.row_of(self.search_results[self.current_result_index])
+        if row >= 0:
+            index = self.log_model.index(row)
+            self.log_display.setCurrentIndex(index)
+            self.log_display.scrollTo(index, QAbstractItemView.PositionAtCenter)
         self.update_search_status()
 
     def scroll_to_bottom(self):
-        # 直接定位到文档末尾
-        cursor = self.log_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_display.setTextCursor(cursor)
-        # 强制滚动条到底部（备用方案）
-        sb = self.log_display.verticalScrollBar()
-        sb.setValue(sb.maximum())
-
-    def highlight_all_matches(self, keyword):
-        """构建所有匹配项的黄色高亮 ExtraSelection"""
-        self._all_match_selections.clear()
-        if not keyword:
-            return
-        doc = self.log_display.document()
-        for line_no in self.search_results:
-            block = doc.findBlockByNumber(line_no)
-            text = block.text().lower()
-            idx = text.find(keyword.lower())
-            if idx == -1:
-                continue
-            cursor = QTextCursor(block)
-            cursor.setPosition(block.position() + idx)
-            cursor.movePosition(
-                QTextCursor.NextCharacter, QTextCursor.KeepAnchor, len(keyword)
-            )
-            sel = QTextEdit.ExtraSelection()
-            sel.cursor = cursor
-            fmt = sel.format
-            fmt.setBackground(QColor("#ffff00"))
-            self._all_match_selections.append(sel)
+        self.log_display.scrollToBottom()
 
     def update_search_status(self):
         total = len(self.search_results)
@@ -881,6 +885,8 @@ class JSONServiceTester(QMainWindow):
         try:
             if hasattr(self, "log_timer"):
                 self.log_timer.stop()
+            if self.replay_worker is not None:
+                self.replay_worker.cancel()
             event.accept()
         except Exception as e:
             logger.warning(f"关闭异常：{e}")
@@ -27,7 +27,9 @@ from qfluentwidgets import FastCalendarPicker, CompactTimeEdit
 from application.interfaces.time_selector_dialog import TimeSelectorDialog
 from application.tools.algorithm.train_data_select import TrainDataSelect
 from application.utils.data_format_transform import list2str
-from application.utils.threading_utils import Worker
+from application.utils.process_pool import get_process_pool
+from application.utils.series_frame import SeriesFrame
+from application.utils.threading_utils import Worker, ProcessWorker
 from application.utils.utils import get_icon, get_button_style_sheet
 from application.widgets.selectable_region import SelectableRegionItem
 from application.widgets.trend_plot_widget import TrendPlotWidget
@@ -54,6 +56,8 @@ class TimeRangeDialog(QDialog):
         self.selected_ranges = []  # [(t0,t1),...]
         self.region_items = []  # [SelectableRegionItem,...]
         self.thread_pool = QThreadPool.globalInstance()
+        self._suggest_worker = None
+        get_process_pool()  # 预热算法进程池，点击“推荐”时无需等待进程启动
 
         self._build_ui()
         self._load_tags()
@@ -267,12 +271,15 @@ class TimeRangeDialog(QDialog):
             return
         self.btn_suggest.setEnabled(False)
         train_dataset_suggest_tool = TrainDataSelect()
-        worker = Worker(
+        # 熵计算为 CPU 密集型，放到算法进程池中执行，避免占用 GIL 导致界面卡顿
+        worker = ProcessWorker(
             train_dataset_suggest_tool,
             self.current_data,  # 在 _on_data_fetched_segment 里把 data 暂存到 self.current_data
         )
         worker.signals.finished.connect(self._on_suggest_ready)
         worker.signals.error.connect(lambda *_: self._reset_suggest_btn())
+        worker.signals.progress.connect(lambda p: self.btn_suggest.setText(f"推荐 {int(p)}%"))
+        self._suggest_worker = worker
         self.thread_pool.start(worker)
 
     def _on_suggest_ready(self, win_list):
@@ -318,6 +325,8 @@ class TimeRangeDialog(QDialog):
         self.update_plot_async()
 
     def _reset_suggest_btn(self):
+        self._suggest_worker = None
+        self.btn_suggest.setText("推荐")
         self.btn_suggest.setEnabled(True)
 
     def _init_signals(self):
@@ -591,6 +600,8 @@ class TimeRangeDialog(QDialog):
         self.thread_pool.start(worker)
 
     def _on_data_fetched_segment(self, data):
+        # 构建一次对齐的数据帧，绘图与区间推荐共用
+        data = SeriesFrame.from_dict(data)
         self.plot.clear_all()
         self.plot.plot_multiple(data)
         # 设置 X 轴
@@ -643,6 +654,12 @@ class TimeRangeDialog(QDialog):
             self.plot.disable_selection()
         super().accept()
 
+    def done(self, result):
+        # 关闭对话框时取消仍在计算的推荐任务
+        if self._suggest_worker is not None:
+            self._suggest_worker.cancel()
+        super().done(result)
+
     def get_selected_time_ranges(self):
         # 将时间序列进行排列
         self.selected_ranges = sorted(self.selected_ranges, key=lambda x: x[0])
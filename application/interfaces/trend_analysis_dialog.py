@@ -1,5 +1,6 @@
 import ctypes
 import datetime
+import sqlite3
 
 import matplotlib
 import numpy as np
@@ -15,6 +16,7 @@ from PyQt5.QtWidgets import (
     QLabel,
     QTableWidget,
     QTableWidgetItem,
+    QTableView,
     QHeaderView,
     QMessageBox,
     QAbstractItemView,
@@ -22,15 +24,21 @@ from PyQt5.QtWidgets import (
     QWidget,
     QApplication,
     QStyle,
+    QFileDialog,
 )
 from loguru import logger
 from qfluentwidgets import FluentIcon as FIF, ComboBox, CommandBar, Action, TransparentTogglePushButton, \
     TimePicker, SegmentedWidget
 from qfluentwidgets import SearchLineEdit, InfoBar, InfoBarPosition, Dialog, FastCalendarPicker, ToolButton
 
+from application.utils.ring_buffer import TimeSeriesRingBuffer
+from application.utils.compact_series import series_size
+from application.utils.series_frame import SeriesFrame
+from application.utils.trend_store import FILE_FILTER as TREND_FILE_FILTER, load_trends, save_trends
 from application.utils.threading_utils import Worker
 from application.widgets.color_picker import ColorComboBox
 from application.widgets.draggable_lines import DraggableLine
+from application.widgets.point_table_model import PointTableModel
 
 # 配置matplotlib支持中文
 try:
@@ -45,15 +53,20 @@ try:
     matplotlib.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
 except:
     pass  # 如果字体设置失败，使用默认字体
-from application.utils.utils import (
-    get_icon,
-    load_point_cache, save_point_cache
-)
+from application.utils.point_catalog import get_point_catalog
+from application.utils.point_index import get_point_index
+from application.utils.point_search_service import get_point_search_service
+from application.utils.utils import get_icon
 from application.widgets.trend_plot_widget import TrendPlotWidget
 from application.widgets.correlation_matrix_widget import CorrelationMatrixWidget
 
 
 class TrendAnalysisDialog(QDialog):
+    # 快速时间范围索引 -> 窗口长度（秒）
+    QUICK_RANGE_SECONDS = {1: 3600, 2: 3600 * 12, 3: 3600 * 24, 4: 86400 * 3, 5: 86400 * 7}
+    # 实时刷新间隔选项（秒）
+    LIVE_INTERVALS = [5, 10, 30, 60]
+
     def __init__(self, parent=None, home=None):
         super().__init__(parent)
         self.setObjectName("趋势分析")
@@ -64,10 +77,13 @@ class TrendAnalysisDialog(QDialog):
         self.thread_pool = QThreadPool.globalInstance()
 
         # === 优化点1: 数据源明确分离 ===
-        # 存储所有本地测点数据，是数据的“唯一真相源”
-        self.local_cache = {}
-        # 当前在左侧列表中显示的测点列表（经过搜索和过滤后的结果）
-        self.displayed_items = []
+        # 测点目录是测点数据的唯一存储，左侧列表与已选测点都按目录行号与测点名索引查询
+        self.catalog = get_point_catalog()
+        self.point_index = get_point_index()
+        self.search_service = get_point_search_service()
+        self._remote_keyword = None  # 左侧列表当前显示的远程搜索关键词
+        # 界面构建完成后在后台预建搜索索引，首次搜索无需等待
+        QTimer.singleShot(0, lambda: self.thread_pool.start(Worker(self.point_index.build)))
 
         self.point_type = None
         self.selected_points = []
@@ -96,6 +112,14 @@ class TrendAnalysisDialog(QDialog):
         self.point_update_timer = QTimer(self)
         self.point_update_timer.setSingleShot(True)
         self.point_update_timer.timeout.connect(self._start_fetch)
+        # 实时刷新：按测点预分配环形缓冲区，定时只拉取最后时间戳之后的数据
+        self.live_mode = False
+        self.live_buffers = {}
+        self._live_names = set()
+        self._live_fetching = False
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self._poll_live)
+        self.cmb_live_interval.currentIndexChanged.connect(self._on_live_interval_changed)
 
     def apply_modern_style(self):
         """应用现代化样式表"""
@@ -274,6 +298,11 @@ class TrendAnalysisDialog(QDialog):
         self.search_input.returnPressed.connect(self._perform_search)
         self.search_input.searchSignal.connect(self._perform_search)
         self.search_input.clearSignal.connect(self._perform_search)
+        # 本地搜索时边输入边搜索（防抖）
+        self.local_search_timer = QTimer(self)
+        self.local_search_timer.setSingleShot(True)
+        self.local_search_timer.timeout.connect(self._on_search_text_idle)
+        self.search_input.textChanged.connect(lambda _: self.local_search_timer.start(200))
         search_h.addWidget(self.cmb_search_type)
         search_h.addWidget(self.search_input)
         left_layout.addLayout(search_h)
@@ -294,7 +323,11 @@ class TrendAnalysisDialog(QDialog):
         list_label = QLabel("可选测点列表 (双击添加)")
         list_label.setStyleSheet("color: #6c757d; font-size: 12px; padding: 2px 5px;")
         list_layout.addWidget(list_label)
-        self.left_table = QTableWidget()
+        # 虚拟化表格：只渲染可见行，未点击表头排序时保持原有顺序（搜索结果按相关度）
+        self.left_model = PointTableModel(self.catalog, self)
+        self.left_table = QTableView()
+        self.left_table.setModel(self.left_model)
+        self.left_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
         self.left_table.setSortingEnabled(True)
         self.left_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.left_table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -303,17 +336,18 @@ class TrendAnalysisDialog(QDialog):
         self.left_table.verticalHeader().setVisible(False)  # 隐藏垂直表头
         self.left_table.setStyleSheet(
             """
-            QTableWidget {
+            QTableView {
                 gridline-color: #e9ecef;
                 selection-background-color: #e7f5ff;
                 selection-color: #212529;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
         """
         )
-        self.left_table.cellDoubleClicked.connect(lambda r, c: self._add_point())
+        self.left_table.doubleClicked.connect(lambda index: self._add_point())
+        self.left_table.verticalScrollBar().valueChanged.connect(self._on_left_table_scrolled)
         list_layout.addWidget(self.left_table)
         left_layout.addWidget(list_frame, 1)  # 使列表占据剩余空间
         # 右侧：控制区、信息区、曲线
@@ -425,6 +459,19 @@ class TrendAnalysisDialog(QDialog):
         self.btn_apply = Action(get_icon("change"), "刷新", triggered=self._update_trends)
         self.commandBar_row3.addAction(self.btn_apply)
 
+        # 实时刷新开关与间隔
+        self.btn_live = Action(FIF.SYNC, "实时", triggered=self._toggle_live_mode, checkable=True)
+        self.commandBar_row3.addAction(self.btn_live)
+        self.cmb_live_interval = ComboBox()
+        self.cmb_live_interval.addItems([f"{sec}秒" for sec in self.LIVE_INTERVALS])
+        self.cmb_live_interval.setToolTip("实时刷新间隔")
+        self.commandBar_row3.addWidget(self.cmb_live_interval)
+        self.commandBar_row3.addSeparator()
+
+        # 趋势数据导出与打开（Arrow IPC / Parquet），打开已保存的窗口不再请求时序库
+        self.commandBar_row3.addAction(Action(FIF.SAVE, "导出", triggered=self._export_trends))
+        self.commandBar_row3.addAction(Action(FIF.FOLDER, "打开", triggered=self._open_trends))
+
         # 创建可折叠的时间选择面板
         self.time_panel = QFrame()
         self.time_panel.setObjectName("timePanel")
@@ -579,11 +626,13 @@ class TrendAnalysisDialog(QDialog):
         :param tab_name: 标签名 ("model_points", "all_points", "history_points")
         """
         self.current_tab = tab_name  # 记录当前选中的标签
+        self.search_service.cancel(self)
+        self._remote_keyword = None
         self.segmented_widget.setCurrentItem(self.current_tab)
         # ========== 新增：切换时显示加载状态 ==========
         # 临时禁用表格交互
         self.left_table.setEnabled(False)
-        self.left_table.setStyleSheet("QTableWidget { background-color: #f0f0f0; }")
+        self.left_table.setStyleSheet("QTableView { background-color: #f0f0f0; }")
 
         # 使用 QTimer 延迟执行，给用户一个“正在加载”的感觉
         QTimer.singleShot(50, lambda: self._execute_tab_switch(tab_name))
@@ -601,12 +650,12 @@ class TrendAnalysisDialog(QDialog):
         self.left_table.setEnabled(True)
         self.left_table.setStyleSheet(
             """
-            QTableWidget {
+            QTableView {
                 gridline-color: #e9ecef;
                 selection-background-color: #e7f5ff;
                 selection-color: #212529;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
         """
@@ -614,69 +663,28 @@ class TrendAnalysisDialog(QDialog):
         # ========== 新增结束 ==========
 
     def _show_model_points(self):
-        """显示所有模型的默认测点集合，并去重，保留描述信息最丰富的测点"""
-        # 1. 获取所有参数类型的默认测点名 (这是唯一权威来源)
-        all_default_names = set()
-        for param_type in self.param_types:  # 遍历所有参数类型
-            default_names_for_type = [
-                p.split("\n")[0] for p in self.parent.gather_tags(type=param_type)
-            ]
-            all_default_names.update(default_names_for_type)
-
-            # 2. 创建一个字典，用于为每个测点名存储其所有候选测点
-            candidate_points = {}
-            for tag_type, points in self.local_cache.items():
-                for point in points:
-                    point_name = point.get("测点名")
-                    if point_name in all_default_names:
-                        if point_name not in candidate_points:
-                            candidate_points[point_name] = []
-                        candidate_points[point_name].append((tag_type, point))
-
-            # 3. 对每个测点名，从候选列表中选择“描述信息最多”的那个测点
-            #    “描述信息最多”定义为：该测点字典中所有值的字符串总长度最长
-            model_points = []
-            for point_name, candidates in candidate_points.items():
-                if len(candidates) == 1:
-                    # 如果只有一个候选，直接添加
-                    model_points.append(candidates[0])
-                else:
-
-                    # 如果有多个候选，选择信息量最大的那个
-                    # 计算每个候选测点的信息量（所有值的字符串总长度）
-                    def calculate_info_density(candidate_point):
-                        _, point_dict = candidate_point
-                        total_length = 0
-                        for key, value in point_dict.items():
-                            # 跳过测点名本身，避免自引用
-                            if key != "测点名":
-                                total_length += len(str(value))
-                        return total_length
-
-                        # 找到信息量最大的候选测点
-
-                    best_candidate = max(candidates, key=calculate_info_density)
-                    model_points.append(best_candidate)
-
-        # 4. 更新 displayed_items 并刷新UI
-        self.displayed_items = model_points
-        self._refresh_left()
+        """显示所有模型的默认测点集合（已去重，同名测点保留描述信息最丰富的记录）"""
+        # 模型测点视图在配置加载与编辑后预先与测点目录关联，这里只取目录行号
+        self._show_rows(self.parent.resolved_model_points().rows())
 
     def _show_all_points(self):
-        """显示所有本地缓存的测点"""
-        # 将 local_cache 中所有测点扁平化为 displayed_items
-        all_items = [(t, p) for t, l in self.local_cache.items() for p in l]
-        # 更新 displayed_items 并刷新UI
-        self.displayed_items = all_items
-        self._refresh_left()
+        """显示测点目录中的所有测点"""
+        self._show_rows(self.catalog.rows())
 
     def _show_history_points(self):
         """显示用户历史选择过的所有测点（按倒序排列）"""
         # 从历史记录中加载，并按倒序排列
-        history_items = [("History", p) for p in reversed(self.history_points)]
-        # 更新 displayed_items 并刷新UI
-        self.displayed_items = history_items
-        self._refresh_left()
+        self.left_model.set_items([("History", p) for p in reversed(self.history_points)])
+
+    def _show_rows(self, rows):
+        """以目录行号显示左侧列表（排除已选测点），模型只渲染可见行，不生成测点字典"""
+        rows = np.asarray(rows, dtype=np.int64)
+        # 按测点名排除已选测点：已选测点名对应的目录行号一次性剔除
+        selected_names = {p.get("测点名") for p in self.selected_points}
+        excluded = [row for name in selected_names for row in self.catalog.rows_named(name)]
+        if excluded:
+            rows = rows[~np.isin(rows, excluded)]
+        self.left_model.set_rows(rows)
 
     def _toggle_time_panel(self, checked: bool):
         """
@@ -705,55 +713,55 @@ class TrendAnalysisDialog(QDialog):
         else:
             self._search_remote(keyword)
 
+    def _on_search_text_idle(self):
+        if self.cmb_search_type.currentText() == "本地搜索":
+            self._perform_search()
+
     def _search_local(self, keyword: str):
-        """从本地缓存中搜索"""
-        results = {}
-        # 使用 self.local_cache 作为数据源
-        for tag_type, points in self.local_cache.items():
-            # 支持多个关键词搜索
-            kws = keyword.lower().split()
-            matched = [
-                p for p in points
-                if all(kw in "".join(str(v) for v in p.values()).lower() for kw in kws)
-            ]
-            if matched:
-                results[tag_type] = matched
-        # 将搜索结果设置为当前显示列表
-        self._update_displayed_items(results)
+        """从本地测点目录中搜索（倒排索引，多关键词按相关度排序）"""
+        self.search_service.cancel(self)
+        self._remote_keyword = None
+        # 搜索结果以目录行号直接交给模型（保持相关度顺序）
+        self._show_rows(self.point_index.search(keyword))
 
     def _search_remote(self, keyword: str):
         """调用远程接口搜索"""
-        worker = Worker(self.parent.config.get_tools_by_type("point-search"), search_text=keyword)
-        worker.signals.finished.connect(self._on_search_complete)
-        worker.signals.error.connect(lambda e: self.create_errorbar("搜索失败: " + str(e)))
-        self.thread_pool.start(worker)
+        self.search_service.search(
+            self,
+            self.parent.config.get_tools_by_type("point-search"),
+            keyword,
+            lambda kw, results, complete: self._on_search_complete(results, kw),
+            lambda e: self.create_errorbar("搜索失败: " + str(e)),
+        )
+
+    def _on_left_table_scrolled(self, value):
+        # 远程搜索结果滚动到底部时加载下一页
+        if value == self.left_table.verticalScrollBar().maximum() and self.search_service.has_more(self):
+            self.search_service.fetch_more(self)
 
-    def _on_search_complete(self, results: dict):
-        """处理远程搜索完成后的结果"""
+    def _on_search_complete(self, results: dict, keyword: str = None):
+        """处理远程搜索完成后的结果（分页时为累计结果）"""
         # 将远程结果合并到本地缓存（可选策略）
         self._merge_remote_results(results)
-        # 将搜索结果直接作为当前显示列表
-        self._update_displayed_items(results)
+        shown = self.left_model.items()
+        items = [(t, p) for t, l in results.items() for p in l if p not in self.selected_points]
+        if (
+                keyword is not None and self._remote_keyword == keyword
+                and len(items) > len(shown) and all(a[1] is b[1] for a, b in zip(shown, items))
+        ):
+            # 下一页：只在末尾追加，保持滚动位置
+            self.left_model.extend_items(items[len(shown):])
+        else:
+            # 将搜索结果直接作为当前显示列表
+            self.left_model.set_items(items)
+        self._remote_keyword = keyword
 
     def _merge_remote_results(self, remote_results: dict):
-        """将远程结果合并到本地缓存中，避免重复"""
-        for tag_type, points in remote_results.items():
-            if tag_type not in self.local_cache:
-                self.local_cache[tag_type] = []
-            # 按“测点名”去重
-            existing_names = {p["测点名"] for p in self.local_cache[tag_type]}
-            for p in points:
-                if p["测点名"] not in existing_names:
-                    self.local_cache[tag_type].append(p)
-        # 合并后持久化
-        save_point_cache(self.local_cache)
-
-    def _update_displayed_items(self, data: dict):
-        """根据传入的数据更新 displayed_items 并刷新 UI"""
-        all_items = [(t, p) for t, l in data.items() for p in l]
-        # 过滤掉已选中的测点
-        self.displayed_items = [pt for pt in all_items if pt[1] not in self.selected_points]
-        self._refresh_left()
+        """将远程结果增量写入测点目录（按类型与测点名去重）"""
+        try:
+            self.catalog.upsert(remote_results, source="point-search")
+        except sqlite3.Error:
+            pass  # 写入失败已记录日志，结果照常显示
 
     def _get_start_end_time(self):
         start_date = self.start_dt.getDate().toPyDate()
@@ -803,21 +811,13 @@ class TrendAnalysisDialog(QDialog):
         # 初始化default_points
         self.point_type = self.param_type_combo.currentText()
         self.selected_points = []
-        self.default_points = [
-            p.split("\n")[0] for p in self.parent.gather_tags(type=self.point_type)
-        ]
-        # 从缓存加载已有点信息
-        self.local_cache = load_point_cache() or {}
-        all_items = [(t, p) for t, l in self.local_cache.items() for p in l]
-        # 左侧列表排除默认点，默认点将在_fetch后加入
-        self.left_items = []
-        selected_points = []
-        for pt in all_items:
-            if pt[1].get("测点名") in self.default_points and pt[1].get("测点名") not in selected_points:
-                self.selected_points.append(pt[1])
-                selected_points.append(pt[1].get("测点名"))
-            else:
-                self.left_items.append(pt)
+        self.default_points = self.parent.resolved_model_points().names(self.point_type)
+        # 默认点按测点名从测点目录取记录加入已选列表（左侧列表显示时会排除已选测点）
+        self.catalog.refresh()
+        for name in dict.fromkeys(self.default_points):
+            rows = self.catalog.rows_named(name)
+            if rows:
+                self.selected_points.append(self.catalog.record(rows[0]))
 
         # 初始化时，默认显示“模型测点”
         self._switch_to_tab("all_points")
@@ -834,117 +834,40 @@ class TrendAnalysisDialog(QDialog):
         self.thread_pool.start(w)
 
     def _on_fetch(self, results):
-        # 将获取的结果合并到本地缓存
-        for t, l in results.items():
-            if t in self.local_cache:
-                points = [p.get("测点名") for p in l]
-                self.local_cache[t].extend([p for p in l if p.get("测点名") not in points])
-            else:
-                self.local_cache[t] = l
-        # 保存合并后的缓存
-        save_point_cache(self.local_cache)
+        # 同步结果已由搜索器在工作线程中写入测点目录，这里只从目录刷新视图
+        self.catalog.refresh()
         # >>>> 修改：根据当前导航栏标签，刷新对应视图 <<<<
         # 而是调用 _switch_to_tab 来刷新当前选中的视图
         self._switch_to_tab(self.current_tab)
 
-    def _refresh_left(self):
-        """优化版：刷新左侧列表UI，避免全量重建，提高性能"""
-        # 如果没有要显示的项，清空表格
-        if not self.displayed_items:
-            self.left_table.setRowCount(0)
-            return
-
-        # 获取表头列名
-        all_keys = set()
-        for _, p in self.displayed_items:
-            all_keys.update(p.keys())
-        keys = ["测点名"] + [k for k in all_keys if k != "测点名"]
-
-        # 只有当列结构改变时才重置列
-        if self.left_table.columnCount() != len(keys):
-            self.left_table.setColumnCount(len(keys))
-            self.left_table.setHorizontalHeaderLabels(keys)
-        else:
-            # 检查列名是否一致，不一致则重置
-            current_header_labels = [self.left_table.horizontalHeaderItem(i).text() for i in
-                                     range(self.left_table.columnCount())]
-            if current_header_labels != keys:
-                self.left_table.setHorizontalHeaderLabels(keys)
-
-        # 获取当前和目标行数
-        current_row_count = self.left_table.rowCount()
-        target_row_count = len(self.displayed_items)
-
-        # 调整行数
-        if current_row_count > target_row_count:
-            # 移除多余的行
-            for _ in range(current_row_count - target_row_count):
-                self.left_table.removeRow(target_row_count)
-        elif current_row_count < target_row_count:
-            # 添加缺失的行
-            for _ in range(target_row_count - current_row_count):
-                self.left_table.insertRow(current_row_count)
-
-        # 填充数据，只更新内容，不重新创建行
-        for row_idx, (tag_type, point) in enumerate(self.displayed_items):
-            for col_idx, key in enumerate(keys):
-                value = str(point.get(key, ""))
-                # 获取或创建单元格
-                item = self.left_table.item(row_idx, col_idx)
-                if item is None:
-                    item = QTableWidgetItem(value)
-                    self.left_table.setItem(row_idx, col_idx, item)
-                else:
-                    # 只有当内容不同时才更新，减少不必要的刷新
-                    if item.text() != value:
-                        item.setText(value)
-
     def _add_point(self):
         """从左侧列表添加测点到已选列表"""
-        row = self.left_table.currentRow()
+        row = self.left_table.currentIndex().row()
         if row < 0:
             return
-
-        # 获取表头列名
-        keys = [
-            self.left_table.horizontalHeaderItem(i).text()
-            for i in range(self.left_table.columnCount())
-        ]
-        # 找到测点名列的索引
-        name_column = keys.index("测点名") if "测点名" in keys else 0
         # 获取测点名
-        name = self.left_table.item(row, name_column).text()
-
-        # 查找完整的测点信息
-        found = False
-        selected_point = None
-        for pt in self.displayed_items:
-            if pt[1].get("测点名") == name:
-                # 检查是否已经添加过
-                if pt[1] in self.selected_points:
-                    msg = QMessageBox(self)
-                    msg.setIcon(QMessageBox.Information)
-                    msg.setWindowTitle("提示")
-                    msg.setText(f"测点 '{name}' 已经添加到列表中")
-                    msg.setStandardButtons(QMessageBox.Ok)
-                    msg.setStyleSheet(
-                        """
-                        QMessageBox {
-                            background-color: #f8f9fa;
-                        }
-                        QLabel {
-                            color: #495057;
-                        }
-                    """
-                    )
-                    msg.exec_()
-                    return
-                # 保存要添加的测点信息
-                selected_point = pt[1]
-                found = True
-                break
-
-        if not found or selected_point is None:
+        name = self.left_model.name(row)
+
+        # 完整的测点信息（目录行模式下由模型按行生成测点字典）
+        selected_point = self.left_model.point(row)[1]
+        # 检查是否已经添加过
+        if selected_point in self.selected_points:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Information)
+            msg.setWindowTitle("提示")
+            msg.setText(f"测点 '{name}' 已经添加到列表中")
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.setStyleSheet(
+                """
+                QMessageBox {
+                    background-color: #f8f9fa;
+                }
+                QLabel {
+                    color: #495057;
+                }
+            """
+            )
+            msg.exec_()
             return
 
         # ========== 性能优化：增量更新 ==========
@@ -954,12 +877,8 @@ class TrendAnalysisDialog(QDialog):
         if selected_point not in self.history_points:
             self.history_points.append(selected_point)
 
-        # 2. 直接从 displayed_items 中移除该测点
-        self.displayed_items = [pt for pt in self.displayed_items if pt[1].get("测点名") != name]
-
-        # 3. **关键：不再调用 _refresh_left()**
-        # 我们只移除了一个特定的行，直接用 QTableWidget 的 removeRow 方法
-        self.left_table.removeRow(row)
+        # 2. 只移除了一个特定的行，直接从模型中删除该行，不重置整个列表
+        self.left_model.remove_row(row)
         # ========== 性能优化结束 ==========
 
         # 更新已选测点列表
@@ -1013,51 +932,26 @@ class TrendAnalysisDialog(QDialog):
         self.selected_points = new_selected
 
         # ========== 性能优化：增量更新 ==========
-        # 1. 从本地缓存中找到被移除的测点的完整信息
-        restored_point = None
-        for tag_type, points in self.local_cache.items():
-            for point in points:
-                if point.get("测点名") == removed_name:
-                    restored_point = (tag_type, point)
-                    break
-            if restored_point:
-                break
-
-        # 2. 如果找到了该测点，并且它当前不在 displayed_items 中，则将其加回去
-        if restored_point and restored_point[1] not in [pt[1] for pt in self.displayed_items]:
-            # 检查是否已经在 selected_points 中
-            if restored_point[1] not in self.selected_points:
-                # 将测点添加回 displayed_items
-                self.displayed_items.append(restored_point)
-                # 保持列表有序（可选）
-                self.displayed_items.sort(key=lambda x: x[1].get("测点名", ""))
-
-                # **关键：直接在表格末尾插入一行，而不是刷新整个列表**
-                new_row = self.left_table.rowCount()
-                self.left_table.insertRow(new_row)
-                # 使用当前的表头
-                current_keys = [self.left_table.horizontalHeaderItem(i).text() for i in
-                                range(self.left_table.columnCount())]
-                for col_idx, key in enumerate(current_keys):
-                    value = str(restored_point[1].get(key, ""))
-                    self.left_table.setItem(new_row, col_idx, QTableWidgetItem(value))
+        # 1. 按测点名从测点目录中找到被移除的测点
+        rows = self.catalog.rows_named(removed_name)
+        # 2. 如果找到了该测点，并且它当前不在左侧列表中，则直接在模型末尾追加一行，而不是刷新整个列表
+        if rows and self.left_model.find(removed_name) < 0:
+            self.left_model.append_row(rows[0])
         # ========== 性能优化结束 ==========
 
         # 在左侧列表中查找并高亮刚移除的测点
-        for row_idx in range(self.left_table.rowCount()):
-            item = self.left_table.item(
-                row_idx,
-                name_column if name_column < self.left_table.columnCount() else 0,
-            )
-            if item and item.text() == removed_name:
-                self.left_table.selectRow(row_idx)
-                self.left_table.scrollToItem(item)
-                break
+        row_idx = self.left_model.find(removed_name)
+        if row_idx >= 0:
+            self.left_table.selectRow(row_idx)
+            self.left_table.scrollTo(self.left_model.index(row_idx, 0))
 
         # 更新趋势图
         if self.selected_points:
             if hasattr(self, "data_cache") and removed_name in self.data_cache:
-                del self.data_cache[removed_name]
+                if isinstance(self.data_cache, SeriesFrame):
+                    self.data_cache = self.data_cache.drop([removed_name])
+                else:
+                    del self.data_cache[removed_name]
             self._debounced_update_trends()
         else:
             self._clear_plot_area()
@@ -1199,10 +1093,8 @@ class TrendAnalysisDialog(QDialog):
                                 and timestamps is not None
                                 and len(timestamps) > 0
                         ):
-                            # 过滤掉NaN值
-                            valid_mask = ~np.isnan(values)
-                            if np.any(valid_mask):
-                                processed_data[point_name] = values[valid_mask]
+                            # NaN 由相关性引擎按测点对剔除
+                            processed_data[point_name] = (timestamps, values)
                     if processed_data:
                         self.corr_matrix_widget.set_data(processed_data)
             # 确保显示关联矩阵小部件
@@ -1312,6 +1204,11 @@ class TrendAnalysisDialog(QDialog):
             self.correlation_layout.addWidget(loading_frame)
         # 获取数据参数
         sample = self.cmb_sample.currentText().replace(" ", "")
+        # 模型测点的趋势数据已在后台预取且窗口一致时直接使用
+        cached = self.parent.resolved_model_points().cached_trends(names, start_time, end_time, sample)
+        if cached is not None:
+            self._on_data(cached, loading_frame)
+            return
         # 创建并启动数据获取工作线程
         w = Worker(
             self.parent.config.get_tools_by_type("trenddb-fetcher")[0],
@@ -1367,11 +1264,9 @@ class TrendAnalysisDialog(QDialog):
         # 移除等待组件
         if loading_widget and loading_widget.parent():
             loading_widget.setParent(None)
-        # 检查是否有有效数据
-        valid_data = {
-            name: (ts, ys)
-            for name, (ts, ys) in data.items()
-            if ts is not None and len(ts) > 0
+        # 检查是否有有效数据（SeriesFrame 中不含空测点，直接使用；紧凑存储按样本数判断，不解码）
+        valid_data = data if isinstance(data, SeriesFrame) else {
+            name: value for name, value in data.items() if series_size(value) > 0
         }
         if not valid_data:
             # 显示没有数据的提示信息
@@ -1416,13 +1311,10 @@ class TrendAnalysisDialog(QDialog):
             elif self.current_plot_type == 2:
                 self.correlation_layout.addWidget(no_data_frame)
             return
-        # 更新数据缓存
-        self.data_cache = valid_data
-        # 显示数据点统计信息
-        total_points = 0
-        for name, (ts, ys) in valid_data.items():
-            if ts is not None:
-                total_points += len(ts)
+        # 更新数据缓存：只读数据帧（紧凑存储在此解码一次），趋势图、直方图与相关性共用
+        self.data_cache = SeriesFrame.from_dict(valid_data)
+        if self.live_mode:
+            self._reset_live_buffers(self.data_cache)
         # 根据当前选择的图表类型展示数据
         self._update_plots()
 
@@ -1516,6 +1408,8 @@ class TrendAnalysisDialog(QDialog):
     def _quick_time_range(self, index):
         """根据快速选择更新时间范围"""
         if index == 0:  # 自定义，不做处理
+            if self.live_mode:
+                self._stop_live_mode()
             return
         now = QDateTime.currentDateTime()
         self.end_dt.setDate(now.date())
@@ -1538,6 +1432,168 @@ class TrendAnalysisDialog(QDialog):
         # 自动应用新的时间范围
         self._update_trends()
 
+    # ===== 实时刷新 =====
+    def _toggle_live_mode(self, checked: bool):
+        if not checked:
+            self._stop_live_mode()
+            return
+        if self.range_combo.currentIndex() not in self.QUICK_RANGE_SECONDS:
+            self.createErrorInfoBar("提示", "实时刷新仅支持快速时间范围，请先选择时间范围")
+            self.btn_live.setChecked(False)
+            return
+        self.live_mode = True
+        if self.data_cache:
+            self._reset_live_buffers(self.data_cache)
+        else:
+            self._update_trends()
+        self.live_timer.start(self._live_interval_ms())
+
+    def _stop_live_mode(self):
+        self.live_mode = False
+        self.live_timer.stop()
+        self.live_buffers = {}
+        self._live_names = set()
+        self.btn_live.setChecked(False)
+
+    def _live_interval_ms(self) -> int:
+        return self.LIVE_INTERVALS[max(self.cmb_live_interval.currentIndex(), 0)] * 1000
+
+    def _on_live_interval_changed(self, index):
+        if self.live_mode:
+            self.live_timer.start(self._live_interval_ms())
+
+    def _reset_live_buffers(self, data):
+        """按当前数据初始化各测点的环形缓冲区，容量为窗口内预期点数的两倍"""
+        sample = int(self.cmb_sample.currentText().strip())
+        self.live_buffers = {}
+        for name, (ts, ys) in data.items():
+            buffer = TimeSeriesRingBuffer(max(len(ts), sample) * 2)
+            buffer.append(ts, ys)
+            self.live_buffers[name] = buffer
+        self._live_names = {p.get("测点名") for p in self.selected_points}
+
+    def _poll_live(self):
+        """只拉取各测点最后时间戳之后的数据"""
+        if not self.live_mode or self._live_fetching or not self.live_buffers:
+            return
+        names = [p.get("测点名") for p in self.selected_points]
+        if set(names) != self._live_names:
+            # 测点变化时整体重新获取，数据到达后重建缓冲区
+            self._update_trends()
+            return
+        window = self.QUICK_RANGE_SECONDS.get(self.range_combo.currentIndex())
+        last_ts = [buffer.last_ts for buffer in self.live_buffers.values() if len(buffer)]
+        if window is None or not last_ts:
+            return
+        # 尾部按整窗的采样间隔请求：从最后一个样本之后的下一个采样时刻起，取到当前时刻之前的最后一个采样时刻，
+        # 点数恰为其间的采样时刻数，与历史部分点密度一致；下一个采样时刻未到时本次不请求
+        sample = int(self.cmb_sample.currentText().strip())
+        interval = window / max(sample, 1)
+        first = min(last_ts) + interval
+        steps = int(np.floor((datetime.datetime.now().timestamp() - first) / interval))
+        if steps < 0:
+            return
+        start = datetime.datetime.fromtimestamp(first)
+        end = datetime.datetime.fromtimestamp(first + steps * interval)
+        self._live_fetching = True
+        w = Worker(
+            self.parent.config.get_tools_by_type("trenddb-fetcher")[0],
+            names, start, end, steps + 1, batch=True
+        )
+        w.signals.finished.connect(self._on_live_data)
+        w.signals.error.connect(self._on_live_error)
+        self.thread_pool.start(w)
+
+    def _on_live_error(self, error):
+        self._live_fetching = False
+        logger.warning(f"实时数据获取失败: {error}")
+
+    def _on_live_data(self, data):
+        self._live_fetching = False
+        if not self.live_mode:
+            return
+        window = self.QUICK_RANGE_SECONDS.get(self.range_combo.currentIndex())
+        cutoff = datetime.datetime.now().timestamp() - window
+        for name, (ts, ys) in data.items():
+            buffer = self.live_buffers.get(name)
+            if buffer is None or ts is None or not len(ts):
+                continue
+            # 按时间戳合并：尾部先按时间排序，缓冲区只追加晚于其最后样本的部分（重叠的采样时刻被丢弃）
+            ts, ys = np.asarray(ts), np.asarray(ys)
+            if np.any(ts[1:] < ts[:-1]):
+                order = np.argsort(ts, kind="stable")
+                ts, ys = ts[order], ys[order]
+            buffer.append(ts, ys)
+        for buffer in self.live_buffers.values():
+            buffer.drop_before(cutoff)
+        # 缓存直接引用缓冲区视图，曲线原地更新
+        self.data_cache = {
+            name: buffer.view() for name, buffer in self.live_buffers.items() if len(buffer)
+        }
+        if self.current_plot_type == 0 and self.trend_plot is not None and self.trend_plot.isVisible():
+            self.trend_plot.update_curves(self.data_cache)
+
+    # ===== 趋势数据导出/打开 =====
+    def _export_trends(self):
+        if not self.data_cache:
+            self.createErrorInfoBar("提示", "没有可导出的趋势数据，请先获取数据")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出趋势数据", "trend_data.arrow", TREND_FILE_FILTER)
+        if not path:
+            return
+        frame = SeriesFrame.from_dict(self.data_cache)
+        start_time, end_time = self._get_start_end_time()
+        meta = {
+            "start": start_time,
+            "end": end_time,
+            "data_num": self.cmb_sample.currentText().strip(),
+            "points": [p for p in self.selected_points if p.get("测点名") in frame],
+        }
+        worker = Worker(save_trends, path, frame, meta)
+        worker.signals.finished.connect(lambda p: self.create_successbar("导出成功", p))
+        worker.signals.error.connect(lambda e: self.create_errorbar("导出失败", str(e).strip().splitlines()[-1]))
+        self.thread_pool.start(worker)
+
+    def _open_trends(self):
+        path, _ = QFileDialog.getOpenFileName(self, "打开趋势数据", "", TREND_FILE_FILTER)
+        if not path:
+            return
+        worker = Worker(load_trends, path)
+        worker.signals.finished.connect(self._on_trends_loaded)
+        worker.signals.error.connect(lambda e: self.create_errorbar("打开失败", str(e).strip().splitlines()[-1]))
+        self.thread_pool.start(worker)
+
+    def _on_trends_loaded(self, result):
+        """恢复文件中的时间窗口、采样数与测点，直接展示数据"""
+        frame, meta = result
+        if self.live_mode:
+            self.btn_live.setChecked(False)
+            self._stop_live_mode()
+        # 切换为自定义时间范围，避免快速时间范围把结束时间改为当前
+        self.range_combo.setCurrentIndex(0)
+        if meta.get("start") and meta.get("end"):
+            start = QDateTime(datetime.datetime.fromisoformat(meta["start"]))
+            end = QDateTime(datetime.datetime.fromisoformat(meta["end"]))
+            self.start_dt.setDate(start.date())
+            self.start_time_edit.setTime(start.time())
+            self.end_dt.setDate(end.date())
+            self.end_time_edit.setTime(end.time())
+        samples = [self.cmb_sample.itemText(i).strip() for i in range(self.cmb_sample.count())]
+        if str(meta.get("data_num", "")) in samples:
+            self.cmb_sample.setCurrentIndex(samples.index(str(meta["data_num"])))
+        points = {p.get("测点名"): p for p in meta.get("points", []) if isinstance(p, dict)}
+        self.selected_points = [points.get(name, {"测点名": name}) for name in frame.names]
+        for point in self.selected_points:
+            if point not in self.history_points:
+                self.history_points.append(point)
+        self._refresh_selected()
+        self._clear_plot_area()
+        self._on_data(frame)
+
+    def closeEvent(self, event):
+        self._stop_live_mode()
+        super().closeEvent(event)
+
     def _clear_plot_area(self):
         # 清除所有图表区域的控件
         for layout in [
@@ -1601,13 +1657,9 @@ class TrendAnalysisDialog(QDialog):
             )
             self.correlation_layout.addWidget(no_data_label)
             return
-        # 收集所有数据点
-        data_points = {}
-        for name, (ts, ys) in self.data_cache.items():
-            if ts is None or len(ts) == 0:
-                continue
-            data_points[name] = ys
-        if not data_points or len(data_points) < 2:
+        # 数据帧保留时间戳供相关性计算按时间对齐（实时模式下的环形缓冲区视图在此构建一次快照）
+        data_points = SeriesFrame.from_dict(self.data_cache)
+        if len(data_points) < 2:
             # 添加提示标签 - 美化
             error_frame = QFrame()
             error_frame.setStyleSheet(
@@ -49,6 +49,8 @@ from application.utils.config_handler import (
 )
 from application.utils.data_format_transform import list2str
 from application.utils.load_config import ParamConfigLoader
+from application.utils.model_points import ModelPointsView, PREFETCH_REFRESH_SECONDS as MODEL_POINTS_PREFETCH_REFRESH
+from application.utils.point_catalog_sync import get_point_catalog_sync
 from application.utils.threading_utils import Worker
 from application.utils.utils import (
     get_icon,
@@ -105,8 +107,21 @@ class JSONEditor(QWidget):
         self.point_selector = PointSelectorDialog(parent=self)
         # 撤销/重做系统
         self.undo_stacks = {}  # 每个文件单独的撤销栈
+        # 模型测点视图：配置加载与编辑后（防抖）重新收集引用的测点名并与测点目录关联
+        self.model_points = ModelPointsView()
+        self.model_points_timer = QTimer(self)
+        self.model_points_timer.setSingleShot(True)
+        self.model_points_timer.setInterval(500)
+        self.model_points_timer.timeout.connect(self._update_model_points)
+        # 预取的趋势数据有有效期，趋势库工具配置 prefetch: true 时定时重新预取，使趋势分析打开时始终可直接使用
+        self.model_trends_timer = QTimer(self)
+        self.model_trends_timer.setInterval(MODEL_POINTS_PREFETCH_REFRESH * 1000)
+        self.model_trends_timer.timeout.connect(self._prefetch_model_trends)
         self.bind_shortcuts()
         self.init_ui()
+        self.tree.itemChanged.connect(lambda *_: self.model_points_timer.start())
+        self.tree.model().rowsInserted.connect(lambda *_: self.model_points_timer.start())
+        self.tree.model().rowsRemoved.connect(lambda *_: self.model_points_timer.start())
         # 配置参数加载
         self.load_config()
 
@@ -116,6 +131,11 @@ class JSONEditor(QWidget):
 
         self.config = ParamConfigLoader(config_path)
         self.config.params_loaded.connect(self.on_config_loaded)
+        # 接口工具加载完成后开始在后台定时增量同步测点目录
+        self.config.api_tools_loaded.connect(
+            lambda: get_point_catalog_sync().start(lambda: self.config.get_tools_by_type("point-search"))
+        )
+        self.config.api_tools_loaded.connect(self._prefetch_model_trends)
         if callback_func:
             self.config.params_loaded.connect(lambda: callback_func(config_path))
         if self.current_file in self.model_bindings:
@@ -131,6 +151,39 @@ class JSONEditor(QWidget):
         else:
             self.reload_tree()
 
+    def _update_model_points(self):
+        """重新收集各参数类型引用的测点名，有变化时在后台预取其趋势数据"""
+        if getattr(self.config, "param_structure", None) is None:
+            return
+        data = self.tree_to_dict()
+        names_by_type = {
+            param_type: [tag.split("\n")[0] for tag in self.gather_tags(data, type=param_type)]
+            for param_type in self.config.get_params_name()
+        }
+        if self.model_points.update(names_by_type):
+            self._prefetch_model_trends()
+
+    def _prefetch_model_trends(self):
+        fetchers = self.config.get_tools_by_type("trenddb-fetcher")
+        fetcher = fetchers[0] if fetchers else None
+        if fetcher is None or not getattr(fetcher, "prefetch", False):
+            # 未开启预取（或趋势库工具被移除）时不再定时请求，并丢弃已有的预取数据
+            self.model_trends_timer.stop()
+            self.model_points.clear_trends()
+            return
+        if not self.model_points.names():
+            return
+        self.thread_pool.start(Worker(self.model_points.prefetch_trends, fetcher))
+        # 每次预取后重新计时，测点名变化触发的预取也会推迟下一次定时预取
+        self.model_trends_timer.start()
+
+    def resolved_model_points(self) -> ModelPointsView:
+        """模型测点视图（有尚未处理的配置变更时先立即更新）"""
+        if self.model_points_timer.isActive():
+            self.model_points_timer.stop()
+            self._update_model_points()
+        return self.model_points
+
     def init_ui(self):
         # —— 高 DPI 缩放参数 ——
         px6 = int(6 * self.scale)
@@ -710,7 +763,9 @@ class JSONEditor(QWidget):
             dataset_desc=f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
             tree_name="0",
             tree_no="0",
+            with_progress=True,
         )
+        work.signals.progress.connect(lambda p: self.show_status_message(f"正在上传 {name}：{p}%", "info", 2000))
         work.signals.finished.connect(lambda result: self.update_config(result))
         work.signals.error.connect(self.create_errorbar)
         self.thread_pool.start(work)
@@ -2146,7 +2201,10 @@ class JSONEditor(QWidget):
                 # 此处调用上传接口并附带运行环境信息，如有需要
                 worker = Worker(
                     self.config.api_tools.get("model_upload"),
-                    file_path, selected_env
+                    file_path, selected_env, with_progress=True
+                )
+                worker.signals.progress.connect(
+                    lambda p: self.show_status_message(f"正在上传模型：{p}%", "info", 2000)
                 )
                 worker.signals.finished.connect(self.create_successbar)
                 worker.signals.error.connect(self.create_errorbar)
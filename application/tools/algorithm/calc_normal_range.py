@@ -6,10 +6,14 @@
 @time: 2025/6/27 09:06
 @desc: 
 """
+from collections import OrderedDict
+
 import numpy as np
 
 from sklearn.mixture import GaussianMixture
 from application.base import BaseTool
+from application.utils.jenks_engine import stratified_sample
+from application.utils.process_pool import check_cancelled
 
 
 class CalcNormalRange(BaseTool):
@@ -18,48 +22,157 @@ class CalcNormalRange(BaseTool):
     包含双向熵计算、K-means聚类、动态阈值调整等核心功能
     """
 
+    # 估计模式：fast 子样本 GMM（可热启动），full 全量 GMM，quantile 中位数/MAD
+    MODES = ("fast", "full", "quantile")
+    FAST_SAMPLE_SIZE = 5000  # fast 模式拟合 GMM 的分层抽样点数
+    FAST_N_INIT = 3  # fast 模式无热启动参数时的初始化次数
+    MAD_SCALE = 1.4826  # MAD 换算为正态分布标准差的系数
+
     def __init__(self):
         """初始化参数配置"""
         super().__init__()
 
-    def _robust_range(self, data, n_components=3, std_scale=3, weight_threshold=0.05):
-        data = np.asarray(data).reshape(-1, 1)
-
-        # 判断离散变量
-        unique_values = np.unique(data)
-        if len(unique_values) <= 10:
-            return [float(data.min()), float(data.max())]
+    def _trim_range(self, data, lower, upper):
+        """裁剪到 [lower, upper] 后的实际最小/最大值，裁剪后为空时用全量数据"""
+        trimmed = data[(data >= lower) & (data <= upper)]
+        if trimmed.size == 0:
+            trimmed = data
+        return [float(trimmed.min()), float(trimmed.max())]
 
-        # 拟合 GMM 模型（增强稳定性）
+    def _fit_gmm(self, data, n_components, weight_threshold, n_init=10, warm_start=None):
+        """
+        拟合 GMM，返回 (有效成分 [(均值, 标准差)], 模型参数)。
+        warm_start 为上一次拟合的模型参数，成分数一致时以其为初值只初始化一次。
+        """
+        check_cancelled()
+        init = {}
+        if warm_start is not None and len(warm_start["weights"]) == n_components:
+            init = {
+                "weights_init": warm_start["weights"],
+                "means_init": warm_start["means"],
+                "precisions_init": warm_start["precisions"],
+            }
+            n_init = 1
         gmm = GaussianMixture(
             n_components=n_components,
             random_state=0,
             max_iter=100,
-            n_init=10  # 多次初始化以选择最优解
+            n_init=n_init,  # 多次初始化以选择最优解
+            **init
         )
-        gmm.fit(data)
+        gmm.fit(data.reshape(-1, 1))
 
         # 提取有效成分（排除权重过小的成分）
-        valid_components = [
+        components = [
             (mean[0], std[0][0])
             for weight, mean, std in zip(gmm.weights_, gmm.means_, np.sqrt(gmm.covariances_))
             if weight >= weight_threshold
         ]
+        params = {
+            "weights": gmm.weights_,
+            "means": gmm.means_,
+            "precisions": gmm.precisions_,
+        }
+        return components, params
 
+    def _gmm_range(self, data, components, std_scale):
         # 计算全局动态范围
-        if valid_components:
-            lower = min(mean - std_scale * std for mean, std in valid_components)
-            upper = max(mean + std_scale * std for mean, std in valid_components)
+        if components:
+            lower = min(mean - std_scale * std for mean, std in components)
+            upper = max(mean + std_scale * std for mean, std in components)
         else:
             lower = float(data.min())
             upper = float(data.max())
+        return self._trim_range(data, lower, upper)
+
+    def _robust_range(self, data, n_components=3, std_scale=3, weight_threshold=0.05):
+        data = np.asarray(data).reshape(-1, 1)
+
+        # 判断离散变量
+        unique_values = np.unique(data)
+        if len(unique_values) <= 10:
+            return [float(data.min()), float(data.max())]
+
+        # 拟合 GMM 模型（增强稳定性）
+        components, _ = self._fit_gmm(data.ravel(), n_components, weight_threshold)
 
         # 裁剪数据
-        trimmed = data[(data >= lower) & (data <= upper)]
-        if trimmed.size == 0:
-            trimmed = data
+        return self._gmm_range(data.ravel(), components, std_scale)
 
-        return [float(trimmed.min()), float(trimmed.max())]
+    def _quantile_range(self, data, std_scale=3):
+        """
+        中位数 ± std_scale 倍稳健标准差（MAD × 1.4826）的范围，近乎瞬时。
+        MAD 为 0（超过一半的值相同）时改用 IQR 换算的标准差。
+        """
+        q1, median, q3 = np.percentile(data, [25, 50, 75])
+        sigma = self.MAD_SCALE * np.median(np.abs(data - median))
+        if sigma == 0:
+            sigma = (q3 - q1) / 1.349
+        if sigma == 0:
+            return [float(data.min()), float(data.max())]
+        return self._trim_range(data, median - std_scale * sigma, median + std_scale * sigma)
+
+    @staticmethod
+    def range_agreement(a, b, data) -> dict:
+        """
+        两个范围估计的一致性指标：
+        iou 为两区间的交并比；coverage_a/coverage_b 为各自覆盖的数据比例，coverage_diff 为二者之差的绝对值。
+        """
+        data = np.asarray(data).ravel()
+        inter = max(0.0, min(a[1], b[1]) - max(a[0], b[0]))
+        union = max(a[1], b[1]) - min(a[0], b[0])
+        coverage_a = float(np.mean((data >= a[0]) & (data <= a[1]))) if data.size else 0.0
+        coverage_b = float(np.mean((data >= b[0]) & (data <= b[1]))) if data.size else 0.0
+        return {
+            "iou": inter / union if union > 0 else 1.0,
+            "coverage_a": coverage_a,
+            "coverage_b": coverage_b,
+            "coverage_diff": abs(coverage_a - coverage_b),
+        }
+
+    def estimate(self, data, mode="fast", warm_start=None, reference=None,
+                 n_components=3, std_scale=3, weight_threshold=0.05) -> dict:
+        """
+        按模式估计正常范围。
+        参数：
+            data: 测点取值序列
+            mode: fast / full / quantile
+            warm_start: 同一测点上一次 GMM 拟合的参数（fast 模式使用）
+            reference: 用于计算一致性指标的 GMM 范围（quantile 模式使用，可为空）
+        返回：
+            {"range": [下限, 上限], "mode": 模式, "params": GMM 参数或 None,
+             "agreement": 与另一种估计的一致性指标或 None}
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        data = np.asarray(data, dtype=np.float64).ravel()
+        data = data[np.isfinite(data)]
+        result = {"range": [], "mode": mode, "params": None, "agreement": None}
+        if data.size == 0:
+            return result
+
+        # 判断离散变量
+        if np.unique(data).size <= 10:
+            result["range"] = [float(data.min()), float(data.max())]
+            return result
+
+        if mode == "quantile":
+            result["range"] = self._quantile_range(data, std_scale)
+            if reference:
+                result["agreement"] = self.range_agreement(reference, result["range"], data)
+            return result
+
+        if mode == "fast":
+            sample = stratified_sample(data, self.FAST_SAMPLE_SIZE)
+            components, params = self._fit_gmm(sample, n_components, weight_threshold,
+                                               n_init=self.FAST_N_INIT, warm_start=warm_start)
+        else:
+            components, params = self._fit_gmm(data, n_components, weight_threshold)
+        result["range"] = self._gmm_range(data, components, std_scale)
+        result["params"] = params
+        # 与分位数估计对比，便于判断分布是否适合快速估计
+        result["agreement"] = self.range_agreement(result["range"], self._quantile_range(data, std_scale), data)
+        return result
 
     def call(self, data: np.array, n_components=3, std_scale=3, weight_threshold=0.05):
         """
@@ -73,4 +186,46 @@ class CalcNormalRange(BaseTool):
         返回：
             高信息量时间段列表
         """
-        return self._robust_range(data, n_components, std_scale, weight_threshold)
\ No newline at end of file
+        return self._robust_range(data, n_components, std_scale, weight_threshold)
+
+
+class NormalRangeCache:
+    """
+    正常范围估计结果缓存（在界面进程中使用）。
+
+    结果按 (测点, 时间窗口, 采样数, 模式) 缓存，超过容量时淘汰最久未用的条目；
+    每个测点另外保存最近一次 GMM 拟合参数，供 fast 模式热启动。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._params = {}
+
+    def get(self, key):
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+        return result
+
+    def put(self, tag, key, result: dict):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        if result.get("params") is not None:
+            self._params[tag] = result["params"]
+
+    def warm_start(self, tag):
+        return self._params.get(tag)
+
+    def gmm_range(self, key_without_mode):
+        """同一测点与窗口下已缓存的 GMM 范围（优先全量），用于分位数估计的一致性对比"""
+        for mode in ("full", "fast"):
+            result = self._results.get(key_without_mode + (mode,))
+            if result is not None and result["range"]:
+                return result["range"]
+        return None
+
+
+normal_range_cache = NormalRangeCache()
@@ -9,12 +9,13 @@
 import numpy as np
 
 from typing import Dict, Tuple
-from jenkspy import jenks_breaks
 from kneed import KneeLocator
 from loguru import logger
 from matplotlib import pyplot as plt
 
 from application.base import BaseTool
+from application.utils.jenks_engine import JenksTable, stratified_sample
+from application.utils.process_pool import report_progress, check_cancelled
 
 
 class JenksBreakpoint(BaseTool):
@@ -64,25 +65,9 @@ class JenksBreakpoint(BaseTool):
         n = len(orig_data)
 
         # 智能数据抽样（保留分布特征）
+        sampled_data = stratified_sample(orig_data, sample_size, random_seed)
         if n > sample_size:
-            np.random.seed(random_seed)
-            stratify_bins = min(100, n // 100)  # 动态分层数
-            bins = np.linspace(orig_data.min(), orig_data.max(), stratify_bins)
-            digitized = np.digitize(orig_data, bins)
-
-            # 分层随机抽样
-            sampled_indices = []
-            for d in np.unique(digitized):
-                pool = np.where(digitized == d)[0]
-                if len(pool) == 0: continue
-                sample_num = min(max(1, int(sample_size * len(pool) / n)), len(pool))
-                sampled_indices.extend(np.random.choice(pool, sample_num, replace=False))
-            logger.info(f"数据量超过{sample_size}，进行智能采样采样长度: {len(sampled_indices)}")
-            # 确保抽样总数不超过目标
-            sampled_data = orig_data[sampled_indices]
-            logger.info(f"数据量从 {n} 抽样至 {sample_size}（分层抽样）")
-        else:
-            sampled_data = orig_data.copy()
+            logger.info(f"数据量从 {n} 抽样至 {len(sampled_data)}（分层抽样）")
 
         # 初始化指标存储
         k_values = list(range(2, max_k + 1))
@@ -98,19 +83,19 @@ class JenksBreakpoint(BaseTool):
         sst = np.sum((sampled_data - mean) ** 2)
         n = len(sampled_data)
 
+        # 一次动态规划得到所有 k 的自然间断点
+        check_cancelled()
+        table = JenksTable(sampled_data, max_k)
+
         # 遍历所有k值
         for i, k in enumerate(k_values):
-            # 计算自然间断点
-            breaks = jenks_breaks(sampled_data, n_classes=k)
+            check_cancelled()
+            report_progress(100 * i / len(k_values))
+            breaks = table.breaks(k)
             metrics['breaks_list'].append(breaks)
 
-            # 计算组内方差
-            classes = np.digitize(sampled_data, breaks[1:-1])  # 排除首尾断点
-            ssw = 0
-            for i in range(k):
-                class_data = sampled_data[classes == i]
-                if len(class_data) > 0:
-                    ssw += np.sum((class_data - np.mean(class_data)) ** 2)
+            # 计算组内方差（按 np.digitize 归类，前缀和计算）
+            ssw = table.digitized_ssw(breaks)
 
             # 计算评估指标
             gvf = (sst - ssw) / sst
@@ -164,8 +149,9 @@ class JenksBreakpoint(BaseTool):
 
         # 对每个工况进行Jenks自然间断点聚类
         n_class = 10
-        n_class = min(n_class, len(set(data)))
-        if len(set(data)) <= 5: return []
+        n_unique = np.unique(data).size
+        n_class = min(n_class, n_unique)
+        if n_unique <= 5: return []
         # 使用Jenks自然间断点算法
         best_k, metrics, best_breaks = self.find_optimal_jenks(data=data, max_k=n_class, return_plot=False)
 
@@ -8,13 +8,15 @@
 """
 import numpy as np
 
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, Union
 
 from loguru import logger
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import MinMaxScaler
 
 from application.base import BaseTool
+from application.utils.process_pool import report_progress, check_cancelled
+from application.utils.series_frame import SeriesFrame
 
 
 class TrainDataSelect(BaseTool):
@@ -31,7 +33,10 @@ class TrainDataSelect(BaseTool):
         self.win_weight = 0.5  # 动态窗口权重衰减系数
         self.max_iter = 100  # K-means最大迭代次数
 
-    def _entropy(self, col, bins=10):
+    ENTROPY_BINS = 10  # 熵计算的直方图区间数
+    CHUNK_ELEMENTS = 4_000_000  # 满窗口分块计算时每块的元素上限，控制内存
+
+    def _entropy(self, col, bins=ENTROPY_BINS):
         """计算单列数据的香农熵"""
         hist, _ = np.histogram(col, bins=bins, density=True)
         hist = hist[hist > 0]
@@ -40,53 +45,135 @@ class TrainDataSelect(BaseTool):
         p = hist / hist.sum()  # 归一化成概率
         return -np.sum(p * np.log2(p))  # ≥ 0
 
-    def _dynamic_window(self, ys_mat: np.ndarray, win: int) -> np.ndarray:
-        """动态窗口熵计算：覆盖早期数据"""
+    def _window_entropy(self, segs: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        批量计算一组窗口的熵之和（对所有列向量化），与逐列调用 _entropy 结果一致。
+
+        segs: 形状 (窗口数, 窗口长度, 列数) 的归一化数据；weights: 长度为窗口长度的位置权重。
+        每个 (窗口, 列) 的分箱范围为加权后的最小/最大值，分箱规则与 np.histogram 相同
+        （常数列范围扩展 ±0.5，最后一个区间为闭区间）。NaN 不参与计数。
+        返回形状 (窗口数,) 的各列熵之和。
+        """
+        bins = self.ENTROPY_BINS
+        m, _, k = segs.shape
+        # 保证 C 连续，下面按展平下标原地修正 index
+        weighted = np.ascontiguousarray(segs * weights[None, :, None])
+        has_nan = np.isnan(weighted).any()
+        if has_nan:
+            valid = ~np.isnan(weighted)
+            count = valid.sum(axis=1)  # (m, k)
+            first = np.where(valid, weighted, np.inf).min(axis=1)
+            last = np.where(valid, weighted, -np.inf).max(axis=1)
+            empty = count == 0
+            first[empty] = 0.0
+            last[empty] = 0.0
+        else:
+            count = np.full((m, k), weighted.shape[1])
+            first = weighted.min(axis=1)
+            last = weighted.max(axis=1)
+            empty = None
+        flat = first == last
+        first = np.where(flat, first - 0.5, first)[:, None, :]
+        last = np.where(flat, last + 0.5, last)[:, None, :]
+
+        values = np.where(valid, weighted, first) if has_nan else weighted
+        scaled = (values - first) * (bins / (last - first))
+        index = scaled.astype(np.int64)
+        # 与 np.histogram 相同的浮点边界修正，只有落在区间边界附近的值可能需要
+        frac = scaled - index
+        near = np.flatnonzero((frac < 1e-9) | (frac > 1 - 1e-9) | (index >= bins))
+        if near.size:
+            w, _, c = np.unravel_index(near, values.shape)
+            v = values.ravel()[near]
+            lo, hi = first[w, 0, c], last[w, 0, c]
+            step = (hi - lo) / bins
+            idx = index.ravel()[near]
+            idx[idx == bins] -= 1
+            idx -= v < lo + idx * step
+            upper = np.where(idx + 1 == bins, hi, lo + (idx + 1) * step)
+            idx += (v >= upper) & (idx != bins - 1)
+            index.ravel()[near] = idx
+
+        keys = (np.arange(m)[:, None, None] * k + np.arange(k)[None, None, :]) * bins + index
+        keys = keys[valid] if has_nan else keys.ravel()
+        counts = np.bincount(keys, minlength=m * k * bins).reshape(m, k, bins)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = counts / count[:, :, None]
+            ent = -np.where(counts > 0, p * np.log2(p), 0.0).sum(axis=2)
+        if empty is not None:
+            ent[empty] = 0.0
+        return ent.sum(axis=1)
+
+    def _dynamic_window(self, ys_mat: np.ndarray, win: int, progress: Tuple[float, float] = (0, 0)) -> np.ndarray:
+        """动态窗口熵计算：覆盖早期数据
+
+        第 i 个样本的熵取自其之前的 win 个样本 [i - win, i)，窗口内按位置施加指数衰减权重。
+        不足 win 的早期窗口逐个计算，满窗口按块批量计算，每块内所有窗口与列一次完成。
+        progress 为 (起始进度, 进度跨度)，每块计算完成后上报。
+        """
         scaler = MinMaxScaler()
         ys_norm = scaler.fit_transform(ys_mat)
-        ent = np.zeros(len(ys_mat))
+        n = len(ys_mat)
+        ent = np.zeros(n)
+        if n < 3:
+            return ent
 
         # 权重衰减曲线（指数衰减）
         weights = np.exp(-self.win_weight * np.linspace(0, 1, win))
 
-        for i in range(1, len(ys_mat)):
-            start = max(0, i - win)
-            seg = ys_norm[start:i]
-            if len(seg) < 2:
-                continue
-
-            # 加权熵计算
-            weighted_seg = seg * weights[:len(seg), None]
-            ent[i] = sum(self._entropy(weighted_seg[:, j])
-                         for j in range(seg.shape[1]))
+        # 早期窗口：[0, i)，长度不足 2 的窗口熵为 0
+        for i in range(2, min(win, n - 1) + 1):
+            ent[i] = self._window_entropy(ys_norm[None, :i], weights[:i])[0]
+
+        # 满窗口：i 从 win + 1 到 n - 1，窗口为 [i - win, i)
+        if win >= 2 and n - 1 > win:
+            windows = np.lib.stride_tricks.sliding_window_view(ys_norm, win, axis=0)  # (n-win+1, k, win)
+            windows = windows.transpose(0, 2, 1)
+            chunk = max(1, self.CHUNK_ELEMENTS // (win * ys_norm.shape[1]))
+            base, span = progress
+            for s in range(1, n - win, chunk):
+                check_cancelled()
+                e = min(s + chunk, n - win)
+                ent[s + win:e + win] = self._window_entropy(windows[s:e], weights)
+                report_progress(base + span * (e - 1) / (n - win - 1))
         return ent
 
     def _bidirectional_entropy(self, ys_mat: np.ndarray, win: int) -> np.ndarray:
         """双向熵计算：正向+反向滑动窗口"""
         # 正向熵值计算
-        forward_ent = self._dynamic_window(ys_mat, win)
+        forward_ent = self._dynamic_window(ys_mat, win, progress=(0, 45))
 
         # 反向熵值计算（反转数据后计算）
         reversed_ys = ys_mat[::-1]
-        backward_ent = self._dynamic_window(reversed_ys, win)[::-1]
+        backward_ent = self._dynamic_window(reversed_ys, win, progress=(45, 45))[::-1]
 
         # 合并正反结果（加权平均）
         combined_ent = (forward_ent + backward_ent) / 2
 
-        # 填充空值（用局部均值填充）
-        zero_indices = np.where(combined_ent == 0)[0]
-        if len(zero_indices) > 0:
-            for idx in zero_indices:
-                window_start = max(0, idx - win)
-                window_end = min(len(combined_ent), idx + win)
-                local_mean = np.mean(combined_ent[window_start:window_end])
-                combined_ent[idx] = local_mean if not np.isnan(local_mean) else 0.0
+        # 填充空值（用局部均值填充）：按顺序填充，已填充的值参与后续均值，
+        # 窗口 [idx - win, idx + win) 的和随 idx 右移增量维护
+        zero_indices = np.flatnonzero(combined_ent == 0)
+        n = len(combined_ent)
+        lo = hi = 0
+        total = 0.0
+        for idx in zero_indices:
+            start, end = max(0, idx - win), min(n, idx + win)
+            if start >= hi:
+                lo, hi, total = start, end, float(combined_ent[start:end].sum())
+            else:
+                total -= float(combined_ent[lo:start].sum())
+                total += float(combined_ent[hi:end].sum())
+                lo, hi = start, end
+            if end > start:
+                combined_ent[idx] = total / (end - start)
+                total += combined_ent[idx]  # 原值为 0
         return combined_ent
 
     def _cluster_analysis(self, ent_series: np.ndarray) -> np.ndarray:
         """K-means聚类分析：划分高低信息量区域"""
         # 数据有效性检查
-        valid_ent = ent_series[ent_series > self.min_entropy]
+        valid = ent_series > self.min_entropy
+        valid_ent = ent_series[valid]
         if len(valid_ent) == 0:
             logger.warning("无效熵值序列，返回全零聚类标签")
             return np.zeros_like(ent_series)
@@ -107,16 +194,46 @@ class TrainDataSelect(BaseTool):
         centers = kmeans.cluster_centers_.flatten()
         high_cluster = np.argmax(centers)
 
-        # 构建聚类标签掩码
-        cluster_mask = np.zeros_like(ent_series)
-        for i, val in enumerate(ent_series):
-            if val in valid_ent:
-                cluster_mask[i] = (kmeans.predict([[val]])[0] == high_cluster)
-        return cluster_mask.astype(int)
+        # 构建聚类标签掩码：有效熵值一次批量预测
+        cluster_mask = np.zeros(len(ent_series), dtype=int)
+        cluster_mask[valid] = kmeans.predict(X) == high_cluster
+        return cluster_mask
+
+    @staticmethod
+    def _run_length(flags: np.ndarray) -> np.ndarray:
+        """每个位置上以该位置结尾的连续 True 个数"""
+        idx = np.arange(len(flags))
+        last_false = np.maximum.accumulate(np.where(flags, -1, idx))
+        return idx - last_false
+
+    def _segment_states(self, good: np.ndarray, bad: np.ndarray, k_start: int, k_stop: int):
+        """
+        k_start/k_stop 滞回状态机的游程实现。
+
+        预先计算高质、低质标志的连续游程长度，进入/退出位置即为游程首次达到阈值处；
+        状态切换时计数清零，因此下一次切换位置还须距离上次切换至少 k 个窗口。
+        每个区段只需两次二分查找。返回 [(进入位置, 退出位置或 None)]，位置为 good/bad 中的下标。
+        """
+        enter_at = np.flatnonzero(self._run_length(good) >= k_start)
+        leave_at = np.flatnonzero(self._run_length(bad) >= k_stop)
+        states = []
+        last = -1  # 上次状态切换的位置
+        while True:
+            pos = np.searchsorted(enter_at, last + k_start)
+            if pos == len(enter_at):
+                break
+            enter = int(enter_at[pos])
+            pos = np.searchsorted(leave_at, enter + k_stop)
+            if pos == len(leave_at):
+                states.append((enter, None))
+                break
+            last = int(leave_at[pos])
+            states.append((enter, last))
+        return states
 
     def suggest_segments_stream(
             self,
-            data_dict: Dict[str, Tuple[np.ndarray, np.ndarray]],
+            data_dict: Union[SeriesFrame, Dict[str, Tuple[np.ndarray, np.ndarray]]],
             win: int = 300,
             k_start: int = 3,
             k_stop: int = 3,
@@ -125,7 +242,7 @@ class TrainDataSelect(BaseTool):
         """
         核心筛选算法：基于双向熵与聚类分析的状态机逻辑
         参数说明：
-            data_dict: 输入数据字典 {tag_name: (ts, ys)}
+            data_dict: 对齐的时序帧 SeriesFrame，或数据字典 {tag_name: (ts, ys)}（按时间戳对齐后计算，缺测为 NaN）
             win: 滑动窗口大小
             k_start: 进入区段所需的连续高质窗口数
             k_stop: 退出区段所需的连续低质窗口数
@@ -133,73 +250,54 @@ class TrainDataSelect(BaseTool):
         返回值：
             时间段列表 [(start_time, end_time)]
         """
-        # 数据预处理
-        ts = next(iter(data_dict.values()))[0]
-        ys = np.vstack([v[1] for v in data_dict.values()]).T
+        # 数据预处理：各测点按公共时间索引对齐，矩阵直接取自时序帧
+        frame = SeriesFrame.from_dict(data_dict)
+        if not len(frame) or not len(frame.index):
+            logger.warning("没有可用的测点数据")
+            return []
+        ts = frame.index
+        ys = frame.matrix()
 
         # 计算双向熵序列
         ent_series = self._bidirectional_entropy(ys, win)
 
         # 聚类分析获取高信息量掩码
+        check_cancelled()
         cluster_mask = self._cluster_analysis(ent_series)
+        report_progress(95)
 
         # 动态阈值计算（基于高信息量区域）
-        high_ent = [ent_series[i] for i in range(len(cluster_mask))
-                    if cluster_mask[i] == 1]
-        if not high_ent:
+        high_info = cluster_mask == 1
+        high_ent = ent_series[high_info]
+        if not high_ent.size:
             logger.warning("未检测到高信息量区域")
             return []
 
         t_high = np.mean(high_ent) + 0.5 * np.std(high_ent)
         t_low = np.mean(high_ent) - 1.5 * np.std(high_ent)
 
-        # 状态机逻辑（全量遍历）
+        # 状态机逻辑：缺失率超限的样本不参与计数
+        kept = np.flatnonzero(np.isnan(ys).mean(axis=1) <= nan_thr)
+        q = ent_series[kept]
+        good = (q >= t_high) & high_info[kept]
+        bad = (q <= t_low) | ~high_info[kept]
+
         segs = []
-        state = 'OUT'
-        start = None
-        good_cnt = bad_cnt = 0
-
-        for i in range(len(ts)):
-            # 缺失率检查
-            if np.isnan(ys[i]).mean() > nan_thr:
-                continue
-
-            # 当前窗口质量评估
-            q = ent_series[i]
-            is_high_info = bool(cluster_mask[i])
-
-            if state == 'OUT':
-                if q >= t_high and is_high_info:
-                    good_cnt += 1
-                else:
-                    good_cnt = 0
-                if good_cnt >= k_start:
-                    start = i - k_start + 1
-                    state = 'IN'
-                    bad_cnt = 0
-            else:  # IN_SEG
-                if q <= t_low or not is_high_info:
-                    bad_cnt += 1
-                else:
-                    bad_cnt = 0
-                if bad_cnt >= k_stop:
-                    end = i - k_stop + 1
-                    segs.append((ts[start], ts[end]))
-                    state = 'OUT'
-                    good_cnt = 0
-
-        # 处理未闭合的区段
-        if state == 'IN':
-            segs.append((ts[start], ts[-1]))
+        for enter, leave in self._segment_states(good, bad, max(k_start, 1), max(k_stop, 1)):
+            start = kept[enter] - k_start + 1
+            if leave is None:
+                segs.append((ts[start], ts[-1]))
+            else:
+                segs.append((ts[start], ts[kept[leave] - k_stop + 1]))
 
         logger.info(f"共检测到{len(segs)}个高信息量时间段")
         return segs
 
-    def call(self, data: dict, win=300, k_start=3, k_stop=3, nan_thr=0.05):
+    def call(self, data: Union[SeriesFrame, dict], win=300, k_start=3, k_stop=3, nan_thr=0.05):
         """
         对外接口方法
         参数：
-            data: 输入数据字典 {tag_name: (ts: np.ndarray, ys: np.ndarray)}
+            data: 对齐的时序帧 SeriesFrame，或数据字典 {tag_name: (ts: np.ndarray, ys: np.ndarray)}
             win: 滑动窗口大小
             k_start: 进入区段计数阈值
             k_stop: 退出区段计数阈值
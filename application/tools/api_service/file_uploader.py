@@ -8,72 +8,87 @@
 """
 import os
 import tempfile
-import zipfile
-from typing import Optional, Dict
+from typing import Optional, Dict, Union, Callable
 import httpx
 from loguru import logger
 
 from application.base import BaseTool
+from application.utils.series_frame import SeriesFrame
+from application.utils.trend_store import save_trends
+from application.utils.upload_stream import (
+    CHUNK_SIZE, UPLOAD_READ_TIMEOUT, iter_upload_source, post_chunks, post_stream, upload_identifier,
+    upload_name, upload_timeout
+)
 
 
 class DatasetUploader(BaseTool):
     """
     DatasetUploader 用于：
-      1. 上传本地文件或文件夹到 dataset/upload 接口（自动压缩为 ZIP），获取返回的 data.filePath 和 data.fileName。
+      1. 上传本地文件或文件夹到 dataset/upload 接口（边压缩为 ZIP 边上传，不生成临时文件），获取返回的 data.filePath 和 data.fileName。
+         也可以直接传入趋势数据（SeriesFrame 或 {测点名: (ts, ys)}），先保存为 Parquet 再上传。
+         配置了 chunk_path 与 merge_path 时改为分片上传，源文件未修改时再次上传可跳过服务端已有的分片。
       2. 调用 dataset/add 接口，保存一条记录（表单 form-data 方式）。
     """
 
     def __init__(self, base_url: str, api_key: str = "", upload_path: str = "/rest/di/dataset/upload",
-                 add_path: str = "/rest/di/dataset/add", **kwargs):
+                 add_path: str = "/rest/di/dataset/add", chunk_path: str = None, merge_path: str = None,
+                 chunk_size: int = CHUNK_SIZE, upload_read_timeout: float = UPLOAD_READ_TIMEOUT, **kwargs):
         super().__init__()
         self.base_url = base_url.rstrip("/")
         self.upload_path = upload_path
         self.add_path = add_path
+        self.chunk_path = chunk_path
+        self.merge_path = merge_path
+        self.chunk_size = int(chunk_size)
+        self.upload_read_timeout = upload_read_timeout
         self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
 
-    def _ensure_zip(self, input_path: str) -> (str, bool):
-        """
-        如果输入不是 ZIP 文件，则自动压缩（文件或目录）为临时 ZIP。
-        返回 (zip_path, is_temp)，is_temp 表示是否为临时文件，需要上传后删除。
-        """
-        if os.path.isfile(input_path) and input_path.lower().endswith(".zip"):
-            return input_path, False
+    def _save_trend_source(self, data, file_name: str) -> str:
+        """把趋势数据保存为临时目录下的 Parquet 文件，返回文件路径"""
+        tmp_dir = tempfile.mkdtemp()
+        stem = os.path.splitext(os.path.basename(file_name or "trend_data"))[0]
+        return save_trends(os.path.join(tmp_dir, f"{stem}.parquet"), data)
 
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
-        tmp_zip_path = tmp.name
-        tmp.close()
-
-        with zipfile.ZipFile(tmp_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
-            if os.path.isfile(input_path):
-                zipf.write(input_path, arcname=os.path.basename(input_path))
-            else:
-                for root, dirs, files in os.walk(input_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, start=input_path)
-                        zipf.write(file_path, arcname=arcname)
+    def _upload(self, file_path: str, progress_callback: Callable = None) -> dict:
+        """发送文件/文件夹的 ZIP 字节流，返回上传接口的响应 JSON"""
+        name = upload_name(file_path)
+        content = iter_upload_source(file_path, progress_callback)
+        timeout = upload_timeout(self.timeout, self.upload_read_timeout)
+        if self.chunk_path and self.merge_path:
+            return post_chunks(
+                f"{self.base_url}{self.chunk_path}", f"{self.base_url}{self.merge_path}", self.headers, name,
+                content, upload_identifier(file_path, self.chunk_size), chunk_size=self.chunk_size, timeout=timeout
+            )
+        return post_stream(f"{self.base_url}{self.upload_path}", self.headers, name, content, timeout=timeout)
 
-        logger.info(f"已自动压缩为 ZIP: {tmp_zip_path}")
-        return tmp_zip_path, True
-
-    def upload_file(self, file_path: str) -> Optional[Dict[str, str]]:
+    def upload_file(self, file_path: Union[str, SeriesFrame, dict], file_name: str = None,
+                    progress_callback: Callable = None) -> Optional[Dict[str, str]]:
         """
-        上传文件/文件夹，自动压缩ZIP后上传，返回 {'filePath': ..., 'fileName': ...} 或 None
+        上传文件/文件夹，边压缩ZIP边上传，返回 {'filePath': ..., 'fileName': ...} 或 None。
+        file_path 为趋势数据时先保存为 Parquet（文件名取 file_name），上传后删除。
+        progress_callback 接收 0~100 的上传进度（按已读取的源文件字节数计算）。
         """
+        if not isinstance(file_path, str):
+            try:
+                trend_path = self._save_trend_source(file_path, file_name)
+            except Exception as exc:
+                logger.error(f"趋势数据保存为 Parquet 失败：{exc}")
+                return None
+            try:
+                return self.upload_file(trend_path, progress_callback=progress_callback)
+            finally:
+                try:
+                    os.remove(trend_path)
+                    os.rmdir(os.path.dirname(trend_path))
+                except Exception:
+                    pass
+
         if not os.path.exists(file_path):
             logger.error(f"路径不存在：{file_path}")
             return None
 
-        zip_path, is_temp = self._ensure_zip(file_path)
-        url = f"{self.base_url}{self.upload_path}"
         try:
-            with open(zip_path, "rb") as f:
-                files = {"file": (os.path.basename(zip_path), f)}
-                with httpx.Client(timeout=self.timeout, verify=False) as client:
-                    resp = client.post(url, headers=self.headers, files=files)
-                resp.raise_for_status()
-                result = resp.json()
-
+            result = self._upload(file_path, progress_callback)
             if result.get("state") == "success" and isinstance(result.get("data"), dict):
                 data = result["data"]
                 fp = data.get("filePath")
@@ -90,13 +105,6 @@ class DatasetUploader(BaseTool):
             logger.error(f"上传 HTTP 错误：{exc}")
         except Exception as exc:
             logger.error(f"上传时其他错误：{exc}")
-        finally:
-            if is_temp:
-                try:
-                    os.remove(zip_path)
-                    logger.debug(f"已删除临时ZIP: {zip_path}")
-                except Exception:
-                    pass
         return None
 
     def save_record(
@@ -141,16 +149,18 @@ class DatasetUploader(BaseTool):
 
     def call(
             self,
-            file_path: str,
+            file_path: Union[str, SeriesFrame, dict],
             dataset_name: str,
             dataset_desc: str,
             tree_name: str,
             tree_no: str,
+            progress_callback: Callable = None,
     ) -> dict:
         """
-        一体化：先上传文件，再保存记录
+        一体化：先上传文件，再保存记录。
+        file_path 可以是本地文件/文件夹，也可以直接是趋势数据（SeriesFrame 或 {测点名: (ts, ys)}）。
         """
-        info = self.upload_file(file_path)
+        info = self.upload_file(file_path, file_name=dataset_name, progress_callback=progress_callback)
         if not info:
             logger.error("上传文件失败，无法保存记录")
             return {}
@@ -8,13 +8,16 @@
 """
 import json
 import os
-import tempfile
 import zipfile
+from typing import Callable
 
 import httpx
 from loguru import logger
 
 from application.base import BaseTool
+from application.utils.upload_stream import (
+    CHUNK_SIZE, UPLOAD_READ_TIMEOUT, iter_file, post_chunks, post_stream, upload_identifier, upload_timeout
+)
 
 
 class ModelUploader(BaseTool):
@@ -24,32 +27,43 @@ class ModelUploader(BaseTool):
       2. 调用 dataset/add 接口，保存一条记录（表单 form-data 方式）。
     """
 
-    def __init__(self, base_url: str, api_key: str, upload_path: str, del_path: str, env_path: str, **kwargs):
+    def __init__(self, base_url: str, api_key: str, upload_path: str, del_path: str, env_path: str,
+                 chunk_path: str = None, merge_path: str = None, chunk_size: int = CHUNK_SIZE,
+                 upload_read_timeout: float = UPLOAD_READ_TIMEOUT, **kwargs):
         super().__init__()
         self.base_url = base_url.rstrip("/")
         self.upload_path = upload_path
         self.del_path = del_path
         self.env_path = env_path
+        # 配置了 chunk_path 与 merge_path 时分片上传，协议见 post_chunks
+        self.chunk_path = chunk_path
+        self.merge_path = merge_path
+        self.chunk_size = int(chunk_size)
+        self.upload_read_timeout = upload_read_timeout
         self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
 
     def get_model_id(self, file_path: str):
         """
-        解压 ZIP 文件到临时目录，读取 diFlow.json 中的模型 ID。
-        解压目录在使用完毕后会自动删除。
+        直接从 ZIP 中读取 diFlow.json 的模型 ID，不解压其它文件。
         """
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 解压到临时目录
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-
-            # 构造 diFlow.json 路径
-            json_path = os.path.join(temp_dir, "diFlow.json")
-
-            # 读取模型 ID
-            with open(json_path, 'r', encoding="utf-8") as f:
-                model_id = json.load(f)["flowNo"]
-
-            return model_id
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            with zip_ref.open("diFlow.json") as f:
+                return json.load(f)["flowNo"]
+
+    def _upload(self, file_path: str, progress_callback: Callable = None) -> dict:
+        """按块发送模型 ZIP，返回上传接口的响应 JSON"""
+        name = os.path.basename(file_path)
+        fields = {"fileName": name, "treeId": 0, "unitType": 0}
+        content = iter_file(file_path, progress_callback)
+        timeout = upload_timeout(self.timeout, self.upload_read_timeout)
+        if self.chunk_path and self.merge_path:
+            return post_chunks(
+                f"{self.base_url}{self.chunk_path}", f"{self.base_url}{self.merge_path}", self.headers, name,
+                content, upload_identifier(file_path, self.chunk_size), fields=fields,
+                chunk_size=self.chunk_size, timeout=timeout
+            )
+        return post_stream(f"{self.base_url}{self.upload_path}", self.headers, name, content,
+                           fields=fields, timeout=timeout)
 
     def del_duplicate(
             self,
@@ -101,37 +115,26 @@ class ModelUploader(BaseTool):
     def call(
             self,
             file_path: str,
-            env_id: str = None
+            env_id: str = None,
+            progress_callback: Callable = None,
     ) -> str:
         """
-        上传文件/文件夹，自动压缩ZIP后上传，返回 {'filePath': ..., 'fileName': ...} 或 None
+        上传模型 ZIP 并关联运行环境，progress_callback 接收 0~100 的上传进度
         """
         if not os.path.exists(file_path):
             raise Exception(f"路径不存在：{file_path}")
             return None
 
-        url = f"{self.base_url}{self.upload_path}"
         try:
             model_id = self.get_model_id(file_path)
-            with open(file_path, "rb") as f:
-                files = {
-                    "file": (os.path.basename(file_path), f)
-                }
-                data = {
-                    "fileName": os.path.basename(file_path),
-                    "treeId": 0, "unitType": 0
-                }
-                with httpx.Client(timeout=self.timeout, verify=False) as client:
-                    resp = client.post(url, headers=self.headers, files=files, data=data)
-                resp.raise_for_status()
-                result = resp.json()
+            result = self._upload(file_path, progress_callback)
 
             if result.get("state") == "success":
                 logger.info(f"模型模板上传成功！")
 
             elif result.get("state") == "error" and result.get("message") == "请勿导入重复模型！":
                 self.del_duplicate(model_id)
-                self.call(file_path)
+                return self.call(file_path, env_id, progress_callback)
 
             # 关联模型运行环境
             self._link_new_model_env(model_id, env_id)
@@ -1,3 +1,6 @@
+import hashlib
+import threading
+import time
 from collections import defaultdict
 
 import httpx
@@ -9,11 +12,21 @@ from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 
 from application.base import BaseTool
+from application.utils.point_catalog import get_point_catalog
+
+SEARCH_PAGE_SIZE = 200  # 远程搜索每页条数
+SEARCH_RESULT_TYPE = "时序库参数"  # 远程搜索结果的测点类型
+SYNC_MAX_AGE = 3600  # 同步分组（设备 × 测点类型）的默认最长有效期（秒），未过期的分组不重新请求
+SYNC_SOURCE = "point-search"  # 同步结果写入测点目录时的来源
 
 
 class PointSearcher(BaseTool):
     """
     支持单个或多个 point_path，并行 fetch 测点，增加设备名称获取的容错重试。
+
+    全量测点按 (测点类型, 设备) 分组增量同步到测点目录：
+    每个分组记录内容哈希、ETag/Last-Modified 与拉取时间，只重新请求超过 sync_max_age 的分组，
+    请求时带条件头（304 视为未变），响应内容哈希不变时不解析、不写目录。
     """
 
     def __init__(
@@ -24,6 +37,7 @@ class PointSearcher(BaseTool):
             point_path: Dict[str, str],
             max_workers: int = 10,
             tag_info_search: str = "",
+            sync_max_age: float = SYNC_MAX_AGE,
             **kwargs
     ):
         super().__init__()
@@ -34,9 +48,12 @@ class PointSearcher(BaseTool):
         self.point_paths = point_path
         self.tag_info_search = tag_info_search
         self.max_workers = max_workers
+        self.sync_max_age = float(sync_max_age)
+        self._sync_lock = threading.Lock()  # 同一搜索器同时只进行一次同步
         # 获取设备映射，自动重试
         try:
             self._dev_name_dict = self._get_dev_name()
+            self._dev_fetched_at = time.time()
         except:
             import traceback
             raise Exception(f"设备名获取失败！")
@@ -76,21 +93,35 @@ class PointSearcher(BaseTool):
             logger.warning(f"发现重复ID: {', '.join(duplicates)}")
         return result
 
-    def _fetch_single_dev_points(
-            self,
-            dev_name: str,
-            param_type: str,
-            point_path: str
-    ) -> List[Dict[str, str]]:
+    def _fetch_group(self, dev_name: str, param_type: str, point_path: str, state: dict):
+        """
+        条件请求一个同步分组。
+        返回 (新状态, 测点列表)：内容未变时测点列表为 None，请求失败时新状态也为 None（下次重试）。
+        """
+        headers = dict(self.headers)
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
         try:
             with httpx.Client(base_url=self.base_url, timeout=self.timeout, verify=False) as client:
-                resp = client.get(point_path, headers=self.headers)
-                resp.raise_for_status()
-                data = resp.json()
-                return self._parse_param(data, dev_name, param_type)
+                resp = client.get(point_path, headers=headers)
+            fetched_at = time.time()
+            if resp.status_code == 304:
+                return dict(state, fetched_at=fetched_at), None
+            resp.raise_for_status()
+            new_state = {
+                "hash": hashlib.sha1(resp.content).hexdigest(),
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at": fetched_at,
+            }
+            if new_state["hash"] == state.get("hash"):
+                return new_state, None
+            return new_state, self._parse_param(resp.json(), dev_name, param_type)
         except Exception as e:
             logger.warning(f"[{param_type}|{dev_name}|{point_path}] 请求失败：{e}")
-            return []
+            return None, None
 
     def _parse_param(
             self,
@@ -146,70 +177,107 @@ class PointSearcher(BaseTool):
 
         return point_list
 
-    def _search_tags_info(self, search_text: str):
+    def search_page(self, search_text: str, skip_count: int = 0, max_result_count: int = SEARCH_PAGE_SIZE):
+        """
+        按关键词分页搜索时序库测点。
+        返回 ({"时序库参数": [测点字典, ...]}, 匹配总数)。
+        """
+        params = {
+            "query": search_text,
+            "skipCount": skip_count,
+            "maxResultCount": max_result_count
+        }
         try:
-            params = {
-                "query": search_text,
-                "skipCount": 0,
-                "maxResultCount": 1000
-            }
             with httpx.Client(base_url=self.base_url, timeout=self.timeout, verify=False) as client:
                 resp = client.get(self.tag_info_search, params=params, headers=self.headers)
             resp.raise_for_status()
             data = resp.json()
-            if data["result"]["totalCount"] > 0:
-                logger.info(f"搜索测点名请求成功: {data['result']['totalCount']} 条记录")
-                return [
-                    {
-                        "测点名": item["name"],
-                        "测点描述": item["desc"]
-                    } for item in data["result"]["items"]
-                ]
-            return []
         except Exception as e:
-            logger.warning(f"获取设备名称失败，重试中: {e}")
-            # 重试由 tenacity 处理，若超出重试将抛出
+            logger.warning(f"搜索测点名请求失败: {e}")
             raise
+        total = data["result"]["totalCount"]
+        items = [
+            {
+                "测点名": item["name"],
+                "测点描述": item["desc"]
+            } for item in data["result"]["items"]
+        ] if total > 0 else []
+        logger.info(f"搜索测点名请求成功: 第 {skip_count + 1}~{skip_count + len(items)} 条，共 {total} 条记录")
+        return {SEARCH_RESULT_TYPE: items}, total
 
-    def call(self, **kwargs) -> Dict[str, List[Dict[str, str]]]:
+    def _search_tags_info(self, search_text: str, max_result_count: int = 1000):
+        return self.search_page(search_text, 0, max_result_count)[0][SEARCH_RESULT_TYPE]
+
+    def _sync_groups(self):
+        """全部同步分组 {分组键: (设备名, 测点类型, 请求路径)}"""
+        groups = {}
+        for ptype, path in self.point_paths.items():
+            if "&devNo=" in path:
+                for dev_id, dev_name in self._dev_name_dict.items():
+                    url = path.replace("&devNo=", f"&devNo={dev_id}")
+                    groups[f"{self.base_url}|{ptype}|{url}"] = (dev_name, ptype, url)
+            else:
+                groups[f"{self.base_url}|{ptype}|{path}"] = (None, ptype, path)
+        return groups
+
+    def sync(self, force: bool = False, max_age: float = None) -> Dict[str, List[Dict[str, str]]]:
         """
-        并发搜索所有 dev_id 与所有 point_paths 组合的测点。
-        若设备名称加载失败，会抛出异常。
+        增量同步全量测点到测点目录，返回本次新增或内容有变化的分组的测点 {测点类型: [测点字典, ...]}。
+        force 为 True 时忽略有效期，对所有分组发起（条件）请求；max_age 为空时使用 sync_max_age。
         """
-        if "search_text" in kwargs:
-            return {"时序库参数" : self._search_tags_info(kwargs["search_text"])}
-        else:
+        max_age = self.sync_max_age if max_age is None else max_age
+        with self._sync_lock:
+            now = time.time()
+            # 设备树同样按有效期刷新，失败时沿用旧的设备映射
+            if force or now - self._dev_fetched_at > max_age:
+                try:
+                    self._dev_name_dict = self._get_dev_name()
+                    self._dev_fetched_at = now
+                except Exception:
+                    pass
+
+            catalog = get_point_catalog()
+            states = catalog.sync_state(SYNC_SOURCE)
+            groups = self._sync_groups()
+            stale = {
+                key: group for key, group in groups.items()
+                if force or now - (states.get(key, {}).get("fetched_at") or 0) > max_age
+            }
+            if not stale:
+                logger.debug(f"测点目录已是最新（{len(groups)} 个分组均未过期）")
+                return {}
 
-            logger.info("开始并发搜索测点信息...")
+            logger.info(f"开始增量同步测点信息：{len(stale)}/{len(groups)} 个分组需要更新...")
             results = defaultdict(list)
+            new_states = {}
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures_dict = defaultdict(list)
-                for ptype, path in self.point_paths.items():
-                    if "&devNo=" in path:
-                        for dev_id, dev_name in self._dev_name_dict.items():
-                            future = executor.submit(
-                                self._fetch_single_dev_points,
-                                dev_name, ptype, path.replace("&devNo=", f"&devNo={dev_id}")
-                            )
-                            futures_dict[ptype].append(future)
-                    else:
-                        future = executor.submit(
-                            self._fetch_single_dev_points,
-                            None, ptype, path
-                        )
-
-                        futures_dict[ptype].append(future)
-
-                for ptype in futures_dict:
-                    for fut in as_completed(futures_dict[ptype]):
-                        try:
-                            data = fut.result()
-                            if len(data) == 0: continue
-                            results[ptype].extend(data)
-                        except Exception as e:
-                            raise Exception(f"搜索任务异常：{e}")
-            results = sorted(results.items(), key=lambda x: x[0])
-            results = {ptype: item for ptype, item in results}
-            logger.info(f"搜索完成，总共 {sum([len(item) for _, item in results.items()])} 条测点")
-
-        return results
\ No newline at end of file
+                futures = {
+                    executor.submit(self._fetch_group, dev_name, ptype, url, states.get(key, {})): (key, ptype)
+                    for key, (dev_name, ptype, url) in stale.items()
+                }
+                for fut in as_completed(futures):
+                    key, ptype = futures[fut]
+                    state, points = fut.result()
+                    if state is not None:
+                        new_states[key] = state
+                    if points:
+                        results[ptype].extend(points)
+
+            results = {ptype: results[ptype] for ptype in sorted(results)}
+            # 先写测点再写状态：测点写入失败时 upsert 抛出异常，状态不保存，下次仍会重新拉取
+            changed = catalog.upsert(results, source=SYNC_SOURCE) if results else 0
+            catalog.set_sync_state(SYNC_SOURCE, new_states)
+            logger.info(
+                f"同步完成：{len(new_states)}/{len(stale)} 个分组请求成功，"
+                f"{sum(len(item) for item in results.values())} 条测点来自有变化的分组，目录更新 {changed} 条"
+            )
+            return results
+
+    def call(self, **kwargs) -> Dict[str, List[Dict[str, str]]]:
+        """
+        search_text 不为空时按关键词搜索时序库测点；
+        否则增量同步所有 dev_id 与所有 point_paths 组合的测点（见 sync），返回有变化的测点。
+        """
+        if "search_text" in kwargs:
+            return {SEARCH_RESULT_TYPE: self._search_tags_info(kwargs["search_text"])}
+        return self.sync(force=kwargs.get("force", False))
@@ -1,3 +1,5 @@
+import sqlite3
+
 import httpx
 
 from loguru import logger
@@ -7,6 +9,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 
 from application.base import BaseTool
+from application.utils.point_catalog import get_point_catalog
+
+SYNC_SOURCE = "rtsp-search"  # 搜索结果写入测点目录时的来源
 
 
 class RTSPSearcher(BaseTool):
@@ -103,7 +108,7 @@ class RTSPSearcher(BaseTool):
 
     def call(self, **kwargs) -> Dict[str, Dict[str, str]]:
         """
-        并发搜索所有 dev_id 与所有 point_paths 组合的测点。
+        并发搜索所有 dev_id 与所有 point_paths 组合的测点，并将结果写入测点目录（与 PointSearcher.sync 一致，在调用线程中完成）。
         若设备名称加载失败，会抛出异常。
         """
         logger.info("开始并发搜索测点信息...")
@@ -128,5 +133,12 @@ class RTSPSearcher(BaseTool):
                     except Exception as e:
                         raise Exception(f"搜索任务异常：{e}")
         logger.info(f"搜索完成，总共 {sum([len(item) for _, item in results.items()])} 条测点")
+        if results:
+            try:
+                changed = get_point_catalog().upsert(results, source=SYNC_SOURCE)
+                logger.info(f"摄像头测点已写入测点目录，更新 {changed} 条")
+            except sqlite3.Error:
+                # upsert 已记录错误并回滚，目录保持原样，下次搜索时重新写入
+                pass
 
         return results
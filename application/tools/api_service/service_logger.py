@@ -14,6 +14,53 @@ from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_t
 from application.base import BaseTool
 
 
+class LogTailer:
+    """
+    日志增量跟踪器：记录已消费内容的偏移量，每次只返回新增的完整行。
+
+    偏移量始终落在换行符之后，末尾未换行的半行作为 pending 单独返回，
+    下次刷新时再补全。通过偏移量前一段内容的指纹判断日志是否被截断或轮转，
+    不一致时从头重新读取。
+    """
+
+    def __init__(self, fingerprint_size: int = 256):
+        self.fingerprint_size = fingerprint_size
+        self.offset = 0  # 已消费的字符偏移量（行对齐）
+        self.line_count = 0  # 已消费的完整行数
+        self._fingerprint = ""
+
+    def reset(self):
+        self.offset = 0
+        self.line_count = 0
+        self._fingerprint = ""
+
+    def feed(self, text: str):
+        """
+        输入最新的完整日志内容，返回增量。
+
+        :return: (reset, lines, pending)
+                 reset 为 True 表示日志被截断/轮转，调用方需清空已有内容；
+                 lines 为新增的完整行；pending 为末尾尚未换行的半行。
+        """
+        reset = False
+        if self.offset:
+            start = self.offset - len(self._fingerprint)
+            if len(text) < self.offset or text[start:self.offset] != self._fingerprint:
+                self.reset()
+                reset = True
+
+        end = text.rfind("\n", self.offset) + 1
+        if end > 0:
+            lines = text[self.offset:end - 1].split("\n")
+            self.offset = end
+            self.line_count += len(lines)
+            self._fingerprint = text[max(0, end - self.fingerprint_size):end]
+        else:
+            lines = []
+        pending = text[self.offset:]
+        return reset, [line.rstrip("\r") for line in lines], pending
+
+
 class ServiceLogger(BaseTool):
     """
     用于查询服务日志的类，依赖服务搜索器的配置。
@@ -93,6 +140,16 @@ class ServiceLogger(BaseTool):
         logger.info(f"获取日志成功，内容长度: {len(log_content)} 字符")
         return log_content
 
+    def tail(self, service_version_id: str, tailer: LogTailer):
+        """
+        增量获取日志：日志接口只支持整体下载，这里在工作线程中按偏移量切出新增行，
+        界面线程只处理增量部分。
+
+        :return: (service_version_id, reset, lines, pending)
+        """
+        log_content = self.call(service_version_id) or ""
+        return (service_version_id, *tailer.feed(log_content))
+
 
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
-import httpx
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
+import numpy as np
 from PyQt5.QtCore import QObject, pyqtSignal, QRunnable
 from tenacity import (
     retry,
@@ -11,14 +14,89 @@ from tenacity import (
 )
 
 
+def build_payloads(points: list, values_list: list, ts_list: list = None):
+    """按行惰性构造请求体，避免一次性生成全部 payload
+
+    :param points: 测点名列表
+    :param values_list: 与 points 一一对应的取值序列，可为任意可迭代对象（如 itertools.repeat）
+    :param ts_list: 时间戳序列，仅用于确定行数；为空时取最短取值序列长度（此时取值序列需支持 len）
+    """
+    n_rows = len(ts_list) if ts_list is not None else min((len(v) for v in values_list), default=0)
+    for row in islice(zip(*values_list), n_rows):
+        yield {"data": dict(zip(points, row))}
+
+
+class ReplayStats:
+    """回放/压测统计：吞吐量、错误率与延迟分布"""
+
+    def __init__(self, bins: int = 20):
+        self.bins = bins
+        self.latencies = []
+        self.success = 0
+        self.errors = 0
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def add(self, latency: float, ok: bool):
+        self.latencies.append(latency)
+        if ok:
+            self.success += 1
+        else:
+            self.errors += 1
+
+    def finish(self):
+        self.end_time = time.perf_counter()
+
+    def report(self) -> dict:
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        duration = max(end - self.start_time, 1e-9)
+        total = self.success + self.errors
+        report = {
+            "total": total,
+            "success": self.success,
+            "errors": self.errors,
+            "error_rate": self.errors / total if total else 0.0,
+            "duration_s": duration,
+            "requests_per_sec": total / duration,
+        }
+        if not self.latencies:
+            return report
+
+        lat_ms = np.asarray(self.latencies, dtype=np.float64) * 1000
+        p50, p90, p95, p99 = np.percentile(lat_ms, [50, 90, 95, 99])
+        counts, edges = np.histogram(lat_ms, bins=min(self.bins, max(1, len(lat_ms))))
+        report.update({
+            "latency_ms": {
+                "min": float(lat_ms.min()),
+                "mean": float(lat_ms.mean()),
+                "p50": float(p50),
+                "p90": float(p90),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(lat_ms.max()),
+            },
+            "latency_histogram": {
+                "edges_ms": [round(float(e), 3) for e in edges],
+                "counts": counts.tolist(),
+            },
+        })
+        return report
+
+
 class ServiceTestFetchWorkerSignals(QObject):
     new_segment = pyqtSignal(int, dict)  # (segment_index, {point: value})
+    failed = pyqtSignal(int, str)  # (segment_index, error)
+    progress = pyqtSignal(int, int)  # (已完成, 总数)
+    report = pyqtSignal(dict)  # 回放结束后的统计报告
     finished = pyqtSignal()
 
 
 class ServiceTestFetchWorker(QRunnable):
+    PROGRESS_INTERVAL = 0.1  # 进度信号最小发送间隔（秒），避免逐行刷新界面
+
     def __init__(
-        self, testor, service_url: str, points: list, values_list: list, ts_list: list
+        self, testor, service_url: str, points: list, values_list: list, ts_list: list,
+        max_in_flight: int = None, ordered: bool = False
     ):
         super().__init__()
         self.testor = testor
@@ -26,6 +104,8 @@ class ServiceTestFetchWorker(QRunnable):
         self.points = points
         self.values_list = values_list
         self.ts_list = ts_list
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
         self.signals = ServiceTestFetchWorkerSignals()
         self._cancelled = False
 
@@ -35,22 +115,32 @@ class ServiceTestFetchWorker(QRunnable):
             self.testor.cancel()
 
     def run(self):
-        data_list = [
-            {
-                "data": {
-                    name: vals[i] for name, vals in zip(self.points, self.values_list)
-                }
-            }
-            for i in range(len(self.ts_list))
-        ]
+        total = len(self.ts_list)
+        stats = ReplayStats()
+        done = 0
+        last_progress = 0.0
         try:
-            for idx, segment in self.testor.test(self.service_url, data_list):
+            payloads = build_payloads(self.points, self.values_list, self.ts_list)
+            for idx, segment, error, latency in self.testor.stream(
+                self.service_url, payloads, max_in_flight=self.max_in_flight, ordered=self.ordered
+            ):
                 if self._cancelled:
                     break
-                self.signals.new_segment.emit(idx, segment)
+                stats.add(latency, error is None)
+                done += 1
+                if error is None:
+                    self.signals.new_segment.emit(idx, segment if isinstance(segment, dict) else {})
+                else:
+                    self.signals.failed.emit(idx, error)
+                now = time.perf_counter()
+                if now - last_progress >= self.PROGRESS_INTERVAL or done == total:
+                    last_progress = now
+                    self.signals.progress.emit(done, total)
         except Exception as e:
             print(f"ServiceTestFetchWorker 异常: {e}")
         finally:
+            stats.finish()
+            self.signals.report.emit(stats.report())
             self.signals.finished.emit()
 
 
@@ -69,16 +159,87 @@ class ServicesTest:
         names = [item["paramName"] for item in data["outputParams"]]
         return {name: val for name, val in zip(names, data_list)}
 
-    def _test_single(self, path, data) -> dict:
+    def _test_single(self, path, data, client: httpx.Client = None) -> dict:
         if self._cancelled:
             raise Exception("Task cancelled")  # 主动抛异常，停止重试
-        with httpx.Client(timeout=self.timeout, verify=False) as client:
-            resp = client.post(path, json=data)
-            resp.raise_for_status()
-            if resp.json()["data"].get("flag", False):
-                return self._construct_response(resp.json())
-            else:
-                return resp.json()
+        if client is None:
+            with httpx.Client(timeout=self.timeout, verify=False) as client:
+                return self._test_single(path, data, client)
+        resp = client.post(path, json=data)
+        resp.raise_for_status()
+        if resp.json()["data"].get("flag", False):
+            return self._construct_response(resp.json())
+        else:
+            return resp.json()
+
+    def _timed_single(self, path, data, client):
+        """返回 (结果, 错误信息, 耗时秒数)，不抛异常"""
+        start = time.perf_counter()
+        try:
+            res = self._test_single(path, data, client)
+            error = None
+            # flag 为 False 时服务返回的是原始响应，视为调用失败
+            if isinstance(res, dict) and isinstance(res.get("data"), dict) and res["data"].get("flag") is False:
+                error = str(res["data"].get("result", "服务调用失败"))
+            return res, error, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+
+    def stream(self, service: str, payloads, max_in_flight: int = None, ordered: bool = False):
+        """流式回放：惰性消费 payloads，保持最多 max_in_flight 个请求在途
+
+        逐条产出 (idx, result, error, latency)；ordered=True 时按输入顺序产出，
+        否则按完成顺序产出。调用 cancel() 后停止提交新请求并尽快返回。
+        """
+        max_in_flight = max_in_flight or self.max_workers
+        payload_iter = enumerate(iter(payloads))
+        pending = {}
+        ready = {}  # ordered 模式下暂存已完成但尚未轮到的结果
+        next_idx = 0
+        exhausted = False
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+        with httpx.Client(timeout=self.timeout, verify=False, limits=limits) as client, \
+                ThreadPoolExecutor(max_workers=max_in_flight) as exe:
+            try:
+                while True:
+                    # 补满在途窗口
+                    while not exhausted and not self._cancelled and len(pending) < max_in_flight:
+                        try:
+                            idx, data = next(payload_iter)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        pending[exe.submit(self._timed_single, service, data, client)] = idx
+
+                    if not pending or self._cancelled:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        idx = pending.pop(fut)
+                        res, error, latency = fut.result()
+                        if not ordered:
+                            yield idx, res, error, latency
+                            continue
+                        ready[idx] = (res, error, latency)
+                        while next_idx in ready:
+                            yield (next_idx, *ready.pop(next_idx))
+                            next_idx += 1
+            finally:
+                for fut in pending:
+                    fut.cancel()
+
+    def replay(self, service: str, payloads, max_in_flight: int = None, ordered: bool = False,
+               callback=None) -> dict:
+        """回放全部 payloads 并返回统计报告，callback(idx, result, error, latency) 可选"""
+        stats = ReplayStats()
+        for idx, res, error, latency in self.stream(service, payloads, max_in_flight, ordered):
+            stats.add(latency, error is None)
+            if callback is not None:
+                callback(idx, res, error, latency)
+        stats.finish()
+        return stats.report()
 
     def test(self, service: str, data_list: list):
         with ThreadPoolExecutor(max_workers=self.max_workers) as exe:
@@ -111,7 +272,7 @@ if __name__ == "__main__":
         ServicesTest(),
         service,
         points=["point1", "point2", "point3", "point4"],
-        sample=[
+        values_list=[
             [1, 1, 1, 1, 1, 1, 1, 1],
             [1, 1, 1, 1, 1, 1, 1, 1],
             [1, 1, 1, 1, 1, 1, 1, 1],
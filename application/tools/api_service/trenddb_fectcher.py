@@ -5,19 +5,31 @@ from datetime import datetime
 from typing import Dict, Tuple, List
 from loguru import logger
 from application.base import BaseTool
+from application.utils.compact_series import CompactSeries, series_size
 
 
 class TrenddbFetcher(BaseTool):
     timeout = 20
 
     def __init__(
-            self, base_url: str, api_key: str, path: str, max_workers=10, **kwargs
+            self, base_url: str, api_key: str, path: str, max_workers=10,
+            compact: bool = False, compact_rle: bool = True, prefetch: bool = False, **kwargs
     ):
         super().__init__()
         self.base_url = base_url
         self.path = path
         self.api_key = api_key
         self.max_workers = max_workers
+        # 紧凑存储（float32 数值 + int32 秒偏移时间戳，可选游程编码），精度折中见 CompactSeries
+        self.compact = compact
+        self.compact_rle = compact_rle
+        # 是否在后台定时预取模型测点的趋势数据（默认关闭，开启后每隔几分钟请求一次）
+        self.prefetch = prefetch
+
+    def _series(self, times: list, values: list):
+        if self.compact:
+            return CompactSeries.from_arrays(times, np.array(values, dtype=np.float32), rle=self.compact_rle)
+        return np.array(times), np.array(values)
 
     def call(
             self,
@@ -50,7 +62,7 @@ class TrenddbFetcher(BaseTool):
                             for p in points
                         ]
                         values = [p["value"] for p in points]
-                        return {tag_name: (np.array(times), np.array(values))}
+                        return {tag_name: self._series(times, values)}
                 else:
                     raise Exception(f"数据获取失败: {data}")
             return {}
@@ -70,7 +82,8 @@ class TrenddbFetcher(BaseTool):
         单次请求批量获取多个测点的时序数据
 
         返回:
-            dict[tag_name] = (times: np.ndarray, values: np.ndarray)
+            dict[tag_name] = (times: np.ndarray, values: np.ndarray)，
+            启用 compact 时为 CompactSeries（可按 (times, values) 解包）
         """
         params = [
             ("startTime", start_time.strftime("%Y-%m-%d %H:%M:%S")),
@@ -112,9 +125,9 @@ class TrenddbFetcher(BaseTool):
                         for p in points
                     ]
                     values = [p["value"] for p in points]
-                    results[name] = (np.array(times), np.array(values))
+                    results[name] = self._series(times, values)
                 logger.info(
-                    f"成功获取时序数据, 测点数: {len(results)} 数据长度: {[len(value[0]) if value else 0 for value in results.values()]}"
+                    f"成功获取时序数据, 测点数: {len(results)} 数据长度: {[series_size(value) for value in results.values()]}"
                 )
             else:
                 raise Exception(f"数据获取失败: {payload}")
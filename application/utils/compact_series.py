@@ -0,0 +1,154 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: compact_series.py
+@time: 2025/7/25 16:40
+@desc: 紧凑时序存储：float32 数值、相对基准时刻的 int32 秒偏移时间戳，平直/阶跃信号可选游程编码（RLE），用于长时间窗口、大量测点的趋势数据
+"""
+import numpy as np
+
+RLE_MAX_RATIO = 0.2  # 游程数不超过样本数的该比例时才使用游程编码
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class CompactSeries:
+    """
+    单个测点的紧凑时序。
+
+    精度折中（启用前须确认可以接受）：
+    - 数值为 float32，约 7 位有效数字，相对误差不超过 6e-8；绝对值超过 2**24 的整数值不再精确；
+    - 时间戳为相对 base（首个时间戳向下取整到秒）的 int32 秒偏移，亚秒部分四舍五入，时间跨度上限约 68 年。
+    时序库接口返回的时间戳本身精确到秒，只有数值精度有损失。
+
+    内存：每个样本 8 字节（float64 时间戳与数值为 16 字节）；
+    游程编码后每个游程 8 字节（起点下标 int32 + 数值 float32），平直或阶跃信号通常只有样本数的百分之几。
+
+    对外行为与 (ts, ys) 元组一致：可以解包、按 0/1 下标取值、len 为 2，
+    取出的 ts 为解码后的 float64，ys 为 float32（未编码时为存储数组本身），每次取出都会解码。
+    只判断是否为空或取样本数时用 size（或 series_size），不要用 len(series[0])。
+    plot_xy 与 stats 直接基于紧凑存储计算，不必展开，但只有直接拿到 CompactSeries 的调用方受益
+    （测点选择对话框的趋势与统计）；趋势分析、训练区间选择等先构建 SeriesFrame 的界面在构建时解码一次，
+    之后基于帧中的 float32 数值绘图与统计。
+    """
+
+    def __init__(self, base: float, offsets: np.ndarray, values: np.ndarray = None,
+                 run_starts: np.ndarray = None, run_values: np.ndarray = None):
+        self.base = float(base)
+        self.offsets = offsets
+        self._values = values  # 未编码时的 float32 数值
+        self.run_starts = run_starts  # 游程编码时各游程的起始下标
+        self.run_values = run_values  # 游程编码时各游程的数值
+
+    @classmethod
+    def from_arrays(cls, ts, ys, rle: bool = True) -> "CompactSeries":
+        ts = np.asarray(ts, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float32)
+        if ts.shape != ys.shape:
+            raise ValueError(f"时间戳与数值长度不一致: {ts.shape} != {ys.shape}")
+        base = float(np.floor(ts.min())) if ts.size else 0.0
+        offsets = np.rint(ts - base)
+        if offsets.size and offsets.max() > INT32_MAX:
+            raise ValueError("时间跨度超出 int32 秒偏移的范围")
+        offsets = offsets.astype(np.int32)
+        if rle and ys.size:
+            # NaN 与 NaN 视为相同，连续缺测合并为一个游程
+            changed = ys[1:] != ys[:-1]
+            changed &= ~(np.isnan(ys[1:]) & np.isnan(ys[:-1]))
+            run_starts = np.concatenate(([0], np.flatnonzero(changed) + 1)).astype(np.int32)
+            if run_starts.size <= ys.size * RLE_MAX_RATIO:
+                return cls(base, offsets, run_starts=run_starts, run_values=ys[run_starts])
+        return cls(base, offsets, values=ys)
+
+    # ===== 元组接口 =====
+    def __iter__(self):
+        yield self.timestamps()
+        yield self.values()
+
+    def __getitem__(self, index):
+        return (self.timestamps, self.values)[index]()
+
+    def __len__(self):
+        return 2
+
+    # ===== 存储信息 =====
+    @property
+    def size(self) -> int:
+        """样本数"""
+        return len(self.offsets)
+
+    @property
+    def is_rle(self) -> bool:
+        return self.run_starts is not None
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.offsets, self._values, self.run_starts, self.run_values)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    # ===== 解码 =====
+    def timestamps(self) -> np.ndarray:
+        return self.base + self.offsets.astype(np.float64)
+
+    def run_lengths(self) -> np.ndarray:
+        return np.diff(np.append(self.run_starts, self.size))
+
+    def values(self) -> np.ndarray:
+        if self._values is not None:
+            return self._values
+        return np.repeat(self.run_values, self.run_lengths())
+
+    # ===== 直接基于紧凑存储的计算 =====
+    def plot_xy(self):
+        """
+        绘图用的 (x, y)。游程编码时每个游程只取首、末两个样本，
+        折线与逐点绘制完全相同（游程内为水平线段，游程之间为相邻样本的连线），点数为游程数的两倍。
+        """
+        if not self.is_rle:
+            return self.timestamps(), self._values
+        ends = np.append(self.run_starts[1:], self.size) - 1
+        index = np.empty(self.run_starts.size * 2, dtype=np.int64)
+        index[0::2] = self.run_starts
+        index[1::2] = ends
+        # 单样本游程首末相同，去掉重复点
+        keep = np.ones(index.size, dtype=bool)
+        keep[1::2] = ends != self.run_starts
+        index = index[keep]
+        return self.base + self.offsets[index].astype(np.float64), np.repeat(self.run_values, 2)[keep]
+
+    def stats(self):
+        """有限值的 count/mean/std/min/max（std 为总体标准差），游程编码时按游程长度加权，没有有限值时返回 None"""
+        if self.is_rle:
+            values, weights = self.run_values.astype(np.float64), self.run_lengths()
+        else:
+            values, weights = self._values.astype(np.float64), None
+        finite = np.isfinite(values)
+        if not finite.any():
+            return None
+        values = values[finite]
+        weights = np.ones(values.size) if weights is None else weights[finite]
+        count = weights.sum()
+        mean = float(np.dot(weights, values) / count)
+        std = float(np.sqrt(np.dot(weights, (values - mean) ** 2) / count))
+        return {"count": int(count), "mean": mean, "std": std,
+                "min": float(values.min()), "max": float(values.max())}
+
+
+def series_size(value) -> int:
+    """CompactSeries 或 (ts, ys) 的样本数（不解码），为 None 或时间戳为 None 时为 0"""
+    if value is None:
+        return 0
+    if isinstance(value, CompactSeries):
+        return value.size
+    return 0 if value[0] is None else len(value[0])
+
+
+def compact_dict(data: dict, rle: bool = True) -> dict:
+    """把 {测点名: (ts, ys)} 转为 {测点名: CompactSeries}，时间戳为空的测点原样保留"""
+    compacted = {}
+    for name, value in data.items():
+        if isinstance(value, CompactSeries) or value is None or value[0] is None or len(value[0]) == 0:
+            compacted[name] = value
+        else:
+            compacted[name] = CompactSeries.from_arrays(value[0], value[1], rle=rle)
+    return compacted
@@ -0,0 +1,186 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: correlation_engine.py
+@time: 2025/7/19 10:05
+@desc: 相关系数计算引擎：按时间戳对齐到公共网格，成对完整（pairwise-complete）的掩码矩阵运算，支持 Spearman 与滞后互相关
+"""
+import numpy as np
+
+from application.utils.series_frame import SeriesFrame
+
+METHODS = ("pearson", "spearman")
+
+
+def _median_step(ts: np.ndarray) -> float:
+    diffs = np.diff(ts)
+    diffs = diffs[diffs > 0]
+    return float(np.median(diffs)) if diffs.size else 0.0
+
+
+def align_series(data: dict, max_points: int = 5000, gap_factor: float = 3.0):
+    """
+    把各测点插值到公共时间网格上。
+
+    网格覆盖各序列时间范围的交集（交集为空时取并集），步长取各序列
+    采样间隔中位数的最小值，并保证网格点数不超过 max_points。
+    网格点落在序列范围之外，或落在超过 gap_factor 倍采样间隔的缺测段内时记为 NaN。
+
+    各测点共用等间隔时间戳的 SeriesFrame 直接以其时间索引为网格，不再插值。
+
+    返回 (names, grid, matrix)，matrix 形状为 (测点数, 网格点数)。
+    """
+    if isinstance(data, SeriesFrame):
+        aligned = _frame_grid(data, max_points)
+        if aligned is not None:
+            return aligned
+    series = []
+    for name, (ts, ys) in data.items():
+        ts = np.asarray(ts, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        finite = np.isfinite(ts) & np.isfinite(ys)
+        ts, ys = ts[finite], ys[finite]
+        if ts.size < 2:
+            continue
+        order = np.argsort(ts, kind="stable")
+        series.append((name, ts[order], ys[order]))
+    if not series:
+        return [], np.empty(0), np.empty((0, 0))
+
+    start = max(ts[0] for _, ts, _ in series)
+    end = min(ts[-1] for _, ts, _ in series)
+    if end <= start:
+        start = min(ts[0] for _, ts, _ in series)
+        end = max(ts[-1] for _, ts, _ in series)
+    steps = [s for s in (_median_step(ts) for _, ts, _ in series) if s > 0]
+    step = min(steps) if steps else 1.0
+    step = max(step, (end - start) / max(max_points - 1, 1))
+    grid = np.arange(start, end + step * 0.5, step) if end > start else np.array([start])
+
+    matrix = np.full((len(series), grid.size), np.nan)
+    for row, (_, ts, ys) in enumerate(series):
+        values = np.interp(grid, ts, ys)
+        # 网格点两侧最近样本的间隔，超过阈值视为缺测
+        right = np.clip(np.searchsorted(ts, grid), 1, ts.size - 1)
+        gap = ts[right] - ts[right - 1]
+        max_gap = gap_factor * max(_median_step(ts), step)
+        valid = (grid >= ts[0]) & (grid <= ts[-1]) & (gap <= max_gap)
+        matrix[row, valid] = values[valid]
+    return [name for name, _, _ in series], grid, matrix
+
+
+def _frame_grid(frame: SeriesFrame, max_points: int):
+    """共用时间戳、点数不超过 max_points 且近似等间隔时，返回帧自身的 (names, grid, matrix)，否则返回 None"""
+    grid = frame.index
+    if not frame.shared_index or grid.size < 2 or grid.size > max_points:
+        return None
+    diffs = np.diff(grid)
+    step = float(np.median(diffs))
+    if step <= 0 or np.abs(diffs - step).max() > step * 0.01:
+        return None
+    keep = np.count_nonzero(frame.valid, axis=0) >= 2
+    names = [name for name, k in zip(frame.names, keep) if k]
+    if not names:
+        return [], np.empty(0), np.empty((0, 0))
+    # 数值矩阵为列主序，转置后的行即连续内存
+    matrix = frame.matrix().T if keep.all() else frame.matrix()[:, keep].T
+    # float32（紧凑存储）的帧按 float64 计算，避免累加误差
+    return names, grid, matrix.astype(np.float64, copy=False)
+
+
+def _rank_rows(matrix: np.ndarray) -> np.ndarray:
+    """逐行计算秩（并列取平均秩），NaN 保持为 NaN"""
+    from scipy.stats import rankdata
+
+    valid = ~np.isnan(matrix)
+    ranks = rankdata(np.where(valid, matrix, np.inf), axis=1)
+    ranks[~valid] = np.nan
+    return ranks
+
+
+def _center(matrix: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """按行减去有效样本均值（减小大数相减的精度损失），无效位置置 0"""
+    count = valid.sum(axis=1, keepdims=True)
+    mean = np.where(valid, matrix, 0.0).sum(axis=1, keepdims=True) / np.maximum(count, 1)
+    return np.where(valid, matrix - mean, 0.0)
+
+
+def pairwise_corr(a: np.ndarray, b: np.ndarray = None, min_periods: int = 3):
+    """
+    成对完整的 Pearson 相关系数矩阵：每对 (i, j) 只使用两者同时有效的样本。
+
+    用有效掩码 V 与置零后的数据 X 做几次矩阵乘法即可得到所有测点对的
+    样本数、和、平方和与交叉积，不需要逐对循环。
+    返回 (corr, counts)，样本数少于 min_periods 或方差为 0 的位置为 NaN。
+    """
+    b = a if b is None else b
+    va, vb = ~np.isnan(a), ~np.isnan(b)
+    xa, xb = _center(a, va), _center(b, vb)
+    ma, mb = va.astype(np.float64), vb.astype(np.float64)
+
+    counts = ma @ mb.T
+    sum_a = xa @ mb.T  # 与 b_j 同时有效时 a_i 的和
+    sum_b = ma @ xb.T  # 与 a_i 同时有效时 b_j 的和
+    sq_a = (xa * xa) @ mb.T
+    sq_b = ma @ (xb * xb).T
+    cross = xa @ xb.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.where(counts > 0, counts, np.nan)
+        cov = cross - sum_a * sum_b / n
+        var_a = sq_a - sum_a ** 2 / n
+        var_b = sq_b - sum_b ** 2 / n
+        corr = cov / np.sqrt(var_a * var_b)
+    corr[(counts < min_periods) | ~(var_a > 0) | ~(var_b > 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0), counts.astype(np.int64)
+
+
+def lagged_corr(matrix: np.ndarray, max_lag: int, min_periods: int = 3):
+    """
+    滞后互相关：对每对测点在 [-max_lag, max_lag] 个网格步长内取绝对值最大的相关系数。
+
+    返回 (best_corr, best_lag)，best_lag[i, j] > 0 表示 j 滞后于 i。
+    """
+    count, length = matrix.shape
+    best = np.full((count, count), np.nan)
+    best_lag = np.zeros((count, count), dtype=np.int64)
+    for lag in range(-max_lag, max_lag + 1):
+        if abs(lag) >= length:
+            continue
+        if lag >= 0:
+            a, b = matrix[:, :length - lag], matrix[:, lag:]
+        else:
+            a, b = matrix[:, -lag:], matrix[:, :length + lag]
+        corr, _ = pairwise_corr(a, b, min_periods)
+        better = np.abs(np.nan_to_num(corr)) > np.abs(np.nan_to_num(best))
+        better |= np.isnan(best) & ~np.isnan(corr)
+        best = np.where(better, corr, best)
+        best_lag = np.where(better, lag, best_lag)
+    np.fill_diagonal(best, 1.0)
+    np.fill_diagonal(best_lag, 0)
+    return best, best_lag
+
+
+def correlation_job(data: dict, method: str = "pearson", max_lag: int = 0,
+                    max_points: int = 5000, min_periods: int = 3) -> dict:
+    """后台计算入口：对齐、（可选）转秩、计算相关系数矩阵"""
+    names, grid, matrix = align_series(data, max_points=max_points)
+    if len(names) < 2:
+        return {"names": names, "corr": None}
+    if method == "spearman":
+        # 秩按各测点自身的有效样本计算，未按测点对重新排秩；缺测较少时与逐对 Spearman 一致
+        matrix = _rank_rows(matrix)
+    if max_lag > 0:
+        corr, lags = lagged_corr(matrix, max_lag, min_periods)
+    else:
+        corr, _ = pairwise_corr(matrix, min_periods=min_periods)
+        lags = None
+    return {
+        "names": names,
+        "corr": corr,
+        "lags": lags,
+        "grid_step": float(grid[1] - grid[0]) if grid.size > 1 else 0.0,
+        "grid_points": int(grid.size),
+        "valid_points": int(np.count_nonzero(~np.isnan(matrix).any(axis=0))),
+    }
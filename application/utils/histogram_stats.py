@@ -0,0 +1,123 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: histogram_stats.py
+@time: 2025/7/18 15:30
+@desc: 频数直方图的统计量、分箱与核密度计算，全部为纯 numpy 函数，供 Worker 在后台线程调用
+"""
+import numpy as np
+from loguru import logger
+
+# 一次排序后取出的分位数：最小值、Q1、中位数、Q3、最大值
+STAT_QUANTILES = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+KDE_POINTS = 1000
+
+
+def calculate_statistics(values: dict) -> dict:
+    """
+    一次向量化计算所有测点的统计量。
+
+    各测点按行放入以 NaN 补齐的矩阵，按行排序后 NaN 位于末尾，
+    分位数由有效长度直接插值得到；异常值按 1.5 倍 IQR 用布尔掩码计数。
+    没有有效值的测点不出现在结果中。
+    """
+    names = list(values)
+    if not names:
+        return {}
+    lengths = [len(values[name]) for name in names]
+    matrix = np.full((len(names), max(lengths)), np.nan)
+    for row, name in enumerate(names):
+        matrix[row, :lengths[row]] = values[name]
+    matrix[~np.isfinite(matrix)] = np.nan
+
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    valid = counts > 0
+    safe_counts = np.maximum(counts, 1)
+    sorted_matrix = np.sort(matrix, axis=1)
+
+    # 与 np.percentile 默认的线性插值一致
+    positions = (safe_counts[:, None] - 1) * STAT_QUANTILES[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, safe_counts[:, None] - 1)
+    frac = positions - lower
+    lower_values = np.take_along_axis(sorted_matrix, lower, axis=1)
+    upper_values = np.take_along_axis(sorted_matrix, upper, axis=1)
+    quantiles = lower_values + (upper_values - lower_values) * frac
+    mn, q1, median, q3, mx = quantiles.T
+
+    mean = np.nansum(matrix, axis=1) / safe_counts
+    std = np.sqrt(np.nansum((matrix - mean[:, None]) ** 2, axis=1) / safe_counts)
+    iqr = q3 - q1
+    lower_bound = q1 - 1.5 * iqr
+    upper_bound = q3 + 1.5 * iqr
+    # NaN 参与比较结果为 False，不计入异常值
+    outliers = np.count_nonzero(
+        (matrix < lower_bound[:, None]) | (matrix > upper_bound[:, None]), axis=1
+    )
+
+    statistics = {}
+    for row, name in enumerate(names):
+        if not valid[row]:
+            continue
+        statistics[name] = {
+            'mean': float(mean[row]),
+            'median': float(median[row]),
+            'std': float(std[row]),
+            'min': float(mn[row]),
+            'max': float(mx[row]),
+            'count': int(counts[row]),
+            'q1': float(q1[row]),
+            'q3': float(q3[row]),
+            'iqr': float(iqr[row]),
+            'outliers_count': int(outliers[row]),
+            'outliers_percent': float(outliers[row]) / counts[row] * 100,
+        }
+    return statistics
+
+
+def resolve_bins(count: int, bin_count) -> int:
+    """'auto' 时按 Sturges 规则，限制在 10~30 个区间"""
+    if bin_count == 'auto':
+        n_bins = int(np.ceil(np.log2(max(count, 1)) + 1))
+        return max(10, min(30, n_bins))
+    return int(bin_count)
+
+
+def calculate_histograms(values: dict, bin_count) -> dict:
+    """返回 {名称: (密度, 区间边界)}，只统计有限值，没有有限值时为 None"""
+    histograms = {}
+    for name, ys in values.items():
+        finite = ys[np.isfinite(ys)]
+        if finite.size == 0:
+            histograms[name] = None
+            continue
+        density, edges = np.histogram(finite, bins=resolve_bins(finite.size, bin_count), density=True)
+        histograms[name] = (density, edges)
+    return histograms
+
+
+def calculate_kdes(values: dict, points: int = KDE_POINTS) -> dict:
+    """返回 {名称: (x, 密度)}，无法估计（如常数序列）时为 None"""
+    from scipy.stats import gaussian_kde
+
+    kdes = {}
+    for name, ys in values.items():
+        finite = ys[np.isfinite(ys)]
+        try:
+            kde = gaussian_kde(finite)
+            xs = np.linspace(finite.min(), finite.max(), points)
+            kdes[name] = (xs, kde(xs))
+        except Exception as e:
+            logger.error(f"核密度估计失败: {e}")
+            kdes[name] = None
+    return kdes
+
+
+def histogram_job(values: dict, bin_count, stats_names=(), hist_names=(), kde_names=()) -> dict:
+    """后台计算入口，只计算调用方缺失的部分"""
+    return {
+        'statistics': calculate_statistics({n: values[n] for n in stats_names}) if stats_names else None,
+        'histograms': calculate_histograms({n: values[n] for n in hist_names}, bin_count),
+        'kdes': calculate_kdes({n: values[n] for n in kde_names}) if kde_names else {},
+    }
@@ -0,0 +1,131 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: jenks_engine.py
+@time: 2025/7/21 09:20
+@desc: Jenks 自然间断点计算引擎：一次排序、一次动态规划得到 2~max_k 所有分类数的最优断点，组内方差由前缀和计算
+"""
+import numpy as np
+
+
+def stratified_sample(data: np.ndarray, sample_size: int, random_seed: int = 42,
+                      max_strata: int = 100) -> np.ndarray:
+    """
+    按取值分层随机抽样（保留分布特征），每层按占比抽取、至少抽 1 个。
+
+    各层的随机抽取通过“层号 + 随机键”一次 lexsort 完成，
+    取每层排序后的前若干个，不需要逐层循环。
+    """
+    data = np.asarray(data).ravel()
+    n = len(data)
+    if n <= sample_size:
+        return data.copy()
+    rng = np.random.RandomState(random_seed)
+    strata = min(max_strata, n // 100)
+    edges = np.linspace(data.min(), data.max(), strata)
+    digitized = np.digitize(data, edges)
+
+    order = np.lexsort((rng.random_sample(n), digitized))
+    counts = np.bincount(digitized)
+    take = np.minimum(np.maximum(1, (sample_size * counts / n).astype(np.int64)), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n) - starts[digitized[order]]
+    return data[order[rank < take[digitized[order]]]]
+
+
+class JenksTable:
+    """
+    Fisher-Jenks 最优分段动态规划表。
+
+    数据排序一次后建立一阶、二阶前缀和，任意连续区间的组内平方和 O(1) 得到。
+    第 k 层 D_k[j] = min_i D_{k-1}[i-1] + SSW(i, j)，最优分段起点 i 随 j 单调不减，
+    因此每层用分治优化按递归深度批量求解：同一深度的所有中点一次向量化计算，
+    每层只需 O(log n) 次 numpy 运算。一次构建即可读出 2~max_k 所有分类数的断点。
+    """
+
+    def __init__(self, values, max_k: int):
+        values = np.sort(np.asarray(values, dtype=np.float64).ravel())
+        self.values = values
+        self.n = len(values)
+        self.max_k = max(1, min(int(max_k), self.n))
+        # 先减去均值再累加，减小前缀和相减的精度损失
+        centered = values - values.mean() if self.n else values
+        self._s1 = np.concatenate(([0.0], np.cumsum(centered)))
+        self._s2 = np.concatenate(([0.0], np.cumsum(centered * centered)))
+        # _cost[k][j]：前 j+1 个值分为 k 类的最小组内平方和；_start[k][j]：最后一类的起点
+        self._cost = [None, self.segment_ssw(np.zeros(self.n, dtype=np.int64), np.arange(self.n))]
+        self._start = [None, np.zeros(self.n, dtype=np.int64)]
+        for k in range(2, self.max_k + 1):
+            cost, start = self._solve_layer(k)
+            self._cost.append(cost)
+            self._start.append(start)
+
+    def segment_ssw(self, i, j):
+        """区间 values[i..j]（含两端）的组内平方和，i、j 可为数组"""
+        count = j - i + 1
+        s1 = self._s1[j + 1] - self._s1[i]
+        s2 = self._s2[j + 1] - self._s2[i]
+        return np.maximum(s2 - s1 * s1 / count, 0.0)
+
+    def _solve_layer(self, k):
+        prev = self._cost[k - 1]
+        cost = np.full(self.n, np.inf)
+        start = np.zeros(self.n, dtype=np.int64)
+        # 待求区间 [j_lo, j_hi] 及其最优起点的搜索范围 [o_lo, o_hi]
+        j_lo = np.array([k - 1])
+        j_hi = np.array([self.n - 1])
+        o_lo = np.array([k - 1])
+        o_hi = np.array([self.n - 1])
+        while j_lo.size:
+            mid = (j_lo + j_hi) // 2
+            hi = np.minimum(mid, o_hi)
+            lengths = hi - o_lo + 1
+            offsets = np.cumsum(lengths) - lengths
+            seg = np.repeat(np.arange(mid.size), lengths)
+            cand = np.arange(lengths.sum()) - offsets[seg] + o_lo[seg]
+            vals = prev[cand - 1] + self.segment_ssw(cand, mid[seg])
+
+            # 每个中点取最小值对应的最小起点
+            best = np.minimum.reduceat(vals, offsets)
+            hit = np.flatnonzero(vals <= best[seg])
+            first = hit[np.unique(seg[hit], return_index=True)[1]]
+            opt = cand[first]
+            cost[mid] = vals[first]
+            start[mid] = opt
+
+            left = j_lo <= mid - 1
+            right = mid + 1 <= j_hi
+            j_lo, j_hi, o_lo, o_hi = (
+                np.concatenate((j_lo[left], mid[right] + 1)),
+                np.concatenate((mid[left] - 1, j_hi[right])),
+                np.concatenate((o_lo[left], opt[right])),
+                np.concatenate((opt[left], o_hi[right])),
+            )
+        return cost, start
+
+    def breaks(self, k: int) -> list:
+        """k 类的断点 [最小值, 各类上界..., 最大值]，与 jenkspy.jenks_breaks 格式一致"""
+        k = min(int(k), self.max_k)
+        uppers = []
+        j = self.n - 1
+        for layer in range(k, 1, -1):
+            i = int(self._start[layer][j])
+            uppers.append(float(self.values[i - 1]))
+            j = i - 1
+        return [float(self.values[0])] + uppers[::-1] + [float(self.values[-1])]
+
+    def optimal_ssw(self, k: int) -> float:
+        """k 类最优分段的组内平方和"""
+        return float(self._cost[min(int(k), self.max_k)][self.n - 1])
+
+    def digitized_ssw(self, breaks) -> float:
+        """
+        按 np.digitize(values, breaks[1:-1]) 的归类方式（等于断点的值归入上一类）
+        计算组内平方和，用前缀和代替逐类掩码。
+        """
+        bounds = np.searchsorted(self.values, np.asarray(breaks[1:-1], dtype=np.float64), side="left")
+        edges = np.concatenate(([0], bounds, [self.n]))
+        lo, hi = edges[:-1], edges[1:] - 1
+        nonempty = hi >= lo
+        return float(self.segment_ssw(lo[nonempty], hi[nonempty]).sum())
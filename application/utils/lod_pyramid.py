@@ -0,0 +1,131 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: lod_pyramid.py
+@time: 2025/7/17 09:40
+@desc: 趋势曲线的最小/最大值包络金字塔（LOD），按可见范围与像素宽度选择层级，缩放平移时只绘制 O(像素) 个点
+"""
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    单条曲线的最小/最大值包络金字塔。
+
+    第 k 层把原始数据按 factor**k 个点一桶分组，每桶保留最小值点和最大值点
+    （按时间先后排列），峰值不会因降采样丢失。金字塔只在数据变化时构建一次，
+    之后 select() 只做二分查找和切片，返回的数组为各层数据的视图。
+    要求 x 单调不减；NaN 不参与极值计算，整桶为 NaN 时该桶输出 NaN。
+    """
+
+    FACTOR = 4
+    MIN_BUCKETS = 256  # 最粗一层的桶数下限，低于该值不再继续构建
+    POINTS_PER_PIXEL = 2  # 每像素允许绘制的点数（一桶对应最小、最大两个点）
+
+    def __init__(self, x, y, factor: int = FACTOR):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        # float32（紧凑存储）保持原精度，不复制为 float64
+        self.y = np.ascontiguousarray(y, dtype=np.float32 if getattr(y, "dtype", None) == np.float32 else np.float64)
+        self.factor = max(2, int(factor))
+        finite = np.isfinite(self.y)
+        if finite.any():
+            self.y_min = float(self.y[finite].min())
+            self.y_max = float(self.y[finite].max())
+        else:
+            self.y_min = self.y_max = None
+        # 每层为 (桶大小, 包络 x, 包络 y)
+        self.levels = []
+        self._build(finite)
+
+    def __len__(self):
+        return len(self.x)
+
+    def _build(self, finite):
+        n = len(self.x)
+        if n < self.factor * self.MIN_BUCKETS:
+            return
+        # 当前层每桶的最小值/最大值及其在原始数据中的下标；NaN 以 ±inf 代替
+        lo_val = np.where(finite, self.y, np.inf)
+        hi_val = np.where(finite, self.y, -np.inf)
+        lo_idx = hi_idx = np.arange(n, dtype=np.int64)
+        bucket = 1
+        while len(lo_val) >= self.factor * self.MIN_BUCKETS:
+            lo_val, lo_idx = self._reduce(lo_val, lo_idx, np.inf, np.argmin)
+            hi_val, hi_idx = self._reduce(hi_val, hi_idx, -np.inf, np.argmax)
+            bucket *= self.factor
+            self.levels.append((bucket,) + self._envelope(lo_val, lo_idx, hi_idx))
+
+    def _reduce(self, values, index, fill, arg_fn):
+        """相邻 factor 个桶合并为一个桶，尾部不足的部分用 fill 补齐"""
+        pad = (-len(values)) % self.factor
+        if pad:
+            values = np.concatenate([values, np.full(pad, fill)])
+            index = np.concatenate([index, np.full(pad, index[-1])])
+        values = values.reshape(-1, self.factor)
+        index = index.reshape(-1, self.factor)
+        pos = arg_fn(values, axis=1)[:, None]
+        return (np.take_along_axis(values, pos, axis=1).ravel(),
+                np.take_along_axis(index, pos, axis=1).ravel())
+
+    def _envelope(self, lo_val, lo_idx, hi_idx):
+        """每桶的最小值点、最大值点按时间先后交错排列"""
+        first = np.minimum(lo_idx, hi_idx)
+        second = np.maximum(lo_idx, hi_idx)
+        order = np.empty(2 * len(first), dtype=np.int64)
+        order[0::2] = first
+        order[1::2] = second
+        xs = self.x[order]
+        ys = self.y[order]
+        ys[np.repeat(np.isinf(lo_val), 2)] = np.nan  # 整桶为 NaN
+        return xs, ys
+
+    def select(self, x0: float, x1: float, pixels: int):
+        """
+        返回可见范围 [x0, x1] 内的绘制数据 (x, y)。
+
+        在满足每像素点数上限的前提下选择最细的层级，并在两侧各多取一个点
+        保证曲线连续；同时附带全量数据的首尾点，使曲线的数据边界
+        （自动缩放范围）与全量数据一致。
+        """
+        n = len(self.x)
+        if n == 0:
+            return self.x, self.y
+        budget = max(int(pixels), 1) * self.POINTS_PER_PIXEL
+        i0 = int(np.searchsorted(self.x, x0, side="left"))
+        i1 = int(np.searchsorted(self.x, x1, side="right"))
+        xs, ys = self.x, self.y
+        if i1 - i0 > budget:
+            # 从细到粗，找到第一个桶数满足点数上限的层级，均不满足时用最粗一层
+            for bucket, level_x, level_y in self.levels:
+                xs, ys = level_x, level_y
+                if 2 * (i1 - i0) <= budget * bucket:
+                    break
+        if xs is not self.x:
+            i0 = int(np.searchsorted(xs, x0, side="left"))
+            i1 = int(np.searchsorted(xs, x1, side="right"))
+        lo = max(i0 - 1, 0)
+        hi = min(i1 + 1, len(xs))
+        head = xs[lo] != self.x[0]
+        tail = xs[hi - 1] != self.x[-1]
+        if not (head or tail):
+            return xs[lo:hi], ys[lo:hi]
+        parts_x, parts_y = [xs[lo:hi]], [ys[lo:hi]]
+        if head:
+            parts_x.insert(0, self.x[:1])
+            parts_y.insert(0, self.y[:1])
+        if tail:
+            parts_x.append(self.x[-1:])
+            parts_y.append(self.y[-1:])
+        return np.concatenate(parts_x), np.concatenate(parts_y)
+
+
+def build_pyramids(data: dict, factor: int = MinMaxPyramid.FACTOR) -> dict:
+    """批量构建 {tag: MinMaxPyramid}，供 Worker 在后台线程调用"""
+    pyramids = {}
+    for tag, points in data.items():
+        if not points or points[0] is None:
+            continue
+        x, y = points
+        pyramids[tag] = MinMaxPyramid(x, y, factor)
+    return pyramids
@@ -0,0 +1,153 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: log_index.py
+@time: 2025/7/16 14:10
+@desc: 服务日志结构化解析与行索引（级别、小写文本），过滤与搜索均为索引查询
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from heapq import merge
+
+LOG_PATTERN = re.compile(
+    r"(?P<datetime>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\.\d+\s*\|\s*(?P<level>[A-Z]+)\s*\|\s*[^:]+:(?P<func>\w+):\d+\s*-\s*(?P<msg>.*)"
+)
+
+LEVEL_COLORS = {
+    'DEBUG': '#808080',
+    'INFO': '#9cdcfe',
+    'WARNING': '#ffcb6b',
+    'WARN': '#ffcb6b',
+    'ERROR': '#f44747',
+    'Error': '#f44747',
+    'CRITICAL': '#f44747',
+}
+
+# 同义级别归一化，便于按级别过滤
+LEVEL_ALIASES = {'WARN': 'WARNING', 'Error': 'ERROR'}
+
+# time: 原始时间字符串；level: 归一化级别（未知为 None）；message: 消息正文
+# display: 显示文本；lower: 小写显示文本，用于搜索
+LogRecord = namedtuple("LogRecord", ["time", "level", "message", "display", "lower"])
+
+
+def parse_log_line(line: str) -> LogRecord:
+    """解析单行日志；无法匹配格式的行按关键字推断级别"""
+    match = LOG_PATTERN.match(line)
+    if match:
+        parts = match.groupdict()
+        level = LEVEL_ALIASES.get(parts['level'], parts['level'])
+        display = f"[{parts['datetime'][5:]}] | {parts['level']} | {parts['msg']}"
+        return LogRecord(parts['datetime'], level, parts['msg'], display, display.lower())
+    level = None
+    for key in LEVEL_COLORS:
+        if key in line:
+            level = LEVEL_ALIASES.get(key, key)
+            break
+    return LogRecord(None, level, line, line, line.lower())
+
+
+def parse_log_lines(lines) -> list:
+    """批量解析，供工作线程调用，跳过空行"""
+    return [parse_log_line(line) for line in lines if line.strip()]
+
+
+class LogIndex:
+    """
+    日志行索引，行号为单调递增的绝对行号。
+
+    - 每个级别维护一个有序行号列表，按级别过滤为一次归并；
+    - 保存每行小写文本，关键字搜索结果按关键字缓存，新行到达后只增量扫描；
+    - 旧行被丢弃后在查询时按 first_line_no 截断，不做整体重建。
+    """
+
+    MAX_CACHED_KEYWORDS = 32
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.first_line_no = 0
+        self.next_line_no = 0
+        self._lowers = []
+        self._lowers_offset = 0  # _lowers[0] 对应的行号
+        self._levels = defaultdict(list)
+        self._search_cache = {}  # keyword -> (行号列表, 已扫描到的行号)
+
+    def __len__(self):
+        return self.next_line_no - self.first_line_no
+
+    def append(self, records):
+        """追加记录，返回第一条记录的行号"""
+        start = self.next_line_no
+        for line_no, record in enumerate(records, start):
+            self._lowers.append(record.lower)
+            self._levels[record.level].append(line_no)
+        self.next_line_no = start + len(records)
+        return start
+
+    def skip(self, count: int):
+        """跳过 count 个行号（这些行未进入缓冲区），调用前索引须为空"""
+        self.next_line_no += count
+        self.first_line_no = self.next_line_no
+        self._lowers = []
+        self._lowers_offset = self.next_line_no
+        self._levels = defaultdict(list)
+        self._search_cache = {}
+
+    def drop_before(self, line_no: int):
+        """丢弃行号小于 line_no 的行"""
+        if line_no <= self.first_line_no:
+            return
+        self.first_line_no = min(line_no, self.next_line_no)
+        stale = self.first_line_no - self._lowers_offset
+        # 过期数据超过一半时再压缩，保证均摊 O(1)
+        if stale > len(self._lowers) // 2:
+            del self._lowers[:stale]
+            self._lowers_offset = self.first_line_no
+            for lines in self._levels.values():
+                del lines[:bisect_left(lines, self.first_line_no)]
+            for lines, _ in self._search_cache.values():
+                del lines[:bisect_left(lines, self.first_line_no)]
+
+    def _trimmed(self, lines):
+        pos = bisect_left(lines, self.first_line_no)
+        return lines[pos:] if pos else list(lines)
+
+    def lines_with_levels(self, levels) -> list:
+        """返回属于任一级别的有序行号"""
+        groups = [self._levels[level] for level in levels if level in self._levels]
+        if len(groups) == 1:
+            return self._trimmed(groups[0])
+        return self._trimmed(list(merge(*groups)))
+
+    def _search_keyword(self, keyword: str) -> list:
+        lines, scanned = self._search_cache.pop(keyword, ([], self.first_line_no))
+        scanned = max(scanned, self.first_line_no)
+        if scanned < self.next_line_no:
+            offset = self._lowers_offset
+            lines.extend(
+                line_no for line_no, text in enumerate(self._lowers[scanned - offset:], scanned)
+                if keyword in text
+            )
+        self._search_cache[keyword] = (lines, self.next_line_no)
+        if len(self._search_cache) > self.MAX_CACHED_KEYWORDS:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        return lines
+
+    def search(self, keywords) -> list:
+        """返回包含任一关键字（不区分大小写）的有序行号"""
+        keywords = [kw.lower() for kw in keywords if kw]
+        if not keywords:
+            return []
+        groups = [self._search_keyword(kw) for kw in dict.fromkeys(keywords)]
+        if len(groups) == 1:
+            return self._trimmed(groups[0])
+        result, last = [], None
+        for line_no in merge(*groups):
+            if line_no != last:
+                result.append(line_no)
+                last = line_no
+        return self._trimmed(result)
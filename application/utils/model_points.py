@@ -0,0 +1,132 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: model_points.py
+@time: 2025/7/25 09:30
+@desc: 模型测点视图：配置引用的测点名与测点目录关联后的结果（测点名 → 信息最丰富的记录），以及这些测点趋势数据的预取缓存
+"""
+import datetime
+import threading
+import time
+
+from loguru import logger
+
+from application.utils.compact_series import series_size
+from application.utils.point_catalog import get_point_catalog
+
+# 预取窗口与采样数，与趋势分析界面的默认选项（最近12小时、600 点）一致
+PREFETCH_WINDOW_SECONDS = 12 * 3600
+PREFETCH_DATA_NUM = 600
+PREFETCH_MAX_POINTS = 100  # 单次预取的测点数上限
+PREFETCH_MAX_AGE = 300  # 预取数据的有效期（秒），界面请求的结束时间与预取时相差不超过该值时直接使用
+PREFETCH_REFRESH_SECONDS = PREFETCH_MAX_AGE - 60  # 定时重新预取的间隔，保证缓存在过期前已更新
+
+
+def _info_density(record: dict) -> int:
+    """测点记录的信息量：测点名以外所有值的字符串总长度"""
+    return sum(len(str(value)) for key, value in record.items() if key != "测点名")
+
+
+class ModelPointsView:
+    """
+    模型测点视图。
+
+    update 传入各参数类型引用的测点名（在配置加载与编辑后调用），
+    rows 返回与测点目录关联后的目录行号，items 返回对应的 [(测点类型, 测点字典), ...]：
+    同名测点出现在多个类型中时取信息量最大的记录（信息量相同时取类型名靠前的）。
+    关联结果按目录修订号缓存，目录或测点名变化时才重新计算，每个测点名只做各类型一次字典查找。
+    """
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or get_point_catalog()
+        self._names_by_type = {}  # 参数类型 -> [测点名]
+        self._rows = None  # 关联结果（目录行号）
+        self._revision = None
+        self._lock = threading.Lock()
+        # 预取结果 ((结束时间, 窗口秒数, 采样数), {测点名: (ts, ys)})，整体替换，读取方不会看到新旧混合的窗口与数据
+        self._prefetched = None
+        self._prefetch_lock = threading.Lock()  # 同一时间只进行一次预取
+
+    def update(self, names_by_type: dict) -> bool:
+        """设置各参数类型引用的测点名，返回测点名是否有变化"""
+        names_by_type = {t: list(dict.fromkeys(names)) for t, names in names_by_type.items()}
+        with self._lock:
+            if names_by_type == self._names_by_type:
+                return False
+            self._names_by_type = names_by_type
+            self._rows = None
+            return True
+
+    def names(self, param_type: str = None) -> list:
+        """某参数类型（为空时为全部，去重后按出现顺序）引用的测点名"""
+        if param_type is not None:
+            return list(self._names_by_type.get(param_type, []))
+        return list(dict.fromkeys(n for names in self._names_by_type.values() for n in names))
+
+    def rows(self) -> list:
+        """与测点目录关联后的模型测点的目录行号（目录中不存在的测点名不出现）"""
+        self.catalog.refresh()
+        with self._lock:
+            revision = self.catalog.revision()
+            if self._rows is None or self._revision != revision:
+                self._rows = self._resolve()
+                self._revision = revision
+            return list(self._rows)
+
+    def items(self) -> list:
+        """与测点目录关联后的模型测点 [(测点类型, 测点字典), ...]"""
+        return [(self.catalog.type_of(row), self.catalog.record(row)) for row in self.rows()]
+
+    def _resolve(self) -> list:
+        catalog = self.catalog
+        rows = []
+        for name in self.names():
+            named = catalog.rows_named(name)
+            if named:
+                rows.append(max(named, key=lambda row: _info_density(catalog.record(row))))
+        return rows
+
+    # ===== 趋势数据预取 =====
+    def prefetch_trends(self, fetcher, names: list = None) -> int:
+        """
+        批量获取模型测点在默认窗口内的趋势数据并缓存（可在后台线程调用），返回取得数据的测点数。
+        已有预取在进行时直接返回 0。
+        """
+        names = (names if names is not None else self.names())[:PREFETCH_MAX_POINTS]
+        if fetcher is None or not names:
+            return 0
+        if not self._prefetch_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._prefetch(fetcher, names)
+        finally:
+            self._prefetch_lock.release()
+
+    def _prefetch(self, fetcher, names: list) -> int:
+        end = datetime.datetime.now().replace(second=0, microsecond=0)
+        start = end - datetime.timedelta(seconds=PREFETCH_WINDOW_SECONDS)
+        begin = time.perf_counter()
+        data = fetcher.call_batch(names, start, end, PREFETCH_DATA_NUM)
+        trends = {name: value for name, value in data.items() if series_size(value) > 0}
+        self._prefetched = ((end, PREFETCH_WINDOW_SECONDS, str(PREFETCH_DATA_NUM)), trends)
+        logger.info(f"已预取 {len(trends)}/{len(names)} 个模型测点的趋势数据，耗时 {time.perf_counter() - begin:.2f}s")
+        return len(trends)
+
+    def cached_trends(self, names: list, start_time, end_time, data_num):
+        """请求与预取的窗口、采样数一致且所有测点都已预取时返回 {测点名: (ts, ys)}，否则返回 None"""
+        prefetched = self._prefetched
+        if prefetched is None or not names:
+            return None
+        window, trends = prefetched
+        end, seconds, num = window
+        if (end_time - start_time).total_seconds() != seconds or str(data_num).strip() != num:
+            return None
+        if abs((end_time - end).total_seconds()) > PREFETCH_MAX_AGE:
+            return None
+        if any(name not in trends for name in names):
+            return None
+        return {name: trends[name] for name in names}
+
+    def clear_trends(self):
+        self._prefetched = None
@@ -0,0 +1,164 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: monitor_store.py
+@time: 2025/7/14 10:20
+@desc: 服务监控记录的本地持久化存储（SQLite），支持按时间窗口查询可用率与延迟分位数
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from loguru import logger
+
+from application.utils.config_handler import PATH_PREFIX
+
+MONITOR_DB_PATH = os.path.join(PATH_PREFIX, "service_monitor.db")
+RECORD_RETENTION_DAYS = 30  # 监控记录保留天数，更早的记录由 ServiceStatusMonitor 定期清理
+
+# 记录表字段顺序，与 fetch_records 返回的元组一一对应
+RECORD_COLUMNS = ("id", "ts", "service_id", "service_name", "status", "operation", "healthy", "latency", "event")
+
+
+class MonitorRecordStore:
+    """监控记录存储
+
+    每次健康检查、重启事件、监控开关变更都作为一行追加写入 SQLite，
+    重启后仍可查询历史。所有方法线程安全，可在 Worker 中调用。
+    """
+
+    def __init__(self, db_path: str = MONITOR_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS monitor_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                service_id TEXT,
+                service_name TEXT,
+                status TEXT,
+                operation TEXT,
+                healthy INTEGER,
+                latency REAL,
+                event TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_monitor_sid_ts ON monitor_records (service_id, ts);
+            CREATE INDEX IF NOT EXISTS idx_monitor_name_ts ON monitor_records (service_name, ts);
+            CREATE INDEX IF NOT EXISTS idx_monitor_ts ON monitor_records (ts);
+        """)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ===== 写入 =====
+    def add_record(self, service_name, status, operation, service_id=None,
+                   healthy=None, latency=None, event=None, ts=None) -> int:
+        """追加一条记录，返回记录 id
+
+        healthy: True/False 表示健康检查结果，非检查类记录为 None
+        latency: 检查耗时（秒）
+        event: 事件类型，如 "check"、"restart"、"switch"
+        """
+        ts = time.time() if ts is None else ts
+        healthy = None if healthy is None else int(bool(healthy))
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO monitor_records "
+                "(ts, service_id, service_name, status, operation, healthy, latency, event) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, service_id, service_name, status, operation, healthy, latency, event)
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    def prune(self, before_ts: float) -> int:
+        """删除早于 before_ts 的记录，返回删除条数"""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM monitor_records WHERE ts < ?", (before_ts,))
+            self._conn.commit()
+            return cur.rowcount
+
+    # ===== 记录查询 =====
+    @staticmethod
+    def _where(service_name=None, start=None, end=None):
+        clauses, params = [], []
+        if service_name is not None:
+            clauses.append("service_name = ?")
+            params.append(service_name)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, service_name=None, start=None, end=None) -> int:
+        where, params = self._where(service_name, start, end)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM monitor_records{where}", params).fetchone()[0]
+
+    def fetch_records(self, service_name=None, offset=0, limit=100,
+                      order_by="ts", descending=True, start=None, end=None) -> list:
+        """分页读取记录，返回按 RECORD_COLUMNS 排列的元组列表"""
+        if order_by not in RECORD_COLUMNS:
+            order_by = "ts"
+        direction = "DESC" if descending else "ASC"
+        where, params = self._where(service_name, start, end)
+        sql = (f"SELECT {', '.join(RECORD_COLUMNS)} FROM monitor_records{where} "
+               f"ORDER BY {order_by} {direction}, id {direction} LIMIT ? OFFSET ?")
+        with self._lock:
+            return self._conn.execute(sql, params + [int(limit), int(offset)]).fetchall()
+
+    # ===== 统计查询 =====
+    def _check_filter(self, service_id, start, end):
+        clauses, params = ["service_id = ?", "healthy IS NOT NULL"], [service_id]
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(end)
+        return " WHERE " + " AND ".join(clauses), params
+
+    def uptime(self, service_id, start=None, end=None):
+        """时间窗口内健康检查成功率（0~1），无检查记录时返回 None"""
+        where, params = self._check_filter(service_id, start, end)
+        with self._lock:
+            total, ok = self._conn.execute(
+                f"SELECT COUNT(*), SUM(healthy) FROM monitor_records{where}", params
+            ).fetchone()
+        if not total:
+            return None
+        return (ok or 0) / total
+
+    def latency_percentiles(self, service_id, start=None, end=None, percentiles=(50, 95, 99)) -> dict:
+        """时间窗口内检查延迟分位数（秒），返回 {50: p50, 95: p95, 99: p99}"""
+        where, params = self._check_filter(service_id, start, end)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT latency FROM monitor_records{where} AND latency IS NOT NULL", params
+            ).fetchall()
+        if not rows:
+            return {p: None for p in percentiles}
+        latencies = np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+        values = np.percentile(latencies, percentiles)
+        return {p: float(v) for p, v in zip(percentiles, values)}
+
+    def service_summary(self, service_id, start=None, end=None) -> dict:
+        """可用率与延迟分位数汇总"""
+        summary = {"uptime": self.uptime(service_id, start, end)}
+        try:
+            summary.update({f"p{p}": v for p, v in self.latency_percentiles(service_id, start, end).items()})
+        except Exception as e:
+            logger.warning(f"延迟分位数计算失败: {e}")
+        return summary
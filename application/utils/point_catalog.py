@@ -0,0 +1,387 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: point_catalog.py
+@time: 2025/7/22 10:30
+@desc: 测点目录存储：SQLite 持久化（字符串驻留表 + 整数编码列，按来源版本化、增量原子写入），替代 point_cache.pkl
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from array import array
+
+import numpy as np
+from loguru import logger
+
+from application.utils.config_handler import PATH_PREFIX
+
+CATALOG_FILE = os.path.join(PATH_PREFIX, "point_catalog.db")
+LEGACY_CACHE_FILE = "point_cache.pkl"  # 旧版缓存写在工作目录下
+SCHEMA_VERSION = 1
+
+# 测点字典的键，顺序即生成测点字典时的键顺序
+FIELDS = ("测点名", "测点描述", "参数类型", "设备名")
+_CODE_COLUMNS = ("type_id", "name_id", "desc_id", "param_id", "device_id")
+MISSING = -1  # 测点字典中没有该键
+
+
+def _normalize(point: dict) -> tuple:
+    """测点字典转换为按 FIELDS 排列的字符串元组，缺少的键为 None"""
+    return tuple(None if point.get(field) is None else str(point.get(field)) for field in FIELDS)
+
+
+class PointCatalog:
+    """
+    测点目录。
+
+    持久化：SQLite（WAL 模式）。所有字符串驻留在 strings 表中只保存一份，
+    points 表每行只有类型、测点名、描述、参数类型、设备名五个整数编码，主键为 (类型, 测点名)。
+    写入在一个 IMMEDIATE 事务内完成，多个程序实例可以安全地同时读写；
+    每个来源维护单调递增的版本号，测点行记录最后一次变更时的来源与版本，可按版本查询增量；
+    sync_state 表记录远程同步各分组（如 设备 × 测点类型）的内容哈希、HTTP 缓存标记与拉取时间。
+
+    内存：字符串池为列表（编码即下标），各字段为 int32 编码列（array），
+    加载时整列读取，不逐行构造字典；测点字典只在需要时按行生成，
+    接口与原 {测点类型: [测点字典, ...]} 缓存兼容。
+    """
+
+    def __init__(self, path: str = CATALOG_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self._load()
+
+    # ===== 持久化 =====
+    def _init_schema(self):
+        self._conn.executescript(
+            """
+            BEGIN;
+            CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS points (
+                type_id INTEGER NOT NULL, name_id INTEGER NOT NULL,
+                desc_id INTEGER NOT NULL, param_id INTEGER NOT NULL, device_id INTEGER NOT NULL,
+                source TEXT NOT NULL DEFAULT '', version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (type_id, name_id));
+            CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at REAL);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                source TEXT NOT NULL, grp TEXT NOT NULL, hash TEXT, etag TEXT, last_modified TEXT, fetched_at REAL,
+                PRIMARY KEY (source, grp));
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', '%d');
+            COMMIT;
+            """ % SCHEMA_VERSION
+        )
+
+    def _load(self):
+        """整列读取数据库，重建字符串池与编码列；按字符串或测点名查找的字典在首次使用时建立"""
+        self._pool = [value for value, in self._conn.execute("SELECT value FROM strings ORDER BY id")]
+        rows = self._conn.execute(f"SELECT {', '.join(_CODE_COLUMNS)} FROM points ORDER BY rowid").fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(_CODE_COLUMNS)
+        del rows
+        self._type_col = array("i", columns[0])
+        self._columns = {field: array("i", col) for field, col in zip(FIELDS, columns[1:])}
+
+        # 按类型分组行号：稳定排序后按类型切分，组内保持写入顺序
+        types = np.frombuffer(self._type_col, dtype=np.int32) if len(self._type_col) else np.empty(0, np.int32)
+        order = np.argsort(types, kind="stable").astype(np.int32)
+        codes, starts = np.unique(types[order], return_index=True)
+        self._rows_by_type = {
+            int(code): array("i", part.tobytes())
+            for code, part in zip(codes, np.split(order, starts[1:]))
+        }
+        self._type_codes = {self._pool[code]: code for code in self._rows_by_type}
+        self._codes = None  # 字符串 -> 编码
+        self._row_of = None  # (类型编码, 测点名编码) -> 行号
+        self._rows_by_name = None  # 测点名编码 -> 最早写入的行号
+        self._versions = dict(self._conn.execute("SELECT source, version FROM sources"))
+        self._data_version = self._current_data_version()
+
+    def _ensure_codes(self):
+        if self._codes is None:
+            self._codes = dict(zip(self._pool, range(len(self._pool))))
+        if self._row_of is None:
+            self._row_of = dict(zip(zip(self._type_col, self._columns["测点名"]), range(len(self._type_col))))
+
+    def _current_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self) -> bool:
+        """其他实例写入过数据库时重新加载，返回是否重新加载"""
+        with self._lock:
+            if self._current_data_version() == self._data_version:
+                return False
+            self._load()
+            return True
+
+    # ===== 内存列 =====
+    def _append_row(self, type_code, codes: tuple) -> int:
+        row = len(self._type_col)
+        self._type_col.append(type_code)
+        for field, code in zip(FIELDS, codes):
+            self._columns[field].append(code)
+        self._row_of[(type_code, codes[0])] = row
+        if type_code not in self._rows_by_type:
+            self._rows_by_type[type_code] = array("i")
+            self._type_codes[self._pool[type_code]] = type_code
+        self._rows_by_type[type_code].append(row)
+        if self._rows_by_name is not None:
+            self._rows_by_name.setdefault(codes[0], row)
+        return row
+
+    def _row_codes(self, row) -> tuple:
+        return tuple(self._columns[field][row] for field in FIELDS)
+
+    def _record(self, row) -> dict:
+        pool = self._pool
+        record = {}
+        for field in FIELDS:
+            code = self._columns[field][row]
+            if code != MISSING:
+                record[field] = pool[code]
+        return record
+
+    # ===== 查询 =====
+    def __len__(self):
+        return len(self._type_col)
+
+    def types(self) -> list:
+        return sorted(self._pool[code] for code in list(self._rows_by_type))
+
+    def rows(self, type_name: str = None):
+        """某类型（为空时为全部）的行号，按写入顺序"""
+        if type_name is None:
+            return range(len(self._type_col))
+        code = self._type_codes.get(type_name)
+        return self._rows_by_type[code] if code is not None else array("i")
+
+    def value(self, row: int, field: str) -> str:
+        code = self._columns[field][row]
+        return self._pool[code] if code != MISSING else ""
+
+    def type_of(self, row: int) -> str:
+        return self._pool[self._type_col[row]]
+
+    def record(self, row: int) -> dict:
+        """某行的测点字典"""
+        return self._record(row)
+
+    def strings(self) -> list:
+        """字符串池（编码即下标，只读）"""
+        return self._pool
+
+    def column(self, field: str) -> np.ndarray:
+        """某字段的编码列副本（int32，缺失为 MISSING）"""
+        return np.array(self._columns[field], dtype=np.int32)
+
+    def records(self, type_name: str = None) -> list:
+        """某类型（为空时为全部）的测点字典列表"""
+        return [self._record(row) for row in self.rows(type_name)]
+
+    def as_dict(self) -> dict:
+        """{测点类型: [测点字典, ...]}，与原 point_cache.pkl 的结构一致"""
+        return {t: self.records(t) for t in self.types()}
+
+    def find(self, name: str):
+        """按测点名查找测点字典（同名测点出现在多个类型中时取最早写入的），不存在时返回 None"""
+        self._ensure_codes()
+        if self._rows_by_name is None:
+            names = self._columns["测点名"]
+            # 反向构建，使同名测点保留最早的行号
+            self._rows_by_name = dict(zip(reversed(names), range(len(names) - 1, -1, -1)))
+        code = self._codes.get(name)
+        row = self._rows_by_name.get(code) if code is not None else None
+        return self._record(row) if row is not None else None
+
+    def rows_named(self, name: str) -> list:
+        """测点名在各类型中的行号（按类型名排序），不存在时为空列表"""
+        self._ensure_codes()
+        code = self._codes.get(name)
+        if code is None:
+            return []
+        rows = (self._row_of.get((self._type_codes[t], code)) for t in self.types())
+        return [row for row in rows if row is not None]
+
+    def version(self, source: str = "") -> int:
+        return self._versions.get(source, 0)
+
+    def revision(self) -> int:
+        """目录内容的修订号：任一来源写入后增大，可用于判断派生数据是否过期"""
+        return sum(self._versions.values())
+
+    def changed_since(self, source: str, version: int) -> dict:
+        """某来源在指定版本之后新增或变更的测点 {测点类型: [测点字典, ...]}"""
+        with self._lock:
+            self.refresh()
+            self._ensure_codes()
+            result = {}
+            cursor = self._conn.execute(
+                "SELECT type_id, name_id FROM points WHERE source = ? AND version > ? ORDER BY rowid",
+                (source, version),
+            )
+            for type_code, name_code in cursor:
+                result.setdefault(self._pool[type_code], []).append(self._record(self._row_of[(type_code, name_code)]))
+            return result
+
+    def sync_state(self, source: str) -> dict:
+        """某来源各同步分组的状态 {分组: {"hash", "etag", "last_modified", "fetched_at"}}"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT grp, hash, etag, last_modified, fetched_at FROM sync_state WHERE source = ?", (source,)
+            )
+            return {
+                grp: {"hash": h, "etag": etag, "last_modified": modified, "fetched_at": fetched_at}
+                for grp, h, etag, modified, fetched_at in cursor
+            }
+
+    # ===== 写入 =====
+    def set_sync_state(self, source: str, states: dict):
+        """写入同步分组的状态（在对应测点写入目录之后调用）"""
+        if not states:
+            return
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sync_state (source, grp, hash, etag, last_modified, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (source, grp, st.get("hash"), st.get("etag"), st.get("last_modified"), st.get("fetched_at"))
+                        for grp, st in states.items()
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"测点同步状态写入失败: {e}")
+
+    def upsert(self, data: dict, source: str = "") -> int:
+        """
+        增量写入 {测点类型: [测点字典, ...]}，按 (类型, 测点名) 新增或更新，
+        未变化的测点不写盘。所有变更在一个事务内提交，并使该来源版本号加一。
+        返回新增与变更的测点数；写入失败（如数据库被锁定）时回滚并抛出 sqlite3.Error。
+        """
+        with self._lock:
+            try:
+                # IMMEDIATE 事务先取得写锁，保证内存中的字符串编码与数据库一致
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                logger.error(f"测点目录写入失败: {e}")
+                raise
+            try:
+                self.refresh()
+                self._ensure_codes()
+                new_strings = []
+                pending = []
+                seen = set()
+
+                def intern(value):
+                    if value is None:
+                        return MISSING
+                    code = self._codes.get(value)
+                    if code is None:
+                        code = len(self._pool)
+                        self._pool.append(value)
+                        self._codes[value] = code
+                        new_strings.append((code, value))
+                    return code
+
+                for type_name, points in (data or {}).items():
+                    type_code = intern(str(type_name))
+                    for point in points:
+                        values = _normalize(point)
+                        if values[0] is None or (type_code, values[0]) in seen:
+                            continue
+                        seen.add((type_code, values[0]))
+                        codes = tuple(intern(v) for v in values)
+                        row = self._row_of.get((type_code, codes[0]))
+                        if row is not None and self._row_codes(row) == codes:
+                            continue
+                        pending.append((type_code, codes, row))
+                if not pending:
+                    self._conn.execute("ROLLBACK")
+                    self._discard_strings(new_strings)
+                    return 0
+
+                version = self.version(source) + 1
+                self._conn.executemany("INSERT INTO strings (id, value) VALUES (?, ?)", new_strings)
+                self._conn.executemany(
+                    f"INSERT INTO points ({', '.join(_CODE_COLUMNS)}, source, version) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(type_id, name_id) DO UPDATE SET desc_id = excluded.desc_id,"
+                    " param_id = excluded.param_id, device_id = excluded.device_id,"
+                    " source = excluded.source, version = excluded.version",
+                    [(type_code, *codes, source, version) for type_code, codes, _ in pending],
+                )
+                self._conn.execute(
+                    "INSERT INTO sources (source, version, updated_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(source) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at",
+                    (source, version, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"测点目录写入失败: {e}")
+                self._load()
+                raise
+
+            for type_code, codes, row in pending:
+                if row is None:
+                    self._append_row(type_code, codes)
+                else:
+                    for field, code in zip(FIELDS[1:], codes[1:]):
+                        self._columns[field][row] = code
+            self._versions[source] = version
+            self._data_version = self._current_data_version()
+            return len(pending)
+
+    def _discard_strings(self, new_strings):
+        """撤销未提交的字符串驻留"""
+        for code, value in reversed(new_strings):
+            self._pool.pop()
+            del self._codes[value]
+
+    def import_legacy(self, filename: str = LEGACY_CACHE_FILE) -> int:
+        """导入旧的 point_cache.pkl（仅在目录为空时调用）"""
+        try:
+            with open(filename, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(f"旧测点缓存读取失败: {e}")
+            return 0
+        try:
+            count = self.upsert(data, source="legacy")
+        except sqlite3.Error:
+            return 0
+        logger.info(f"已从 {filename} 导入 {count} 个测点")
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_point_catalog() -> PointCatalog:
+    """进程内共享的测点目录实例，首次调用时加载（目录为空且存在旧缓存时自动导入）"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = PointCatalog()
+            if not len(_catalog) and os.path.exists(LEGACY_CACHE_FILE):
+                _catalog.import_legacy()
+        else:
+            _catalog.refresh()
+        return _catalog
@@ -0,0 +1,95 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: point_catalog_sync.py
+@time: 2025/7/24 16:20
+@desc: 测点目录后台定时同步：按计划在工作线程中调用各测点搜索器的增量同步，使对话框打开时目录已是最新
+"""
+from PyQt5.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+from loguru import logger
+
+from application.utils.threading_utils import Worker
+
+SYNC_INTERVAL_MS = 10 * 60 * 1000  # 定时检查间隔，只有超过有效期的分组会被重新请求
+SYNC_START_DELAY_MS = 3000  # 工具加载完成后首次同步的延迟，避开启动阶段
+
+
+def _sync_all(fetchers, force):
+    """依次同步各搜索器（在工作线程中执行），返回有变化的测点 {测点类型: [测点字典, ...]}"""
+    changed = {}
+    for fetcher in fetchers:
+        if fetcher is None or not hasattr(fetcher, "sync"):
+            continue
+        try:
+            for ptype, points in fetcher.sync(force=force).items():
+                changed.setdefault(ptype, []).extend(points)
+        except Exception as e:
+            logger.warning(f"测点目录同步失败: {e}")
+    return changed
+
+
+class PointCatalogSync(QObject):
+    """
+    测点目录同步调度（进程内共享，只在主线程中调用）。
+
+    start 传入获取当前测点搜索器的函数（配置重新加载后自动使用新的搜索器），
+    之后每 SYNC_INTERVAL_MS 在后台同步一次；同步进行中再次请求时不重复发起。
+    同步结果已由搜索器写入测点目录，synced 信号携带有变化的测点，供打开中的界面刷新。
+    """
+
+    synced = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool.globalInstance()
+        self._get_fetchers = None
+        self._running = False
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.sync_now)
+
+    def start(self, get_fetchers, interval_ms: int = SYNC_INTERVAL_MS, delay_ms: int = SYNC_START_DELAY_MS):
+        self._get_fetchers = get_fetchers
+        self._timer.start(interval_ms)
+        QTimer.singleShot(delay_ms, self.sync_now)
+
+    def stop(self):
+        self._timer.stop()
+
+    def sync_now(self, force: bool = False) -> bool:
+        """立即在后台同步一次，未启动或已有同步进行中时返回 False"""
+        if self._get_fetchers is None or self._running:
+            return False
+        try:
+            fetchers = list(self._get_fetchers() or [])
+        except Exception as e:
+            logger.warning(f"获取测点搜索器失败: {e}")
+            return False
+        if not fetchers:
+            return False
+        self._running = True
+        worker = Worker(_sync_all, fetchers, force)
+        worker.signals.finished.connect(self._on_synced)
+        worker.signals.error.connect(self._on_error)
+        self.thread_pool.start(worker)
+        return True
+
+    def _on_synced(self, changed):
+        self._running = False
+        if changed:
+            self.synced.emit(changed)
+
+    def _on_error(self, message):
+        self._running = False
+        logger.error(f"测点目录同步异常: {message}")
+
+
+_sync = None
+
+
+def get_point_catalog_sync() -> PointCatalogSync:
+    """进程内共享的测点目录同步调度（首次调用须在主线程）"""
+    global _sync
+    if _sync is None:
+        _sync = PointCatalogSync()
+    return _sync
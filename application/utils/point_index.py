@@ -0,0 +1,203 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: point_index.py
+@time: 2025/7/23 09:40
+@desc: 测点本地搜索索引：基于测点目录字符串池的二元组倒排索引，支持多关键词排序、前缀/模糊匹配、拼音首字母与增量更新
+"""
+import math
+import threading
+
+import numpy as np
+
+from application.utils.point_catalog import FIELDS, get_point_catalog
+
+try:
+    from pypinyin import lazy_pinyin, Style  # 可选：中文的拼音首字母检索
+
+    _has_pypinyin = True
+except ImportError:
+    _has_pypinyin = False
+
+# 各字段命中的权重
+FIELD_WEIGHTS = {"测点名": 3.0, "测点描述": 2.0, "设备名": 1.0, "参数类型": 1.0}
+# 命中等级：整串相等 > 前缀 > 子串 > 模糊
+LEVEL_EXACT, LEVEL_PREFIX, LEVEL_SUBSTRING, LEVEL_FUZZY = 3.0, 2.0, 1.0, 0.5
+FUZZY_MIN_OVERLAP = 0.6  # 模糊匹配要求的关键词二元组覆盖率
+TAIL_REBUILD_MIN = 5000  # 增量部分超过该字符串数且超过主索引的 1/5 时合并重建
+
+_SEPARATOR = 0  # 各字符串之间的分隔字符（码位 0，不会出现在关键词中）
+
+
+def _initials(text: str) -> str:
+    """含中文时返回拼音首字母串，否则返回空串"""
+    if not _has_pypinyin or not any("一" <= ch <= "鿿" for ch in text):
+        return ""
+    return "".join(lazy_pinyin(text, style=Style.FIRST_LETTER, errors="ignore")).lower()
+
+
+def _to_codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+class _SegmentIndex:
+    """
+    一段连续编码 [first, first+len(strings)) 的字符串的二元组倒排索引。
+
+    所有字符串小写后以分隔符拼接为一个码位数组，倒排表记录每个二元组出现的位置（升序）。
+    查询时取关键词中出现次数最少的二元组的位置作为候选，再逐字符向量化校验，
+    得到关键词的全部出现位置，整个过程没有逐字符串的 Python 循环。
+    """
+
+    def __init__(self, strings, first: int):
+        strings = list(strings)
+        self.first = first
+        self.end = first + len(strings)
+        texts, owners = [], []
+        for offset, value in enumerate(strings):
+            value = value.lower()
+            texts.append(value)
+            owners.append(offset)
+            initials = _initials(value)
+            if initials:
+                texts.append(initials)
+                owners.append(offset)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        self._starts = np.cumsum(lengths + 1) - lengths - 1
+        self._lengths = lengths
+        self._codes = np.asarray(owners, dtype=np.int64) + first
+        self._chars = _to_codepoints("\0".join(texts) + "\0")
+
+        chars = self._chars
+        valid = (chars[:-1] != _SEPARATOR) & (chars[1:] != _SEPARATOR)
+        positions = np.flatnonzero(valid)
+        keys = (chars[:-1][valid].astype(np.int64) << 21) | chars[1:][valid]
+        order = np.argsort(keys, kind="stable")
+        self._postings = positions[order].astype(np.int32)
+        self._keys, starts = np.unique(keys[order], return_index=True)
+        self._key_starts = np.append(starts, len(order))
+
+    def _posting(self, key):
+        i = np.searchsorted(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return self._postings[:0]
+        return self._postings[self._key_starts[i]:self._key_starts[i + 1]]
+
+    def _occurrences(self, word: np.ndarray) -> np.ndarray:
+        """关键词在拼接数组中的全部起始位置"""
+        m = len(word)
+        chars = self._chars
+        if m == 1:
+            return np.flatnonzero(chars == word[0])
+        keys = (word[:-1].astype(np.int64) << 21) | word[1:]
+        postings = [self._posting(k) for k in keys]
+        j = min(range(len(postings)), key=lambda i: len(postings[i]))
+        pos = postings[j].astype(np.int64) - j
+        pos = pos[(pos >= 0) & (pos + m <= len(chars))]
+        for t in range(m):
+            if t in (j, j + 1):
+                continue
+            pos = pos[chars[pos + t] == word[t]]
+        return pos
+
+    def scores(self, keyword: str, fuzzy: bool = True):
+        """关键词命中的字符串编码及命中等级 (codes, levels)，同一字符串可能重复出现"""
+        word = _to_codepoints(keyword)
+        pos = self._occurrences(word)
+        if pos.size:
+            seg = np.searchsorted(self._starts, pos, side="right") - 1
+            at_start = pos == self._starts[seg]
+            levels = np.where(at_start, LEVEL_PREFIX, LEVEL_SUBSTRING)
+            levels[at_start & (self._lengths[seg] == len(word))] = LEVEL_EXACT
+            return self._codes[seg], levels
+        if not fuzzy or len(word) < 3:
+            return self._codes[:0], np.empty(0)
+
+        # 模糊匹配：按包含关键词二元组的种类数计分（容忍错字、漏字与顺序调整）
+        keys = np.unique((word[:-1].astype(np.int64) << 21) | word[1:])
+        segs = [np.unique(np.searchsorted(self._starts, self._posting(k), side="right") - 1) for k in keys]
+        counts = np.bincount(np.concatenate(segs), minlength=len(self._starts)) if segs else np.zeros(0)
+        hit = np.flatnonzero(counts >= max(1, math.ceil(len(keys) * FUZZY_MIN_OVERLAP)))
+        return self._codes[hit], LEVEL_FUZZY * counts[hit] / len(keys)
+
+
+class PointSearchIndex:
+    """
+    测点目录上的搜索索引。
+
+    索引建立在目录的字符串池上（相同的描述、设备名只索引一次），
+    命中的字符串编码经编码列映射到测点行，按字段权重 × 命中等级累加打分。
+    多个关键词之间为“与”关系；关键词没有精确命中时按二元组覆盖率模糊匹配。
+    目录新增的字符串进入增量索引，增量部分过大时与主索引合并重建。
+    """
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog or get_point_catalog()
+        self._lock = threading.Lock()
+        self._main = None
+        self._tail = None
+
+    def _segments(self):
+        self.catalog.refresh()
+        with self._lock:
+            strings = self.catalog.strings()
+            if self._main is None or self._main.end > len(strings):
+                self._main, self._tail = _SegmentIndex(strings, 0), None
+            elif self._main.end < len(strings):
+                tail_size = len(strings) - self._main.end
+                if tail_size > max(TAIL_REBUILD_MIN, self._main.end // 5):
+                    self._main, self._tail = _SegmentIndex(strings, 0), None
+                elif self._tail is None or self._tail.end != len(strings):
+                    self._tail = _SegmentIndex(strings[self._main.end:], self._main.end)
+            return [s for s in (self._main, self._tail) if s is not None], len(strings)
+
+    def build(self):
+        """预先建立索引（可在后台线程调用），否则在首次搜索时建立"""
+        self._segments()
+
+    def search(self, query: str, type_name: str = None, limit: int = None, fuzzy: bool = True) -> np.ndarray:
+        """
+        搜索测点，返回按相关度降序排列的目录行号（相关度相同时保持写入顺序）。
+        query 按空白切分为多个关键词；type_name 不为空时只在该类型中搜索。
+        """
+        keywords = query.lower().split()
+        if not keywords:
+            return np.empty(0, dtype=np.int64)
+        segments, n_strings = self._segments()
+        columns = {field: self.catalog.column(field) for field in FIELDS}
+        n_rows = len(columns[FIELDS[0]])
+        total = np.zeros(n_rows)
+        matched = np.ones(n_rows, dtype=bool)
+        for keyword in keywords:
+            # 每个字符串的最高命中等级，末尾多一个 0 供缺失值（编码 -1）索引
+            table = np.zeros(n_strings + 1)
+            for segment in segments:
+                codes, levels = segment.scores(keyword, fuzzy)
+                np.maximum.at(table, codes, levels)
+            score = np.zeros(n_rows)
+            for field, column in columns.items():
+                np.maximum(score, FIELD_WEIGHTS.get(field, 1.0) * table[column], out=score)
+            matched &= score > 0
+            total += score
+
+        if type_name is not None:
+            in_type = np.zeros(n_rows, dtype=bool)
+            in_type[np.array(self.catalog.rows(type_name), dtype=np.int64)] = True
+            matched &= in_type
+        rows = np.flatnonzero(matched)
+        rows = rows[np.argsort(-total[rows], kind="stable")]
+        return rows[:limit] if limit is not None else rows
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_point_index() -> PointSearchIndex:
+    """进程内共享的测点搜索索引（基于共享的测点目录）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PointSearchIndex()
+        return _index
@@ -0,0 +1,268 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: point_search_service.py
+@time: 2025/7/24 10:15
+@desc: 远程测点搜索服务：防抖、取消过期请求、合并相同的并发查询、跨对话框的结果缓存（TTL）、细化查询本地过滤与分页加载
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QThreadPool, QTimer
+from loguru import logger
+
+from application.utils.threading_utils import Worker
+
+SEARCH_DEBOUNCE_MS = 300  # 输入停止多久后发起请求
+SEARCH_CACHE_TTL = 300  # 结果缓存有效期（秒）
+SEARCH_CACHE_SIZE = 64  # 缓存的查询数上限
+SEARCH_PAGE_SIZE = 200  # 每次请求的条数
+
+
+class _SearchState:
+    """一个查询（搜索器组合 + 关键词）已取得的分页结果"""
+
+    def __init__(self, key, fetchers, keyword):
+        self.key = key
+        self.fetchers = fetchers
+        self.keyword = keyword
+        self.results = {}  # {测点类型: [测点字典, ...]}
+        self.offsets = [0] * len(fetchers)
+        self.totals = [None] * len(fetchers)
+        self.created = time.time()
+
+    @property
+    def complete(self) -> bool:
+        """所有搜索器的匹配结果是否都已取完"""
+        return all(total is not None and offset >= total for offset, total in zip(self.offsets, self.totals))
+
+    @property
+    def fetched(self) -> bool:
+        """是否已取得过至少一页"""
+        return any(total is not None for total in self.totals)
+
+    def expired(self) -> bool:
+        return time.time() - self.created > SEARCH_CACHE_TTL
+
+    def merge(self, pages):
+        for i, results, count, total in pages:
+            for tag_type, points in results.items():
+                self.results.setdefault(tag_type, []).extend(points)
+            self.offsets[i] += count
+            self.totals[i] = total
+
+
+def _fetch_page(fetchers, keyword, offsets, totals, page_size, cancelled: threading.Event):
+    """
+    每个尚未取完的搜索器取下一页（在工作线程中执行）。
+    返回 [(搜索器序号, 结果, 本页条数, 匹配总数), ...]；取消后不再发起后续请求，已取得的页照常返回。
+    不支持分页的搜索器一次取全部结果。
+    """
+    pages = []
+    for i, fetcher in enumerate(fetchers):
+        if cancelled.is_set():
+            break
+        if totals[i] is not None and offsets[i] >= totals[i]:
+            continue
+        if hasattr(fetcher, "search_page"):
+            results, total = fetcher.search_page(keyword, offsets[i], page_size)
+            count = sum(len(points) for points in results.values())
+            # 服务端返回的条数不足一页时视为已取完，避免总数不准时无限翻页
+            if count < page_size:
+                total = offsets[i] + count
+        else:
+            results = fetcher.call(search_text=keyword) or {}
+            count = total = sum(len(points) for points in results.values())
+        pages.append((i, results, count, total))
+    return pages
+
+
+class PointSearchService(QObject):
+    """
+    远程测点搜索服务（进程内共享，只在主线程中调用）。
+
+    - 每个调用方（owner，通常是对话框）同时只有一个有效查询：新查询到来时，
+      防抖中的旧查询直接丢弃，进行中的旧查询若没有其他调用方等待则取消（不再请求后续数据），结果不再回调；
+    - 相同搜索器与关键词的并发查询合并为一次请求；
+    - 结果按查询缓存 SEARCH_CACHE_TTL 秒，在各对话框之间共享；
+    - 若某个已取完全部结果的查询是新关键词的前缀（如 "abc" → "abcd"），直接在本地过滤得到结果；
+    - 每次只取一页，调用方滚动到底部时用 fetch_more 取下一页，回调收到的是该查询累计的全部结果。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool.globalInstance()
+        self._cache = OrderedDict()  # 查询键 -> _SearchState
+        self._inflight = {}  # 查询键 -> 取消标志
+        self._owners = {}  # 调用方 -> (查询键, 结果回调, 错误回调)
+        self._timers = {}  # 调用方 -> 防抖定时器
+        self._pending = {}  # 调用方 -> (搜索器, 关键词, 结果回调, 错误回调)
+
+    # ===== 对外接口 =====
+    def search(self, owner, fetchers, keyword: str, on_result, on_error=None, debounce_ms: int = SEARCH_DEBOUNCE_MS):
+        """
+        发起查询。on_result(keyword, results, complete) 在取得每一页后回调（结果为累计值），
+        on_error(message) 在请求失败时回调。
+        """
+        self.cancel(owner)
+        if owner not in self._timers:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._dispatch(owner))
+            self._timers[owner] = timer
+            if isinstance(owner, QObject):
+                owner.destroyed.connect(lambda *_: self._forget(owner))
+        self._pending[owner] = (list(fetchers), keyword, on_result, on_error)
+        self._timers[owner].start(debounce_ms)
+
+    def fetch_more(self, owner) -> bool:
+        """为调用方当前的查询请求下一页，没有更多结果或正在请求时返回 False"""
+        key = self._owners.get(owner, (None,))[0]
+        state = self._cache.get(key)
+        if state is None or state.complete or key in self._inflight:
+            return False
+        self._start_fetch(state)
+        return True
+
+    def has_more(self, owner) -> bool:
+        key = self._owners.get(owner, (None,))[0]
+        state = self._cache.get(key)
+        return state is not None and not state.complete
+
+    def cancel(self, owner):
+        """放弃调用方的查询（防抖中的直接丢弃，进行中的在没有其他调用方等待时取消）"""
+        self._pending.pop(owner, None)
+        timer = self._timers.get(owner)
+        if timer is not None:
+            timer.stop()
+        key = self._owners.pop(owner, (None,))[0]
+        if key in self._inflight and not any(k == key for k, _, _ in self._owners.values()):
+            self._inflight[key].set()
+
+    # ===== 内部实现 =====
+    def _forget(self, owner):
+        self.cancel(owner)
+        self._timers.pop(owner, None)
+
+    @staticmethod
+    def _key(fetchers, keyword):
+        return tuple(id(fetcher) for fetcher in fetchers), keyword
+
+    def _cached(self, key):
+        state = self._cache.get(key)
+        if state is not None and state.expired():
+            del self._cache[key]
+            return None
+        if state is not None:
+            self._cache.move_to_end(key)
+        return state
+
+    def _store(self, state):
+        self._cache[state.key] = state
+        self._cache.move_to_end(state.key)
+        while len(self._cache) > SEARCH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _refine(self, fetchers, keyword):
+        """由已取完的前缀查询在本地过滤出新关键词的结果，没有可用的前缀查询时返回 None"""
+        fetcher_ids = self._key(fetchers, keyword)[0]
+        lowered = keyword.lower()
+        best = None
+        for (ids, cached_keyword), state in list(self._cache.items()):
+            if ids != fetcher_ids or not keyword.startswith(cached_keyword) or cached_keyword == keyword:
+                continue
+            if state.expired() or not state.complete:
+                continue
+            if best is None or len(cached_keyword) > len(best.keyword):
+                best = state
+        if best is None:
+            return None
+        state = _SearchState(self._key(fetchers, keyword), fetchers, keyword)
+        state.created = best.created  # 有效期不超过来源查询
+        for tag_type, points in best.results.items():
+            matched = [
+                p for p in points
+                if lowered in str(p.get("测点名", "")).lower() or lowered in str(p.get("测点描述", "")).lower()
+            ]
+            if matched:
+                state.results[tag_type] = matched
+        count = sum(len(points) for points in state.results.values())
+        # 结果整体记在第一个搜索器名下，各搜索器均视为已取完
+        state.offsets = [count] + [0] * (len(fetchers) - 1)
+        state.totals = list(state.offsets)
+        return state
+
+    def _dispatch(self, owner):
+        request = self._pending.pop(owner, None)
+        if request is None:
+            return
+        fetchers, keyword, on_result, on_error = request
+        key = self._key(fetchers, keyword)
+        self._owners[owner] = (key, on_result, on_error)
+
+        state = self._cached(key)
+        if state is None:
+            state = self._refine(fetchers, keyword)
+            if state is not None:
+                logger.debug(f"远程搜索 '{keyword}' 由已缓存的前缀查询本地过滤得到")
+                self._store(state)
+        if state is None:
+            state = _SearchState(key, fetchers, keyword)
+            self._store(state)
+        if state.fetched:
+            self._notify(key, state, only=owner)
+        elif key not in self._inflight:
+            self._start_fetch(state)
+        else:
+            # 相同查询正在进行，完成后一并回调；若它已被取消（如取消后立即重新发起），撤销取消
+            self._inflight[key].clear()
+
+    def _start_fetch(self, state):
+        cancelled = threading.Event()
+        self._inflight[state.key] = cancelled
+        worker = Worker(
+            _fetch_page, state.fetchers, state.keyword, list(state.offsets), list(state.totals),
+            SEARCH_PAGE_SIZE, cancelled
+        )
+        worker.signals.finished.connect(lambda pages: self._on_page(state, cancelled, pages))
+        worker.signals.error.connect(lambda message: self._on_error(state, cancelled, message))
+        self.thread_pool.start(worker)
+
+    def _on_page(self, state, cancelled, pages):
+        if self._inflight.get(state.key) is cancelled:
+            del self._inflight[state.key]
+        # 已取得的页总是并入缓存，即使查询已被取消；仍在等待该查询的调用方照常回调
+        state.merge(pages)
+        self._notify(state.key, state)
+
+    def _on_error(self, state, cancelled, message):
+        if self._inflight.get(state.key) is cancelled:
+            del self._inflight[state.key]
+        if not state.results and self._cache.get(state.key) is state:
+            del self._cache[state.key]
+        for owner, (key, _, on_error) in list(self._owners.items()):
+            if key == state.key and on_error is not None:
+                on_error(message)
+
+    def _notify(self, key, state, only=None):
+        for owner, (owner_key, on_result, _) in list(self._owners.items()):
+            if owner_key != key or (only is not None and owner is not only):
+                continue
+            try:
+                on_result(state.keyword, state.results, state.complete)
+            except RuntimeError:
+                # 调用方的界面对象已销毁
+                self._forget(owner)
+
+
+_service = None
+
+
+def get_point_search_service() -> PointSearchService:
+    """进程内共享的远程测点搜索服务（首次调用须在主线程）"""
+    global _service
+    if _service is None:
+        _service = PointSearchService()
+    return _service
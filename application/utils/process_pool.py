@@ -0,0 +1,298 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: process_pool.py
+@time: 2025/7/20 14:20
+@desc: 算法工具的多进程执行后端：常驻进程池（预先导入 sklearn 等重模块），大数组经共享内存传递，支持进度回调与取消
+"""
+import atexit
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+from loguru import logger
+
+from application.utils.series_frame import SeriesFrame
+
+SHARED_MIN_BYTES = 1 << 16  # 小于该大小的数组直接序列化，不值得走共享内存
+MAX_TASKS = 64  # 同时进行的任务数上限（取消标志槽位数）
+WARM_MODULES = (
+    "numpy",
+    "scipy.stats",
+    "sklearn.cluster",
+    "sklearn.mixture",
+    "sklearn.preprocessing",
+)
+
+
+class TaskCancelled(Exception):
+    """任务被调用方取消"""
+
+
+# ===== 子进程侧 =====
+_progress_queue = None
+_cancel_flags = None
+_current_task = None  # (任务号, 取消标志槽位)
+
+
+def _init_worker(progress_queue, cancel_flags, modules):
+    """进程启动时执行一次：保存通信对象并预先导入重模块，之后的任务无需再导入"""
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _noop():
+    return os.getpid()
+
+
+def report_progress(value):
+    """算法内部上报进度（0~100），不在进程池中运行时为空操作"""
+    if _progress_queue is not None and _current_task is not None:
+        _progress_queue.put((_current_task[0], value))
+
+
+def check_cancelled():
+    """算法内部的取消检查点，任务已被取消时抛出 TaskCancelled，不在进程池中运行时为空操作"""
+    if _cancel_flags is not None and _current_task is not None and _cancel_flags[_current_task[1]]:
+        raise TaskCancelled()
+
+
+class SharedArrayRef:
+    """共享内存中数组的描述，替代数组本身被序列化"""
+    __slots__ = ("name", "shape", "dtype", "order")
+
+    def __init__(self, name, shape, dtype, order="C"):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.order = order
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype, self.order
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype, self.order = state
+
+
+class _Rebuild:
+    """按 __reduce__ 拆开的对象（构造函数 + 参数），参数中的大数组已换成共享内存引用"""
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+
+    def __getstate__(self):
+        return self.fn, self.args
+
+    def __setstate__(self, state):
+        self.fn, self.args = state
+
+
+def _export(obj, blocks: list):
+    """把参数中的大数组复制到共享内存并替换为 SharedArrayRef，递归处理 dict/list/tuple 与 SeriesFrame"""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject or obj.nbytes < SHARED_MIN_BYTES:
+            return obj
+        shm = shared_memory.SharedMemory(create=True, size=obj.nbytes)
+        blocks.append(shm)
+        # 保持列主序（如 SeriesFrame 的数值矩阵），子进程中的列切片仍是连续内存
+        order = "F" if obj.flags.f_contiguous and not obj.flags.c_contiguous else "C"
+        np.ndarray(obj.shape, dtype=obj.dtype, buffer=shm.buf, order=order)[...] = obj
+        return SharedArrayRef(shm.name, obj.shape, obj.dtype.str, order)
+    if isinstance(obj, SeriesFrame):
+        fn, args = obj.__reduce__()
+        return _Rebuild(fn, _export(args, blocks))
+    if isinstance(obj, dict):
+        return {k: _export(v, blocks) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_export(v, blocks) for v in obj)
+    return obj
+
+
+def _attach(obj, blocks: list):
+    """子进程中把 SharedArrayRef 还原为共享内存上的数组（零拷贝）"""
+    if isinstance(obj, SharedArrayRef):
+        # spawn 启动的子进程与父进程共用资源追踪器，共享内存统一由父进程释放
+        shm = shared_memory.SharedMemory(name=obj.name)
+        blocks.append(shm)
+        return np.ndarray(obj.shape, dtype=np.dtype(obj.dtype), buffer=shm.buf, order=obj.order)
+    if isinstance(obj, _Rebuild):
+        return obj.fn(*_attach(obj.args, blocks))
+    if isinstance(obj, dict):
+        return {k: _attach(v, blocks) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_attach(v, blocks) for v in obj)
+    return obj
+
+
+def _run_task(task_id, slot, fn, args, kwargs):
+    global _current_task
+    blocks = []
+    _current_task = (task_id, slot)
+    try:
+        check_cancelled()
+        return fn(*_attach(args, blocks), **_attach(kwargs, blocks))
+    finally:
+        _current_task = None
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                # 返回值仍引用共享内存上的数组，映射随其回收释放
+                pass
+
+
+# ===== 父进程侧 =====
+class ProcessTask:
+    """已提交的任务句柄"""
+
+    def __init__(self, pool, task_id, slot, future):
+        self._pool = pool
+        self.task_id = task_id
+        self.slot = slot
+        self.future = future
+
+    def cancel(self):
+        """未开始的任务直接撤销；运行中的任务在下一个检查点抛出 TaskCancelled；已结束的任务不做处理"""
+        if self.future.done() or self.future.cancel():
+            return
+        self._pool._set_cancel_flag(self.task_id, self.slot)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class ProcessPool:
+    """
+    常驻的算法进程池。
+
+    使用 spawn 方式启动（与 Qt 主进程隔离，Windows 与打包后行为一致），
+    进程在首次使用时启动并一直保留，sklearn 等模块只在进程启动时导入一次。
+    参数中的大数组写入共享内存，子进程直接映射，任务结束后由父进程释放。
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._ctx = mp.get_context("spawn")
+        self._progress_queue = self._ctx.Queue()
+        self._cancel_flags = self._ctx.Array("b", MAX_TASKS, lock=False)
+        self._lock = threading.Lock()
+        self._free_slots = list(range(MAX_TASKS))
+        self._slot_owners = {}  # 取消标志槽位 -> 占用该槽位的任务号
+        self._callbacks = {}
+        self._task_ids = itertools.count(1)
+        self._executor = self._create_executor()
+        self._listener = threading.Thread(target=self._dispatch_progress, name="process-pool-progress", daemon=True)
+        self._listener.start()
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._ctx,
+            initializer=_init_worker,
+            initargs=(self._progress_queue, self._cancel_flags, WARM_MODULES),
+        )
+
+    def warm_up(self):
+        """提前启动全部进程（异步），首次计算时无需等待进程启动与模块导入"""
+        for _ in range(self.max_workers):
+            self._executor.submit(_noop)
+
+    def submit(self, fn, *args, progress_callback=None, **kwargs) -> ProcessTask:
+        """提交任务，fn 及其参数须可序列化（模块级函数或工具实例的方法）"""
+        with self._lock:
+            if not self._free_slots:
+                raise RuntimeError("进程池任务数已达上限")
+            slot = self._free_slots.pop()
+            task_id = next(self._task_ids)
+            self._slot_owners[slot] = task_id
+            self._cancel_flags[slot] = 0
+            if progress_callback is not None:
+                self._callbacks[task_id] = progress_callback
+
+        blocks = []
+        try:
+            args = _export(args, blocks)
+            kwargs = _export(kwargs, blocks)
+            try:
+                future = self._executor.submit(_run_task, task_id, slot, fn, args, kwargs)
+            except BrokenProcessPool:
+                logger.warning("算法进程池异常退出，重新创建")
+                self._executor = self._create_executor()
+                future = self._executor.submit(_run_task, task_id, slot, fn, args, kwargs)
+        except Exception:
+            self._release(task_id, slot, blocks)
+            raise
+        future.add_done_callback(lambda _: self._release(task_id, slot, blocks))
+        return ProcessTask(self, task_id, slot, future)
+
+    def _release(self, task_id, slot, blocks):
+        for shm in blocks:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._callbacks.pop(task_id, None)
+            if self._slot_owners.get(slot) == task_id:
+                del self._slot_owners[slot]
+            self._free_slots.append(slot)
+
+    def _set_cancel_flag(self, task_id, slot):
+        """只在槽位仍属于该任务时置位，避免迟到的取消影响复用该槽位的新任务"""
+        with self._lock:
+            if self._slot_owners.get(slot) == task_id:
+                self._cancel_flags[slot] = 1
+
+    def _dispatch_progress(self):
+        while True:
+            try:
+                message = self._progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            task_id, value = message
+            callback = self._callbacks.get(task_id)
+            if callback is not None:
+                try:
+                    callback(value)
+                except Exception as e:
+                    logger.error(f"进度回调失败: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPool:
+    """全局进程池，首次调用时创建并预热"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool()
+            _pool.warm_up()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,78 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: ring_buffer.py
+@time: 2025/7/18 10:15
+@desc: 时序数据环形缓冲区，实时刷新模式下按测点预分配，追加尾部数据不重新分配内存，读取为零拷贝视图
+"""
+import numpy as np
+
+
+class TimeSeriesRingBuffer:
+    """
+    固定容量的 (时间戳, 数值) 环形缓冲区。
+
+    底层数组长度为两倍容量，每个样本同时写入 i 与 i + capacity 两个位置，
+    因此任意时刻的有效数据在底层数组中都是连续的一段，view() 返回切片视图，
+    可直接交给 PlotDataItem.setData，无需拼接或复制。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), 1)
+        self._ts = np.empty(2 * self.capacity, dtype=np.float64)
+        self._values = np.empty(2 * self.capacity, dtype=np.float64)
+        self._head = 0  # 下一个写入位置（0 ~ capacity-1）
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def last_ts(self):
+        if not self._count:
+            return None
+        return float(self._ts[(self._head - 1) % self.capacity])
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def append(self, ts, values) -> int:
+        """
+        追加一批样本，时间戳不晚于当前最后一个样本的会被丢弃（增量拉取的重叠部分）。
+        容量不足时覆盖最早的样本，返回实际写入条数。
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        last = self.last_ts
+        if last is not None and len(ts):
+            start = int(np.searchsorted(ts, last, side="right"))
+            ts, values = ts[start:], values[start:]
+        n = len(ts)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            ts, values = ts[-self.capacity:], values[-self.capacity:]
+            n = self.capacity
+        pos = (self._head + np.arange(n)) % self.capacity
+        self._ts[pos] = ts
+        self._ts[pos + self.capacity] = ts
+        self._values[pos] = values
+        self._values[pos + self.capacity] = values
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        return n
+
+    def drop_before(self, cutoff: float) -> int:
+        """丢弃时间戳早于 cutoff 的样本（滑动时间窗口），返回丢弃条数"""
+        ts, _ = self.view()
+        drop = int(np.searchsorted(ts, cutoff, side="left"))
+        self._count -= drop
+        return drop
+
+    def view(self):
+        """返回 (时间戳, 数值) 的连续视图，调用方不应修改"""
+        start = (self._head - self._count) % self.capacity
+        end = start + self._count
+        return self._ts[start:end], self._values[start:end]
@@ -0,0 +1,225 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: series_frame.py
+@time: 2025/7/25 14:20
+@desc: 列式时序帧：共用时间戳时为公共时间索引 + 二维数值矩阵，否则为各测点原样拼接的一维数组（按需对齐），每次取数只构建一次，供趋势、直方图、相关性与训练区间推荐共用
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+
+def _readonly(*arrays):
+    for array in arrays:
+        if array is not None:
+            array.flags.writeable = False
+
+
+class SeriesFrame(Mapping):
+    """
+    列式时序帧。
+
+    两种布局：
+    - 各测点时间戳完全相同且升序时共用时间索引（shared_index 为 True）：index 为公共时间索引（float64，形状 (n,)），
+      values 为列主序的数值矩阵（形状 (n, k)），第 j 列对应测点 names[j]，列切片是连续内存的零拷贝视图；
+    - 否则为不规则布局：各测点的 ts、ys 原样首尾拼接为两个一维数组，按偏移量切片，缺测位置不占空间。
+      访问 index/values/valid/matrix 等对齐接口时才取时间戳并集按精确时间对齐（不插值）并缓存结果，
+      对齐矩阵中某测点在某时刻没有样本即为缺测（NaN），同一时刻有多个样本时只保留最后一个。
+
+    frame[name] 总是返回该测点原始的 (ts, ys)（不规则布局时保留原有顺序、重复时间戳与 ±inf），
+    可直接替代 {测点名: (ts, ys)} 字典交给原有的绘图与统计代码；
+    valid 为有效掩码（有样本且为有限值），matrix() 中无效位置统一为 NaN，可直接交给按 NaN 处理缺测的算法。
+
+    帧构建后只读（数组不可写），可在线程、进程之间共享而无需快照复制；
+    序列化时只包含底层数组，交给进程池时经共享内存传递。
+    """
+
+    def __init__(self, names, index=None, values=None, present=None, ragged=None):
+        """
+        对齐布局传入 index、values（缺测为 NaN）与可选的 present（各测点在各时刻是否有样本）；
+        不规则布局传入 ragged=(offsets, ts, ys)，第 j 个测点为 ts[offsets[j]:offsets[j+1]]。
+        """
+        self.names = list(names)
+        self._positions = {name: j for j, name in enumerate(self.names)}
+        self._ragged = ragged
+        self._aligned = None if ragged is not None else (index, values, present)
+        self._valid = None
+        self._clean = None  # 无效位置为 NaN 的数值矩阵（有 ±inf 时才复制）
+        _readonly(index, values, present, *(ragged or ()))
+
+    @classmethod
+    def from_dict(cls, data, dtype=None) -> "SeriesFrame":
+        """
+        由 {测点名: (ts, ys)} 构建（已是 SeriesFrame 时原样返回）。
+        时间戳为空或为 None 的测点被忽略；值中的 None 视为缺测。
+        dtype 为空时，所有测点的数值都是 float32（如紧凑存储的 CompactSeries）则数值为 float32，否则为 float64。
+        """
+        if isinstance(data, SeriesFrame):
+            return data
+        series = []
+        for name, value in (data or {}).items():
+            if value is None:
+                continue
+            ts, ys = value
+            if ts is None or len(ts) == 0:
+                continue
+            series.append((name, np.asarray(ts, dtype=np.float64), ys))
+        if dtype is None:
+            compact = series and all(getattr(ys, "dtype", None) == np.float32 for _, _, ys in series)
+            dtype = np.float32 if compact else np.float64
+        series = [(name, ts, np.asarray(ys, dtype=dtype)) for name, ts, ys in series]
+        names = [name for name, _, _ in series]
+        if not series:
+            return cls(names, np.empty(0), np.empty((0, 0), dtype=dtype, order="F"))
+
+        first = series[0][1]
+        shared = np.all(first[1:] >= first[:-1]) and all(
+            ts.shape == first.shape and np.array_equal(ts, first) for _, ts, _ in series[1:]
+        )
+        if shared:
+            values = np.empty((len(first), len(series)), dtype=dtype, order="F")
+            for j, (_, _, ys) in enumerate(series):
+                values[:, j] = ys
+            return cls(names, first.copy(), values)
+
+        lengths = [len(ts) for _, ts, _ in series]
+        offsets = np.zeros(len(series) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        ts = np.concatenate([ts for _, ts, _ in series])
+        ys = np.concatenate([ys for _, _, ys in series])
+        return cls(names, ragged=(offsets, ts, ys))
+
+    # ===== 映射接口 =====
+    def __getitem__(self, name):
+        """测点原始的 (ts, ys)，均为零拷贝视图"""
+        j = self._positions[name]
+        if self._ragged is not None:
+            offsets, ts, ys = self._ragged
+            lo, hi = offsets[j], offsets[j + 1]
+            return ts[lo:hi], ys[lo:hi]
+        index, values, present = self._aligned
+        if present is None:
+            return index, values[:, j]
+        rows = present[:, j]
+        return index[rows], values[rows, j]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __reduce__(self):
+        # 只序列化底层数组（进程池会把其中的大数组换成共享内存引用），按需对齐的缓存不传递
+        if self._ragged is not None:
+            return SeriesFrame, (self.names, None, None, None, self._ragged)
+        return SeriesFrame, (self.names, *self._aligned)
+
+    # ===== 对齐接口 =====
+    def _align(self):
+        """不规则布局按时间戳并集对齐，结果缓存"""
+        if self._aligned is None:
+            offsets, ts, ys = self._ragged
+            index = np.unique(ts)
+            values = np.full((len(index), len(self.names)), np.nan, dtype=ys.dtype, order="F")
+            present = np.zeros(values.shape, dtype=bool, order="F")
+            rows = np.searchsorted(index, ts)
+            for j in range(len(self.names)):
+                part = slice(offsets[j], offsets[j + 1])
+                values[rows[part], j] = ys[part]  # 同一时刻有多个样本时取最后一个
+                present[rows[part], j] = True
+            _readonly(index, values, present)
+            self._aligned = (index, values, present)
+        return self._aligned
+
+    @property
+    def shared_index(self) -> bool:
+        """各测点是否共用同一组时间戳"""
+        return self._ragged is None and self._aligned[2] is None
+
+    @property
+    def dtype(self):
+        return self._ragged[2].dtype if self._ragged is not None else self._aligned[1].dtype
+
+    @property
+    def index(self) -> np.ndarray:
+        """公共时间索引（不规则布局时为时间戳并集）"""
+        return self._align()[0]
+
+    @property
+    def values(self) -> np.ndarray:
+        """公共时间索引上的数值矩阵（列主序），没有样本的位置为 NaN，其余保持原值"""
+        return self._align()[1]
+
+    @property
+    def valid(self) -> np.ndarray:
+        """有效掩码：有样本且为有限值"""
+        if self._valid is None:
+            _, values, present = self._align()
+            valid = np.isfinite(values)
+            if present is not None:
+                valid &= present
+            _readonly(valid)
+            self._valid = valid
+        return self._valid
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        """底层数组与已生成的对齐缓存占用的字节数"""
+        arrays = list(self._ragged or ()) + list(self._aligned or ()) + [self._valid]
+        if self._clean is not None and self._aligned is not None and self._clean is not self._aligned[1]:
+            arrays.append(self._clean)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def column(self, name) -> np.ndarray:
+        """某测点在公共时间索引上的数值（零拷贝视图，没有样本的位置为 NaN）"""
+        return self.values[:, self._positions[name]]
+
+    def present(self, name):
+        """某测点在公共时间索引上是否有样本，共用时间戳时为 None（全部有样本）"""
+        present = self._align()[2]
+        return None if present is None else present[:, self._positions[name]]
+
+    def valid_values(self, name) -> np.ndarray:
+        """某测点的全部有限值（全部有限时为零拷贝视图）"""
+        ys = self[name][1]
+        mask = np.isfinite(ys)
+        return ys if mask.all() else ys[mask]
+
+    def matrix(self, names=None) -> np.ndarray:
+        """(n, k) 数值矩阵，无效位置为 NaN；names 为空时为全部列（没有 ±inf 时零拷贝），否则按 names 顺序取列"""
+        if self._clean is None:
+            values = self.values
+            clean = values if not np.isinf(values).any() else np.where(self.valid, values, np.nan)
+            if clean is not values:
+                clean = np.asfortranarray(clean)
+                _readonly(clean)
+            self._clean = clean
+        if names is None:
+            return self._clean
+        return self._clean[:, [self._positions[name] for name in names]]
+
+    def select(self, names) -> "SeriesFrame":
+        """只保留 names 中（且存在于帧中）的测点，按 names 的顺序"""
+        names = [name for name in names if name in self._positions]
+        if self._ragged is not None:
+            return SeriesFrame.from_dict({name: self[name] for name in names}, dtype=self.dtype)
+        index, values, present = self._aligned
+        cols = [self._positions[name] for name in names]
+        return SeriesFrame(
+            names, index, np.asfortranarray(values[:, cols]),
+            None if present is None else np.asfortranarray(present[:, cols])
+        )
+
+    def drop(self, names) -> "SeriesFrame":
+        dropped = set(names)
+        return self.select([name for name in self.names if name not in dropped])
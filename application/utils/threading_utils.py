@@ -25,6 +25,9 @@ class Worker(QRunnable):
         self.args = args
         self.policy = kwargs.pop("policy", "extend")
         self.return_type = kwargs.pop("return_type", "Dict")
+        # 为 True 时把 progress 信号作为 progress_callback 传给 fn（如上传进度）
+        if kwargs.pop("with_progress", False):
+            kwargs["progress_callback"] = self.signals.progress.emit
         self.kwargs = kwargs
 
         try:
@@ -65,6 +68,52 @@ class Worker(QRunnable):
             self.signals.error.emit(traceback.format_exc())
 
 
+class ProcessWorker(QRunnable):
+    """
+    在常驻进程池中执行 CPU 密集的算法，信号与 Worker 相同。
+
+    fn 为 BaseTool 实例时调用其 call 方法；progress 信号发送算法上报的进度（0~100），
+    cancel() 后任务在下一个检查点终止，并通过 error 信号发送“任务已取消”。
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.fn = getattr(fn, "call", fn)
+        self.args = args
+        self.kwargs = kwargs
+        self._task = None
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        if self._task is not None:
+            self._task.cancel()
+
+    @pyqtSlot()
+    def run(self):
+        from concurrent.futures import CancelledError
+        from application.utils.process_pool import get_process_pool, TaskCancelled
+
+        try:
+            if self._cancelled:
+                raise TaskCancelled()
+            self._task = get_process_pool().submit(
+                self.fn, *self.args, progress_callback=self.signals.progress.emit, **self.kwargs
+            )
+            if self._cancelled:
+                self._task.cancel()
+            result = self._task.result()
+            self.signals.finished.emit(result)
+        except (TaskCancelled, CancelledError):
+            logger.info("算法任务已取消")
+            self.signals.error.emit("任务已取消")
+        except Exception:
+            import traceback
+            logger.error(f"ProcessWorker error: {traceback.format_exc()}")
+            self.signals.error.emit(traceback.format_exc())
+
+
 class DownloadThread(QThread):
     progress_signal = pyqtSignal(int)  # 进度信号
     finished_signal = pyqtSignal(str)  # 完成信号（返回文件路径）
@@ -0,0 +1,116 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: trend_store.py
+@time: 2025/7/26 10:15
+@desc: 趋势数据的列式文件导出与导入：Arrow IPC（可内存映射，重新打开无需解析）与 Parquet（压缩，适合作为数据集上传）
+"""
+import datetime
+import json
+import os
+
+import numpy as np
+
+from application.utils.series_frame import SeriesFrame
+
+try:
+    import pyarrow as pa  # 可选：列式文件读写
+    import pyarrow.parquet as pq
+
+    _has_pyarrow = True
+except ImportError:
+    _has_pyarrow = False
+
+TIMESTAMP_COLUMN = "timestamp"  # UTC 毫秒时间戳列，其余每列为一个测点
+METADATA_KEY = b"trend_window"  # 文件元数据中保存取数窗口与测点信息的键
+ARROW_SUFFIXES = (".arrow", ".feather")
+PARQUET_SUFFIXES = (".parquet",)
+FILE_FILTER = "Arrow IPC (*.arrow);;Parquet (*.parquet)"
+
+
+def _require_pyarrow():
+    if not _has_pyarrow:
+        raise RuntimeError("趋势数据导出/导入需要安装 pyarrow")
+
+
+def _file_format(path: str) -> str:
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    raise ValueError(f"不支持的文件类型: {suffix}（可选 {', '.join(ARROW_SUFFIXES + PARQUET_SUFFIXES)}）")
+
+
+def _encode_meta(meta: dict) -> bytes:
+    def default(value):
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return str(value)
+
+    return json.dumps(meta or {}, ensure_ascii=False, default=default).encode("utf-8")
+
+
+def frame_to_table(data, meta: dict = None):
+    """
+    把 SeriesFrame（或 {测点名: (ts, ys)}）转为 Arrow 表：时间戳列加每个测点一列。
+    测点在某时刻没有样本时为 null，有样本但为 NaN/±inf 时保留原值；数值列保持帧的精度（float32/float64）。
+    各测点时间戳不同时按时间戳并集对齐，同一测点在同一时刻的重复样本只保留最后一个。
+    """
+    _require_pyarrow()
+    frame = SeriesFrame.from_dict(data)
+    millis = np.rint(frame.index * 1000).astype(np.int64)
+    columns = [pa.array(millis, type=pa.timestamp("ms", tz="UTC"))]
+    for name in frame.names:
+        present = frame.present(name)
+        columns.append(pa.array(frame.column(name), mask=None if present is None else ~present))
+    schema_meta = {METADATA_KEY: _encode_meta(meta)}
+    return pa.Table.from_arrays(columns, names=[TIMESTAMP_COLUMN] + list(frame.names), metadata=schema_meta)
+
+
+def save_trends(path: str, data, meta: dict = None) -> str:
+    """
+    保存趋势数据，格式由扩展名决定：.arrow/.feather 为未压缩的 Arrow IPC 文件（可内存映射），
+    .parquet 为 zstd 压缩的 Parquet 文件。meta 为取数窗口、测点信息等，随文件保存。
+    """
+    table = frame_to_table(data, meta)
+    if _file_format(path) == "arrow":
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        # 趋势数值重复值很少，字典编码只增加开销
+        pq.write_table(table, path, compression="zstd", use_dictionary=False)
+    return path
+
+
+def load_trends(path: str):
+    """
+    读取 save_trends 保存的文件，返回 (SeriesFrame, meta)。
+    Arrow IPC 文件以内存映射方式打开，数据不经解析，直接从映射的缓冲区复制为帧的数值矩阵。
+    """
+    _require_pyarrow()
+    if _file_format(path) == "arrow":
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    else:
+        table = pq.read_table(path, memory_map=True)
+    raw_meta = (table.schema.metadata or {}).get(METADATA_KEY)
+    meta = json.loads(raw_meta.decode("utf-8")) if raw_meta else {}
+
+    names = [name for name in table.column_names if name != TIMESTAMP_COLUMN]
+    millis = table.column(TIMESTAMP_COLUMN).cast(pa.int64()).to_numpy()
+    index = millis / 1000.0
+    dtype = np.result_type(*[table.schema.field(name).type.to_pandas_dtype() for name in names]) \
+        if names else np.float64
+    values = np.empty((len(index), len(names)), dtype=dtype, order="F")
+    present = None
+    for j, name in enumerate(names):
+        column = table.column(name)
+        values[:, j] = column.to_numpy(zero_copy_only=False)
+        if column.null_count:
+            if present is None:
+                present = np.ones(values.shape, dtype=bool, order="F")
+            present[:, j] = column.is_valid().to_numpy(zero_copy_only=False)
+            values[~present[:, j], j] = np.nan
+    return SeriesFrame(names, index, values, present), meta
@@ -0,0 +1,236 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: upload_stream.py
+@time: 2025/7/26 15:30
+@desc: 流式上传：边压缩边写入请求体的 ZIP 生成器、流式 multipart 请求，以及可断点续传的分片上传，上传进度按已读取的源文件字节数上报
+"""
+import hashlib
+import os
+import uuid
+import zipfile
+from typing import Callable, Iterable, Iterator, Optional
+
+import httpx
+from loguru import logger
+
+READ_BLOCK_SIZE = 1 << 20  # 读取源文件、产出请求体的块大小
+CHUNK_SIZE = 8 << 20  # 分片上传的分片大小
+CHUNK_RETRIES = 3  # 单个分片失败后的重试次数
+UPLOAD_READ_TIMEOUT = 300.0  # 请求体发送完毕后等待服务端处理的超时（秒），连接与单块写入仍用工具的 timeout
+# 自身已压缩的文件打包时不再做 DEFLATE
+STORED_SUFFIXES = (".parquet", ".zip", ".gz", ".7z", ".rar", ".zst")
+
+
+def upload_timeout(timeout: float, read: float = UPLOAD_READ_TIMEOUT) -> httpx.Timeout:
+    return httpx.Timeout(timeout, read=read)
+
+
+class _Progress:
+    """按已读取字节数上报 0~100 的进度，只在整数百分比变化时回调"""
+
+    def __init__(self, total: int, callback: Optional[Callable] = None):
+        self.total = max(total, 1)
+        self.callback = callback
+        self.done = 0
+        self._last = -1
+
+    def advance(self, size: int):
+        self.done += size
+        percent = min(100, self.done * 100 // self.total)
+        if self.callback is not None and percent != self._last:
+            self._last = percent
+            self.callback(percent)
+
+
+def zip_members(input_path: str) -> list:
+    """待打包的 [(文件路径, 包内路径), ...]，目录按遍历顺序收集其下全部文件"""
+    if os.path.isfile(input_path):
+        return [(input_path, os.path.basename(input_path))]
+    members = []
+    for root, dirs, files in os.walk(input_path):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            members.append((file_path, os.path.relpath(file_path, start=input_path)))
+    return members
+
+
+def upload_name(input_path: str) -> str:
+    """上传文件名：ZIP 文件为原名，其它文件/目录为 <名称>.zip"""
+    if os.path.isfile(input_path) and input_path.lower().endswith(".zip"):
+        return os.path.basename(input_path)
+    base = os.path.basename(os.path.normpath(input_path))
+    stem = os.path.splitext(base)[0] if os.path.isfile(input_path) else base
+    return f"{stem}.zip"
+
+
+def upload_identifier(input_path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    分片上传的标识：由各文件的包内路径、大小、修改时间与分片大小决定。
+    源文件不变时标识不变，再次上传即可跳过服务端已有的分片。
+    """
+    digest = hashlib.sha1(f"{upload_name(input_path)}|{chunk_size}".encode("utf-8"))
+    for path, arcname in zip_members(input_path):
+        stat = os.stat(path)
+        digest.update(f"|{arcname}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _ZipSink:
+    """zipfile 的不可回退写入端：写入的数据暂存，由生成器随时取出"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_file(file_path: str, progress_callback: Callable = None,
+              block_size: int = READ_BLOCK_SIZE) -> Iterator[bytes]:
+    """按块读取文件"""
+    progress = _Progress(os.path.getsize(file_path), progress_callback)
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            progress.advance(len(block))
+            yield block
+
+
+def iter_zip(input_path: str, progress_callback: Callable = None,
+             block_size: int = READ_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    边读取边压缩，逐块产出 ZIP 文件的字节流，不生成临时文件，内存占用与块大小同级。
+    写入端不可回退，各成员的 CRC 与大小写在数据描述符中；大文件自动使用 ZIP64。
+    同一组未修改的源文件产出的字节流完全相同，分片上传据此断点续传。
+    """
+    members = zip_members(input_path)
+    progress = _Progress(sum(os.path.getsize(path) for path, _ in members), progress_callback)
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, arcname in members:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED if path.lower().endswith(STORED_SUFFIXES) \
+                else zipfile.ZIP_DEFLATED
+            with open(path, "rb") as src, zf.open(info, "w") as dest:
+                while True:
+                    block = src.read(block_size)
+                    if not block:
+                        break
+                    dest.write(block)
+                    progress.advance(len(block))
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # 中央目录在关闭时写入
+    yield sink.drain()
+
+
+def iter_upload_source(input_path: str, progress_callback: Callable = None) -> Iterator[bytes]:
+    """ZIP 文件直接按块读取，其它文件/目录边压缩边产出"""
+    if os.path.isfile(input_path) and input_path.lower().endswith(".zip"):
+        return iter_file(input_path, progress_callback)
+    return iter_zip(input_path, progress_callback)
+
+
+def _rechunk(blocks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """把任意大小的块重新切分为固定大小（最后一片可能较小）"""
+    buffer = bytearray()
+    for block in blocks:
+        buffer += block
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', "%22")
+
+
+def iter_multipart(boundary: str, fields: dict, file_field: str, file_name: str,
+                   content: Iterable[bytes]) -> Iterator[bytes]:
+    """multipart/form-data 请求体：先写普通字段，再把文件内容逐块写入"""
+    for name, value in (fields or {}).items():
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+               f'{value}\r\n').encode("utf-8")
+    yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{_quote(file_field)}"; '
+           f'filename="{_quote(file_name)}"\r\nContent-Type: application/octet-stream\r\n\r\n').encode("utf-8")
+    yield from content
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+
+def post_stream(url: str, headers: dict, file_name: str, content: Iterable[bytes], fields: dict = None,
+                timeout: httpx.Timeout = None, file_field: str = "file") -> dict:
+    """以分块传输编码发送 multipart 请求，请求体由 content 生成器逐块产出，返回响应 JSON"""
+    boundary = uuid.uuid4().hex
+    headers = {**(headers or {}), "Content-Type": f"multipart/form-data; boundary={boundary}"}
+    body = iter_multipart(boundary, fields, file_field, file_name, content)
+    with httpx.Client(timeout=timeout or upload_timeout(5.0), verify=False) as client:
+        resp = client.post(url, headers=headers, content=body)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def post_chunks(chunk_url: str, merge_url: str, headers: dict, file_name: str, content: Iterable[bytes],
+                identifier: str, fields: dict = None, chunk_size: int = CHUNK_SIZE,
+                timeout: httpx.Timeout = None, file_field: str = "file") -> dict:
+    """
+    分片上传，返回合并接口的响应 JSON。
+
+    协议沿用 resumable.js 的约定：
+    - 每个分片先 GET chunk_url（identifier、chunkNumber），返回 200 表示服务端已有该分片，跳过；
+    - 否则 POST chunk_url（identifier、chunkNumber、chunkSize、currentChunkSize、filename 与分片内容），失败重试；
+    - 全部分片完成后 POST merge_url（identifier、filename、totalChunks、totalSize 及 fields）合并。
+    跳过的分片仍会在本地生成（用于计算后续分片的内容），但不再发送。
+    """
+    sent = skipped = total_size = 0
+    chunk_number = 0
+    with httpx.Client(timeout=timeout or upload_timeout(5.0), verify=False) as client:
+        for chunk_number, chunk in enumerate(_rechunk(content, chunk_size), start=1):
+            total_size += len(chunk)
+            params = {"identifier": identifier, "chunkNumber": chunk_number}
+            test = client.get(chunk_url, headers=headers, params=params)
+            if test.status_code == 200:
+                skipped += 1
+                continue
+            data = {**params, "chunkSize": chunk_size, "currentChunkSize": len(chunk), "filename": file_name}
+            for attempt in range(1, CHUNK_RETRIES + 1):
+                try:
+                    resp = client.post(chunk_url, headers=headers, data=data,
+                                       files={file_field: (file_name, chunk)})
+                    resp.raise_for_status()
+                    break
+                except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                    if attempt == CHUNK_RETRIES:
+                        raise
+                    logger.warning(f"分片 {chunk_number} 上传失败，第 {attempt} 次重试：{exc}")
+            sent += 1
+        data = {**(fields or {}), "identifier": identifier, "filename": file_name,
+                "totalChunks": chunk_number, "totalSize": total_size}
+        resp = client.post(merge_url, headers=headers, data=data)
+    resp.raise_for_status()
+    logger.info(f"分片上传完成: {file_name}，共 {chunk_number} 片，发送 {sent} 片，跳过已有 {skipped} 片")
+    return resp.json()
@@ -8,7 +8,6 @@
 """
 
 import os
-import pickle
 import re
 import sys
 
@@ -40,17 +39,16 @@ def sanitize_path(path):
     return os.path.join(*cleaned) if cleaned else ""
 
 
-def save_point_cache(data, filename="point_cache.pkl"):
-    with open(filename, "wb") as f:
-        pickle.dump(data, f)
+def save_point_cache(data, source=""):
+    """增量写入测点目录（兼容旧接口，原 point_cache.pkl 已由 point_catalog.db 取代）"""
+    from application.utils.point_catalog import get_point_catalog
+    return get_point_catalog().upsert(data, source=source)
 
 
-def load_point_cache(filename="point_cache.pkl"):
-    try:
-        with open(filename, "rb") as f:
-            return pickle.load(f)
-    except FileNotFoundError:
-        return {}
+def load_point_cache():
+    """测点目录的 {测点类型: [测点字典, ...]} 视图（兼容旧接口）"""
+    from application.utils.point_catalog import get_point_catalog
+    return get_point_catalog().as_dict()
 
 
 def error_catcher_decorator(func):
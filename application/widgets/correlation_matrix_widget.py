@@ -5,7 +5,8 @@
 """
 import matplotlib.pyplot as plt
 import numpy as np
-from PyQt5.QtCore import Qt, pyqtSignal, QSize
+from loguru import logger
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QThreadPool
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -13,10 +14,16 @@ from PyQt5.QtWidgets import (
     QLabel,
     QFrame,
     QScrollArea,
+    QComboBox,
 )
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+from application.utils.compact_series import CompactSeries
+from application.utils.correlation_engine import correlation_job
+from application.utils.series_frame import SeriesFrame
+from application.utils.threading_utils import Worker
+
 
 class CorrelationMatrixWidget(QWidget):
     """相关系数矩阵显示组件"""
@@ -25,6 +32,10 @@ class CorrelationMatrixWidget(QWidget):
     matrixUpdated = pyqtSignal(dict)  # 矩阵更新信号
     cellSelected = pyqtSignal(str, str, float)  # 单元格选择信号 (行名称, 列名称, 值)
 
+    METHODS = [("Pearson", "pearson"), ("Spearman", "spearman")]
+    LAG_OPTIONS = [("无滞后", 0), ("±5步", 5), ("±10步", 10), ("±30步", 30)]
+    MAX_ANNOTATED = 40  # 测点数超过该值时不在单元格内标注数值
+
     def __init__(self, parent=None):
         super().__init__(parent)
         # 配置
@@ -33,6 +44,12 @@ class CorrelationMatrixWidget(QWidget):
         self.compact_mode = True  # 默认使用紧凑模式
         self.names = []  # 测点名称列表
         self.corr_matrix = None  # 相关系数矩阵
+        self.lag_matrix = None  # 滞后互相关时各测点对的最佳滞后步数
+        self.method = "pearson"
+        self.max_lag = 0
+        self._data = SeriesFrame.from_dict({})  # 只读的测点数据帧，供后台计算
+        self._job_generation = 0
+        self.thread_pool = QThreadPool.globalInstance()
 
         # UI初始化
         self._init_ui()
@@ -83,6 +100,21 @@ class CorrelationMatrixWidget(QWidget):
             }
         """
         )
+        control_layout = QHBoxLayout(control_frame)
+        control_layout.setContentsMargins(8, 4, 8, 4)
+        control_layout.addWidget(QLabel("相关方法:"))
+        self.method_combo = QComboBox()
+        self.method_combo.addItems([label for label, _ in self.METHODS])
+        self.method_combo.currentIndexChanged.connect(self._on_method_changed)
+        control_layout.addWidget(self.method_combo)
+        control_layout.addWidget(QLabel("滞后互相关:"))
+        self.lag_combo = QComboBox()
+        self.lag_combo.addItems([label for label, _ in self.LAG_OPTIONS])
+        self.lag_combo.currentIndexChanged.connect(self._on_lag_changed)
+        control_layout.addWidget(self.lag_combo)
+        control_layout.addStretch()
+        layout.addWidget(control_frame)
+
         # 矩阵显示区域 - 使用自适应大小的Figure
         # 基础大小为8x7，但会根据测点数量动态调整
         self.figure = Figure(figsize=(8, 7), dpi=100, facecolor="white")
@@ -124,11 +156,22 @@ class CorrelationMatrixWidget(QWidget):
         self.threshold = float(self.threshold_combo.currentText())
         self._update_plot()
 
+    def _on_method_changed(self, index):
+        """相关方法变化处理"""
+        self.method = self.METHODS[index][1]
+        self._start_job()
+
+    def _on_lag_changed(self, index):
+        """滞后范围变化处理"""
+        self.max_lag = self.LAG_OPTIONS[index][1]
+        self._start_job()
+
     def set_data(self, data_dict):
-        """设置数据并计算相关系数矩阵
+        """设置数据并在后台计算相关系数矩阵
 
         Args:
-            data_dict: 测点数据字典 {测点名称: 数据数组}
+            data_dict: SeriesFrame 或测点数据字典 {测点名称: (时间戳, 数值)}；
+                值为单个数组时按采样序号对齐
         """
         if not data_dict or len(data_dict) < 2:
             self.info_label.setText("需要至少两个测点才能计算相关系数矩阵")
@@ -136,30 +179,60 @@ class CorrelationMatrixWidget(QWidget):
             self.canvas.draw()
             return False
 
-        try:
-            # 提取名称和数据
-            self.names = list(data_dict.keys())
-            data_arrays = list(data_dict.values())
-
-            # 确保所有数据长度一致，取最小长度
-            min_length = min(len(arr) for arr in data_arrays)
-            data_arrays = [arr[:min_length] for arr in data_arrays]
-
-            # 计算相关系数矩阵
-            self.corr_matrix = np.corrcoef(data_arrays)
-
-            # 更新信息
-            self.info_label.setText(f"已计算 {len(self.names)} 个测点的相关系数矩阵")
-            self.stats_label.setText(f"数据点数: {min_length}")
+        # 帧只读，后台计算不受数据源后续修改影响；传入 SeriesFrame 时直接共用
+        if not isinstance(data_dict, SeriesFrame):
+            prepared = {}
+            for name, value in data_dict.items():
+                if isinstance(value, (tuple, CompactSeries)):
+                    prepared[name] = value
+                else:
+                    prepared[name] = (np.arange(len(value), dtype=np.float64), value)
+            data_dict = SeriesFrame.from_dict(prepared)
+        self._data = data_dict
+        self._start_job()
+        return True
+
+    def _start_job(self):
+        if len(self._data) < 2:
+            return
+        self._job_generation += 1
+        generation = self._job_generation
+        self.info_label.setText(f"正在计算 {len(self._data)} 个测点的相关系数矩阵...")
+        worker = Worker(correlation_job, self._data, self.method, self.max_lag)
+        worker.signals.finished.connect(lambda result, g=generation: self._on_job_finished(g, result))
+        worker.signals.error.connect(lambda e, g=generation: self._on_job_error(g, e))
+        self.thread_pool.start(worker)
+
+    def _on_job_error(self, generation, error):
+        if generation != self._job_generation:
+            return
+        logger.error(f"计算相关系数时出错: {error}")
+        self.info_label.setText("计算相关系数时出错")
+        self.figure.clear()
+        self.canvas.draw()
 
-            # 更新图表
-            self._update_plot()
-            return True
-        except Exception as e:
-            self.info_label.setText(f"计算相关系数时出错: {str(e)}")
+    def _on_job_finished(self, generation, result):
+        if generation != self._job_generation:
+            return  # 已有更新的计算任务
+        if result["corr"] is None:
+            self.info_label.setText("有效测点不足两个，无法计算相关系数矩阵")
             self.figure.clear()
             self.canvas.draw()
-            return False
+            return
+        self.names = result["names"]
+        self.corr_matrix = result["corr"]
+        self.lag_matrix = result["lags"]
+
+        # 更新信息
+        method_label = dict((v, k) for k, v in self.METHODS)[self.method]
+        self.info_label.setText(f"已计算 {len(self.names)} 个测点的相关系数矩阵（{method_label}）")
+        self.stats_label.setText(
+            f"对齐网格: {result['grid_points']} 点 / 步长 {result['grid_step']:.0f}s，"
+            f"全部有效: {result['valid_points']} 点"
+        )
+
+        # 更新图表
+        self._update_plot()
 
     def _update_plot(self):
         """更新相关系数矩阵图表"""
@@ -222,10 +295,11 @@ class CorrelationMatrixWidget(QWidget):
         ax.tick_params(axis="both", labelsize=label_fontsize)
         ax.tick_params(axis="x", rotation=45)
 
-        # 在每个单元格中显示相关系数值
+        # 在每个单元格中显示相关系数值，测点过多时跳过以免阻塞界面
         threshold = self.threshold  # 高相关阈值
-        for i in range(len(self.names)):
-            for j in range(len(self.names)):
+        annotated = range(len(self.names)) if n_points <= self.MAX_ANNOTATED else range(0)
+        for i in annotated:
+            for j in annotated:
                 value = corr_matrix_with_nan[i, j]  # 使用原始矩阵中的值
 
                 # 确定是否显示此值 - 紧凑模式下也始终显示主要相关值
@@ -259,11 +333,15 @@ class CorrelationMatrixWidget(QWidget):
                     weight = "bold"
                     fontsize = value_fontsize + 1
                     text = f"{value:.2f}"
+                    if self.lag_matrix is not None and self.lag_matrix[i, j]:
+                        text += f"\n{self.lag_matrix[i, j]:+d}"
                 else:
                     color = "black" if abs(value) < 0.5 else "white"
                     weight = "normal"
                     fontsize = value_fontsize
                     text = f"{value:.2f}"
+                    if self.lag_matrix is not None and self.lag_matrix[i, j]:
+                        text += f"\n{self.lag_matrix[i, j]:+d}"
 
                 # 对角线元素特殊处理
                 if i == j:
@@ -316,8 +394,11 @@ class CorrelationMatrixWidget(QWidget):
 
     def clear(self):
         """清除图表"""
+        self._job_generation += 1
+        self._data = SeriesFrame.from_dict({})
         self.names = []
         self.corr_matrix = None
+        self.lag_matrix = None
         self.figure.clear()
         self.canvas.draw()
         self.info_label.setText("请提供数据来生成相关系数矩阵")
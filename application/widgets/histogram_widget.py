@@ -1,13 +1,16 @@
-import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 from loguru import logger
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from PyQt5.QtCore import Qt, QSize, pyqtSignal
+from PyQt5.QtCore import Qt, QSize, pyqtSignal, QThreadPool
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QComboBox, QFrame, QScrollArea, QSizePolicy, QCheckBox)
 
+from application.utils.histogram_stats import histogram_job
+from application.utils.series_frame import SeriesFrame
+from application.utils.threading_utils import Worker
+
 class HistogramWidget(QWidget):
     """改进的直方图控件，支持固定分页和多种图表类型"""
 
@@ -23,12 +26,21 @@ class HistogramWidget(QWidget):
         self.hist_type = 0  # 0:标准直方图, 1:核密度估计, 2:组合显示
         self.color_theme = 0  # 0:蓝色, 1:彩虹, 2:绿色, 3:暖色
         self.bin_count = 'auto'  # 柱状图区间数量
-        self.data_dict = {}  # 数据字典 {名称: (时间序列,值序列)}
+        self.data_dict = {}  # 数据 {名称: (时间序列,值序列)}，设置数据后为 SeriesFrame
         self.current_page = 0  # 当前页码
         self.items_per_page = 4  # 每页固定显示4个图表
-        self.statistics = {}  # 统计信息缓存
+        self.statistics = {}  # 统计信息缓存（当前数据版本）
         self.show_stats = True  # 是否显示统计信息
 
+        # 后台计算与结果缓存：翻页、切换类型/颜色只读取缓存，不重新计算
+        self.thread_pool = QThreadPool.globalInstance()
+        self.data_version = 0  # 每次 set_data 加 1
+        self._values = {}  # 名称 -> float64 数值快照，工作线程只读
+        self._stats_version = None  # statistics 对应的数据版本
+        self._hist_cache = {}  # (名称, 数据版本, 区间设置) -> (密度, 区间边界) 或 None
+        self._kde_cache = {}  # (名称, 数据版本) -> (x, 密度) 或 None
+        self._job_generation = 0
+
         # 初始化UI
         self._init_ui()
 
@@ -297,20 +309,21 @@ class HistogramWidget(QWidget):
         """设置要显示的数据
 
         Args:
-            data_dict: 数据字典，格式为 {名称: (时间序列, 值序列)}
+            data_dict: 对齐的时序帧 SeriesFrame，或数据字典 {名称: (时间序列, 值序列)}
         """
-        # 检查数据有效性
-        valid_data = {}
-        for name, (ts, ys) in data_dict.items():
-            if ts is not None and len(ts) > 0 and len(ys) > 0:
-                valid_data[name] = (ts, ys)
-
-        if not valid_data:
+        # 时序帧只读，数值直接引用其列视图，后台计算不受数据源后续修改影响
+        valid_data = SeriesFrame.from_dict(data_dict)
+        if not len(valid_data):
             self._show_no_data_message()
             return
 
-        # 保存有效数据
         self.data_dict = valid_data
+        self._values = {name: valid_data[name][1] for name in valid_data}
+        self.data_version += 1
+        self.statistics = {}
+        self._stats_version = None
+        self._hist_cache.clear()
+        self._kde_cache.clear()
         n_points = len(valid_data)
 
         # 计算总页数
@@ -332,55 +345,67 @@ class HistogramWidget(QWidget):
         total_points = sum(len(ys) for _, (_, ys) in valid_data.items())
         self.data_info_label.setText(f"样本数量: {total_points}")
 
-        # 计算统计信息
-        self._calculate_statistics()
-
-        # 更新直方图
-        self._update_histograms()
-
         # 更新状态
         self.status_label.setText(f"测点数量: {n_points}")
 
-    def _calculate_statistics(self):
-        """计算并缓存每个测点的统计信息"""
-        self.statistics = {}
+        # 后台计算统计信息与分箱后更新直方图
+        self._update_histograms()
 
-        for name, (_, ys) in self.data_dict.items():
-            if len(ys) == 0:
-                continue
+    def _page_names(self):
+        names = list(self.data_dict)
+        start_idx = self.current_page * self.items_per_page
+        return names[start_idx:start_idx + self.items_per_page]
 
-            # 计算基本统计量
-            stats = {
-                'mean': np.mean(ys),
-                'median': np.median(ys),
-                'std': np.std(ys),
-                'min': np.min(ys),
-                'max': np.max(ys),
-                'count': len(ys)
-            }
+    def _update_histograms(self):
+        """检查当前页所需结果是否已缓存，缺失部分提交后台计算，齐全后直接绘制"""
+        if not self._page_names():
+            self._show_no_data_message()
+            return
+        version = self.data_version
+        stats_names = list(self._values) if self._stats_version != version else []
+        hist_names = [n for n in self._values if (n, version, self.bin_count) not in self._hist_cache]
+        kde_names = []
+        if self.hist_type in (1, 2):
+            kde_names = [n for n in self._page_names() if (n, version) not in self._kde_cache]
+        if not (stats_names or hist_names or kde_names):
+            self._render_histograms()
+            return
 
-            # 添加分位数
-            try:
-                stats['q1'] = np.percentile(ys, 25)  # 第一四分位数
-                stats['q3'] = np.percentile(ys, 75)  # 第三四分位数
-                stats['iqr'] = stats['q3'] - stats['q1']  # 四分位距
-            except:
-                stats['q1'] = stats['q3'] = stats['iqr'] = float('nan')
-
-            # 识别异常值
-            try:
-                lower_bound = stats['q1'] - 1.5 * stats['iqr']
-                upper_bound = stats['q3'] + 1.5 * stats['iqr']
-                outliers = [y for y in ys if y < lower_bound or y > upper_bound]
-                stats['outliers_count'] = len(outliers)
-                stats['outliers_percent'] = (len(outliers) / len(ys)) * 100 if len(ys) > 0 else 0
-            except:
-                stats['outliers_count'] = stats['outliers_percent'] = float('nan')
-
-            self.statistics[name] = stats
+        self._job_generation += 1
+        generation = self._job_generation
+        bin_count = self.bin_count
+        self.status_label.setText("正在计算统计信息...")
+        worker = Worker(histogram_job, self._values, bin_count, stats_names, hist_names, kde_names)
+        worker.signals.finished.connect(
+            lambda result, g=generation, v=version, b=bin_count: self._on_job_finished(g, v, b, result)
+        )
+        worker.signals.error.connect(lambda e, g=generation: self._on_job_error(g, e))
+        self.thread_pool.start(worker)
+
+    def _on_job_error(self, generation, error):
+        logger.error(f"直方图计算失败: {error}")
+        if generation != self._job_generation:
+            return  # 已有更新的计算任务
+        self.status_label.setStyleSheet("color: #dc3545; font-size: 11px;")
+        self.status_label.setText("直方图计算失败，请调整参数或重新获取数据")
+
+    def _on_job_finished(self, generation, version, bin_count, result):
+        if version != self.data_version:
+            return  # 数据已更换
+        if result['statistics'] is not None:
+            self.statistics = result['statistics']
+            self._stats_version = version
+        for name, hist in result['histograms'].items():
+            self._hist_cache[(name, version, bin_count)] = hist
+        for name, kde in result['kdes'].items():
+            self._kde_cache[(name, version)] = kde
+        if generation == self._job_generation:
+            self.status_label.setStyleSheet("color: #6c757d; font-size: 11px;")
+            self.status_label.setText(f"测点数量: {len(self.data_dict)}")
+            self._update_histograms()
 
-    def _update_histograms(self):
-        """更新直方图显示"""
+    def _render_histograms(self):
+        """使用缓存的统计与分箱结果绘制当前页"""
         # 清除当前容器中的所有部件
         for i in reversed(range(self.container_layout.count())):
             widget = self.container_layout.itemAt(i).widget()
@@ -416,22 +441,15 @@ class HistogramWidget(QWidget):
         }
         current_color = color_themes.get(self.color_theme, '#1c7ed6')
 
-        # 计算并绘制各个直方图
+        # 绘制各个直方图
         for idx, (name, (ts, ys)) in enumerate(current_page_data):
-            if len(ys) == 0:
+            hist = self._hist_cache.get((name, self.data_version, self.bin_count))
+            if hist is None:
                 continue
 
             # 创建子图，2x2布局，即使不足4个也保持这个布局
             ax = figure.add_subplot(n_rows, n_cols, idx + 1)
 
-            # 计算合适的柱状图数量
-            if self.bin_count == 'auto':
-                # 使用Sturges规则
-                n_bins = int(np.ceil(np.log2(len(ys)) + 1))
-                n_bins = max(10, min(30, n_bins))  # 最少10个，最多30个区间
-            else:
-                n_bins = self.bin_count
-
             # 使用选定的颜色
             if self.color_theme == 1:  # 彩虹主题
                 color_map = plt.cm.rainbow
@@ -441,19 +459,17 @@ class HistogramWidget(QWidget):
 
             # 根据选择的直方图类型进行绘制
             if self.hist_type == 0 or self.hist_type == 2:  # 标准直方图或组合显示
-                n, bins, patches = ax.hist(ys, bins=n_bins, alpha=0.7, color=histogram_color,
-                                         density=True, edgecolor='white', linewidth=0.8)
+                # 以区间左端点加权绘制，复用已计算的密度，不再重新分箱
+                density, edges = hist
+                ax.hist(edges[:-1], bins=edges, weights=density, alpha=0.7, color=histogram_color,
+                        edgecolor='white', linewidth=0.8)
 
             # 绘制核密度估计曲线
             if self.hist_type == 1 or self.hist_type == 2:  # 核密度估计或组合显示
-                try:
-                    from scipy.stats import gaussian_kde
-                    kde = gaussian_kde(ys)
-                    x_range = np.linspace(min(ys), max(ys), 1000)
+                kde = self._kde_cache.get((name, self.data_version))
+                if kde is not None:
                     # 核密度曲线使用红色
-                    ax.plot(x_range, kde(x_range), 'r-', linewidth=2)
-                except Exception as e:
-                    logger.error(f"核密度估计失败: {e}")
+                    ax.plot(kde[0], kde[1], 'r-', linewidth=2)
 
             # 设置标题和轴标签
             ax.set_title(name, fontsize=12, fontweight='bold', pad=15)  # 增加标题和图表间的距离
@@ -529,6 +545,11 @@ class HistogramWidget(QWidget):
         self.data_dict = {}
         self.statistics = {}
         self.current_page = 0
+        self._values = {}
+        self.data_version += 1
+        self._stats_version = None
+        self._hist_cache.clear()
+        self._kde_cache.clear()
 
         # 重置页码选择器
         self.page_combo.blockSignals(True)
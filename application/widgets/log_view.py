@@ -0,0 +1,247 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: log_view.py
+@time: 2025/7/15 09:30
+@desc: 服务日志虚拟化视图：环形缓冲区保存日志行，QListView 只绘制可见行，过滤与搜索走 LogIndex
+"""
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QColor, QFont, QKeySequence
+from PyQt5.QtWidgets import QListView, QAbstractItemView, QApplication
+
+from application.utils.log_index import LEVEL_COLORS, LogIndex
+
+
+class LogLineModel(QAbstractListModel):
+    """
+    日志行模型，内部为固定容量的环形缓冲区，保存工作线程解析好的 LogRecord。
+
+    每行有一个单调递增的绝对行号（line_no），缓冲区满时丢弃最早的行，
+    搜索结果以绝对行号保存，不受丢弃影响。设置级别过滤后，
+    行位置映射到 LogIndex 给出的可见行号列表。
+    """
+
+    DEFAULT_COLOR = '#d4d4d4'
+
+    def __init__(self, capacity: int = 100000, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.log_index = LogIndex()
+        self._buffer = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._pending = None  # 末尾未换行的半行，显示在最后
+        self._level_filter = None  # None 表示显示全部级别
+        self._visible = None  # 过滤后可见行号列表
+        self._visible_offset = 0  # _visible 中已丢弃的前缀长度
+        self._colors = {level: QColor(color) for level, color in LEVEL_COLORS.items()}
+        self._default_color = QColor(self.DEFAULT_COLOR)
+        self._highlight_color = QColor("#5a5a00")
+        self.highlight_line_nos = []  # 有序行号，data() 中二分查找
+
+    @property
+    def first_line_no(self):
+        return self.log_index.first_line_no
+
+    # ===== 缓冲区操作 =====
+    def clear(self):
+        self.beginResetModel()
+        self._buffer = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+        self._pending = None
+        self.log_index.clear()
+        if self._visible is not None:
+            self._visible = []
+            self._visible_offset = 0
+        self.highlight_line_nos = []
+        self.endResetModel()
+
+    def line_count(self) -> int:
+        return self._count
+
+    def record_of(self, line_no: int):
+        row = line_no - self.first_line_no
+        if 0 <= row < self._count:
+            return self._buffer[(self._start + row) % self.capacity]
+        return None
+
+    def _line_no_at(self, row: int):
+        """行位置转换为绝对行号，超出范围（半行）时返回 None"""
+        if self._visible is None:
+            return self.first_line_no + row if row < self._count else None
+        pos = self._visible_offset + row
+        return self._visible[pos] if pos < len(self._visible) else None
+
+    def _visible_count(self) -> int:
+        if self._visible is None:
+            return self._count
+        return len(self._visible) - self._visible_offset
+
+    def _passes(self, record) -> bool:
+        return self._level_filter is None or record.level in self._level_filter
+
+    def row_of(self, line_no: int) -> int:
+        """绝对行号转换为当前行位置，被丢弃或被过滤时返回 -1"""
+        if line_no < self.first_line_no or line_no >= self.first_line_no + self._count:
+            return -1
+        if self._visible is None:
+            return line_no - self.first_line_no
+        pos = bisect_left(self._visible, line_no, self._visible_offset)
+        if pos < len(self._visible) and self._visible[pos] == line_no:
+            return pos - self._visible_offset
+        return -1
+
+    def append_records(self, records, pending=None):
+        """追加工作线程解析好的完整行，并替换末尾的半行"""
+        self._set_pending(None)
+
+        # 单批超过容量时清空现有行，只保留该批最后 capacity 行
+        overflow = len(records) - self.capacity
+        if overflow > 0:
+            if self._count:
+                self._drop_front(self._count)
+            self.log_index.skip(overflow)
+            records = records[overflow:]
+
+        drop = self._count + len(records) - self.capacity
+        if drop > 0:
+            self._drop_front(drop)
+
+        if records:
+            first_new = self.log_index.append(records)
+            for record in records:
+                self._buffer[(self._start + self._count) % self.capacity] = record
+                self._count += 1
+            if self._visible is None:
+                new_rows = len(records)
+            else:
+                visible_new = [first_new + i for i, record in enumerate(records) if self._passes(record)]
+                new_rows = len(visible_new)
+            if new_rows:
+                row = self._visible_count()
+                self.beginInsertRows(QModelIndex(), row, row + new_rows - 1)
+                if self._visible is not None:
+                    self._visible.extend(visible_new)
+                self.endInsertRows()
+
+        if pending is not None and self._passes(pending):
+            self._set_pending(pending)
+
+    def _drop_front(self, drop):
+        if self._visible is None:
+            self.beginRemoveRows(QModelIndex(), 0, drop - 1)
+        new_first = self.first_line_no + drop
+        self._start = (self._start + drop) % self.capacity
+        self._count -= drop
+        if self._visible is None:
+            self.log_index.drop_before(new_first)
+            self.endRemoveRows()
+            return
+
+        removed = bisect_left(self._visible, new_first, self._visible_offset) - self._visible_offset
+        if removed > 0:
+            self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+        self._visible_offset += removed
+        self.log_index.drop_before(new_first)
+        if self._visible_offset > len(self._visible) // 2:
+            del self._visible[:self._visible_offset]
+            self._visible_offset = 0
+        if removed > 0:
+            self.endRemoveRows()
+
+    def _set_pending(self, record):
+        row = self._visible_count()
+        if self._pending is not None and record is None:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self._pending = None
+            self.endRemoveRows()
+        elif self._pending is None and record is not None:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._pending = record
+            self.endInsertRows()
+        elif record is not None:
+            self._pending = record
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    # ===== 过滤与搜索（均为索引查询） =====
+    def set_level_filter(self, levels):
+        """按级别过滤，levels 为 None 时显示全部"""
+        self.beginResetModel()
+        self._level_filter = set(levels) if levels else None
+        self._visible_offset = 0
+        self._visible = None if self._level_filter is None else self.log_index.lines_with_levels(self._level_filter)
+        if self._pending is not None and not self._passes(self._pending):
+            self._pending = None
+        self.endResetModel()
+
+    def search(self, keywords) -> list:
+        """返回当前可见行中匹配任一关键字的行号"""
+        line_nos = self.log_index.search(keywords)
+        if self._level_filter is None:
+            return line_nos
+        visible = self._level_filter
+        return [n for n in line_nos if self.record_of(n).level in visible]
+
+    def set_highlights(self, line_nos):
+        self.highlight_line_nos = line_nos
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0), self.index(self.rowCount() - 1), [Qt.BackgroundRole])
+
+    def _is_highlighted(self, line_no):
+        pos = bisect_left(self.highlight_line_nos, line_no)
+        return pos < len(self.highlight_line_nos) and self.highlight_line_nos[pos] == line_no
+
+    # ===== QAbstractListModel 接口 =====
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._visible_count() + (1 if self._pending is not None else 0)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line_no = self._line_no_at(index.row())
+        record = self._pending if line_no is None else self.record_of(line_no)
+        if record is None:
+            return None
+        if role == Qt.DisplayRole:
+            return record.display
+        if role == Qt.ForegroundRole:
+            return self._colors.get(record.level, self._default_color)
+        if role == Qt.BackgroundRole:
+            if line_no is not None and self._is_highlighted(line_no):
+                return self._highlight_color
+        return None
+
+
+class LogListView(QListView):
+    """只绘制可见行的日志视图，支持 Ctrl+C 复制选中行"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(500)
+        self.setWordWrap(False)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setFont(QFont("Consolas", 11))
+
+    def is_at_bottom(self) -> bool:
+        sb = self.verticalScrollBar()
+        return sb.value() >= sb.maximum() - 2
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            model = self.model()
+            text = "\n".join(model.data(model.index(row), Qt.DisplayRole) or "" for row in rows)
+            QApplication.clipboard().setText(text)
+            return
+        super().keyPressEvent(event)
@@ -0,0 +1,130 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: monitor_record_model.py
+@time: 2025/7/14 10:45
+@desc: 监控记录虚拟化表格模型，按页从 MonitorRecordStore 懒加载，只渲染可见行
+"""
+from collections import OrderedDict
+from datetime import datetime
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+from application.utils.monitor_store import RECORD_COLUMNS
+
+
+class MonitorRecordTableModel(QAbstractTableModel):
+    HEADERS = ["时间", "服务名称", "状态", "操作"]
+    # 表头列 -> 数据库字段
+    SORT_FIELDS = ["ts", "service_name", "status", "operation"]
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 20
+
+    def __init__(self, store, status_colors: dict, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.status_colors = status_colors
+        self.service_filter = None
+        self.row_limit = 1000  # None 表示不限制
+        self.order_by = "ts"
+        self.descending = True
+        self._row_count = 0
+        self._pages = OrderedDict()
+        self._idx = {name: i for i, name in enumerate(RECORD_COLUMNS)}
+
+    # ===== 外部控制 =====
+    def set_filter(self, service_name, row_limit=None):
+        self.service_filter = service_name
+        self.row_limit = row_limit
+        self.refresh()
+
+    def refresh(self):
+        """重新统计行数并清空页缓存"""
+        self.beginResetModel()
+        self._pages.clear()
+        total = self.store.count(self.service_filter)
+        self._row_count = total if self.row_limit is None else min(total, self.row_limit)
+        self.endResetModel()
+
+    def record_added(self, service_name):
+        """新增记录后调用：最新记录在顶部时仅插入一行，避免整表重置"""
+        if self.service_filter is not None and service_name != self.service_filter:
+            return
+        if not (self.order_by == "ts" and self.descending):
+            self.refresh()
+            return
+        self._pages.clear()
+        if self.row_limit is not None and self._row_count >= self.row_limit:
+            # 行数已达上限：顶部插入一行、底部移除一行
+            self.beginRemoveRows(QModelIndex(), self._row_count - 1, self._row_count - 1)
+            self._row_count -= 1
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._row_count += 1
+        self.endInsertRows()
+
+    # ===== 懒加载 =====
+    def _row(self, row):
+        page, offset = divmod(row, self.PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self.store.fetch_records(
+                self.service_filter,
+                offset=page * self.PAGE_SIZE,
+                limit=self.PAGE_SIZE,
+                order_by=self.order_by,
+                descending=self.descending,
+            )
+            self._pages[page] = rows
+            if len(self._pages) > self.MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        return rows[offset] if offset < len(rows) else None
+
+    # ===== QAbstractTableModel 接口 =====
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self._row(index.row())
+        if record is None:
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == 0:
+                return datetime.fromtimestamp(record[self._idx["ts"]]).strftime("%Y-%m-%d %H:%M:%S")
+            if col == 1:
+                return record[self._idx["service_name"]]
+            if col == 2:
+                return record[self._idx["status"]]
+            return record[self._idx["operation"]] or "未知操作"
+        if role == Qt.ForegroundRole and col == 2:
+            status = record[self._idx["status"]]
+            if status == "成功":
+                return QColor(self.status_colors['成功'])
+            if status in ("失败", "警告"):
+                return QColor(self.status_colors['失败'])
+            if status == "未监控":
+                return QColor(self.status_colors['未监控'])
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.order_by = self.SORT_FIELDS[column]
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
@@ -40,9 +40,13 @@ class PersistentToolTip(QWidget):
         self.hide()
 
     def show_tooltip(self, text, offset=QPoint(10, 5)):
-        self.label.setText(text)
-        self.adjustSize()
+        if text != self.label.text():
+            self.label.setText(text)
+            self.adjustSize()
+        self.follow_cursor(offset)
 
+    def follow_cursor(self, offset=QPoint(10, 5)):
+        """内容不变时只跟随鼠标移动位置"""
         screen_rect = QApplication.primaryScreen().availableGeometry()
         pos = QCursor.pos() + offset
         tooltip_rect = QRect(pos, self.size())
@@ -0,0 +1,202 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: point_table_model.py
+@time: 2025/7/23 15:10
+@desc: 测点列表虚拟化表格模型：数据为测点目录行号或 (测点类型, 测点字典) 列表，只渲染可见行，排序在模型内完成
+"""
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from application.utils.point_catalog import FIELDS, MISSING
+
+NAME_FIELD = "测点名"
+
+
+class PointTableModel(QAbstractTableModel):
+    """
+    测点列表模型。
+
+    两种数据来源：
+    - set_rows：测点目录的行号数组，单元格直接由目录的编码列取值，不生成测点字典；
+    - set_items：(测点类型, 测点字典) 列表，用于远程搜索结果、历史记录等不在目录中的数据。
+    视图只对可见行调用 data()，不创建单元格对象，行数对刷新耗时几乎没有影响。
+    排序在模型内完成（目录行按字符串的字典序名次 numpy 排序），
+    排序列为 -1 时恢复数据原有顺序（如搜索结果的相关度顺序）；设置新数据时沿用当前排序。
+    """
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.headers = list(FIELDS)
+        self._rows = None  # 目录行号（目录模式）
+        self._items = []  # (测点类型, 测点字典)（列表模式）
+        self._natural = []  # 排序前的原始顺序
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._rank = None  # 字符串编码 -> 字典序名次，末尾一项供缺失值使用
+        self._rank_size = 0
+
+    # ===== 外部接口 =====
+    def set_rows(self, rows):
+        """显示测点目录中的若干行"""
+        self.beginResetModel()
+        self._rows = np.array(rows, dtype=np.int64)
+        self._items = []
+        self._natural = self._rows.copy()
+        self.headers = list(FIELDS)
+        self._apply_sort()
+        self.endResetModel()
+
+    def set_items(self, items, headers=None):
+        """显示 (测点类型, 测点字典) 列表，表头默认为所有字典键的并集（测点名在前）"""
+        self.beginResetModel()
+        self._rows = None
+        self._items = list(items)
+        self._natural = list(self._items)
+        if headers is None:
+            keys = dict.fromkeys(k for _, point in self._items for k in point)
+            headers = [NAME_FIELD] + [k for k in keys if k != NAME_FIELD]
+        self.headers = list(headers)
+        self._apply_sort()
+        self.endResetModel()
+
+    def extend_items(self, items):
+        """列表模式下在末尾追加多行（如远程搜索的下一页），未排序且表头不变时不重置视图"""
+        items = list(items)
+        keys = dict.fromkeys(k for _, point in items for k in point)
+        if self._rows is not None or self._sort_column >= 0 or any(k not in self.headers for k in keys):
+            self.set_items(self._natural + items if self._rows is None else items)
+            return
+        if not items:
+            return
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row + len(items) - 1)
+        self._items.extend(items)
+        self._natural.extend(items)
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_items([])
+
+    def items(self) -> list:
+        """列表模式下按原有顺序的 (测点类型, 测点字典)，目录模式下为空列表"""
+        return list(self._natural) if self._rows is None else []
+
+    def point(self, row: int):
+        """某行的 (测点类型, 测点字典)"""
+        if self._rows is not None:
+            catalog_row = int(self._rows[row])
+            return self.catalog.type_of(catalog_row), self.catalog.record(catalog_row)
+        return self._items[row]
+
+    def name(self, row: int) -> str:
+        if row < 0 or row >= self.rowCount():
+            return ""
+        return self._value(row, NAME_FIELD)
+
+    def find(self, name: str) -> int:
+        """测点名所在的行，不存在时返回 -1"""
+        if self._rows is not None:
+            # 目录模式：按测点名取目录行号后在行号数组中定位，不逐行取值
+            hits = np.flatnonzero(np.isin(self._rows, self.catalog.rows_named(name)))
+            return int(hits[0]) if len(hits) else -1
+        for row in range(self.rowCount()):
+            if self._value(row, NAME_FIELD) == name:
+                return row
+        return -1
+
+    def remove_row(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        if self._rows is not None:
+            removed = self._rows[row]
+            self._rows = np.delete(self._rows, row)
+            self._natural = self._natural[self._natural != removed]
+        else:
+            removed = self._items.pop(row)
+            self._natural = [item for item in self._natural if item is not removed]
+        self.endRemoveRows()
+
+    def append_row(self, catalog_row: int):
+        """目录模式下追加一行目录行（列表模式下转为测点字典追加）"""
+        if self._rows is None:
+            self.append_item((self.catalog.type_of(catalog_row), self.catalog.record(catalog_row)))
+            return
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows = np.append(self._rows, catalog_row)
+        self._natural = np.append(self._natural, catalog_row)
+        self.endInsertRows()
+
+    def append_item(self, item):
+        """列表模式下追加一行（目录模式下先转为列表模式）"""
+        if self._rows is not None:
+            self.set_items([self.point(row) for row in range(len(self._rows))], self.headers)
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(item)
+        self._natural.append(item)
+        self.endInsertRows()
+
+    # ===== 取值与排序 =====
+    def _value(self, row, field) -> str:
+        if self._rows is not None:
+            return self.catalog.value(int(self._rows[row]), field) if field in FIELDS else ""
+        value = self._items[row][1].get(field, "")
+        return "" if value is None else str(value)
+
+    def _string_rank(self) -> np.ndarray:
+        pool = self.catalog.strings()
+        if self._rank is None or self._rank_size != len(pool):
+            order = sorted(range(len(pool)), key=pool.__getitem__)
+            rank = np.full(len(pool) + 1, -1, dtype=np.int64)
+            rank[np.asarray(order, dtype=np.int64)] = np.arange(len(pool))
+            self._rank, self._rank_size = rank, len(pool)
+        return self._rank
+
+    def _apply_sort(self):
+        column, descending = self._sort_column, self._sort_order == Qt.DescendingOrder
+        if column < 0 or column >= len(self.headers):
+            if self._rows is not None:
+                self._rows = self._natural.copy()
+            else:
+                self._items = list(self._natural)
+            return
+        field = self.headers[column]
+        if self._rows is not None:
+            codes = self.catalog.column(field)[self._rows] if field in FIELDS else np.full(len(self._rows), MISSING)
+            keys = self._string_rank()[codes]
+            self._rows = self._rows[np.argsort(-keys if descending else keys, kind="stable")]
+        else:
+            self._items.sort(key=lambda item: str(item[1].get(field, "")), reverse=descending)
+
+    # ===== QAbstractTableModel 接口 =====
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) if self._rows is not None else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return section + 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self._value(index.row(), self.headers[index.column()])
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        self._sort_column, self._sort_order = column, order
+        self._apply_sort()
+        self.endResetModel()
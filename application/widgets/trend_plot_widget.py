@@ -3,13 +3,16 @@ from datetime import datetime
 
 import numpy as np
 import pyqtgraph as pg
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QRectF
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QRectF, QThreadPool
 from PyQt5.QtGui import QColor, QFont, QCursor
 from PyQt5.QtWidgets import QGraphicsItem
 from loguru import logger
 from qfluentwidgets import CommandBarView, Action, FluentIcon, Flyout, FlyoutAnimationType
 
 from application.interfaces.service_test_dialog import JSONServiceTester
+from application.utils.compact_series import CompactSeries
+from application.utils.lod_pyramid import build_pyramids
+from application.utils.threading_utils import Worker
 from application.widgets.persistent_tooltip import PersistentToolTip
 
 # 启用 OpenGL 硬件加速与抗锯齿
@@ -37,9 +40,70 @@ class PixelAlignedLinearRegionItem(pg.LinearRegionItem):
         super().setRegion(region)
 
 
+class CurveHoverIndex:
+    """
+    十字光标取值索引。
+
+    创建时把各曲线的时间轴按固定步长错开后拼接为一个连续的 float64 数组
+    （共用同一时间数组的曲线只存一份），一次 searchsorted 即可得到全部曲线上
+    离光标最近的采样点，悬停开销只与曲线条数有关，与序列长度无关。
+    """
+
+    def __init__(self, entries):
+        """entries: [(name, color, x, y), ...]，x 须单调不减"""
+        entries = [e for e in entries if e[2] is not None and len(e[2])]
+        self.names = [e[0] for e in entries]
+        self.colors = [e[1] for e in entries]
+        self.times = [e[2] for e in entries]
+        self.values = [e[3] for e in entries]
+
+        segments, segment_of = [], {}
+        self.segment = np.empty(len(entries), dtype=np.int64)
+        for i, x in enumerate(self.times):
+            if id(x) not in segment_of:
+                segment_of[id(x)] = len(segments)
+                segments.append(x)
+            self.segment[i] = segment_of[id(x)]
+
+        if segments:
+            lengths = np.fromiter((len(x) for x in segments), dtype=np.int64, count=len(segments))
+            self.starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+            self.ends = self.starts + lengths - 1
+            self.base = min(float(x[0]) for x in segments)
+            span = max(float(x[-1]) for x in segments) - self.base
+            # 步长大于时间跨度，保证错开后的各段互不重叠
+            stride = span * 2 + 1.0
+            self.offsets = np.arange(len(segments), dtype=np.float64) * stride
+            self.keys = np.concatenate([
+                np.asarray(x, dtype=np.float64) - self.base + off
+                for x, off in zip(segments, self.offsets)
+            ])
+
+    def __len__(self):
+        return len(self.names)
+
+    def nearest(self, ts: float, tolerance: float = None):
+        """返回每条曲线上离 ts 最近的采样下标，超出容差的为 -1"""
+        if not self.names:
+            return np.empty(0, dtype=np.int64)
+        query = (ts - self.base) + self.offsets
+        pos = np.searchsorted(self.keys, query)
+        right = np.clip(pos, self.starts, self.ends)
+        left = np.clip(pos - 1, self.starts, self.ends)
+        use_left = np.abs(self.keys[left] - query) <= np.abs(self.keys[right] - query)
+        best = np.where(use_left, left, right)
+        if tolerance is not None:
+            best = np.where(np.abs(self.keys[best] - query) <= tolerance, best, -1)
+        best = np.where(best >= 0, best - self.starts, -1)
+        return best[self.segment]
+
+
 class TrendPlotWidget(pg.PlotWidget):
     range_selected = pyqtSignal(datetime, datetime)
     selection_started = pyqtSignal()
+    # 总点数超过该值时在后台构建 LOD 金字塔，否则直接交给 pyqtgraph 自带降采样
+    LOD_MIN_POINTS = 20000
+    TOOLTIP_TOLERANCE = 1200  # 光标与采样点的最大时间差（秒）
 
     def __init__(self, legend: bool = True, **kwargs):
         super().__init__()
@@ -50,6 +114,9 @@ class TrendPlotWidget(pg.PlotWidget):
         self.tooltip_timer.timeout.connect(self._on_tooltip_timer)
         self._last_ts = None
         self._tooltip_active = False
+        self._hover_index = None  # CurveHoverIndex，曲线变化后置空，悬停时按需重建
+        self._tooltip_key = None  # 上次渲染的最近采样下标，未变化时不重建 HTML
+        self._tooltip_html = ""
         vb = self.plotItem.vb
         vb.setAutoPan(x=False, y=False)
 
@@ -108,6 +175,16 @@ class TrendPlotWidget(pg.PlotWidget):
         self._right_axis_spacing = 70  # 多个右轴之间的水平间距（像素）
         self._right_axis_width = 58  # 每个右轴的宽度（像素）
 
+        # curve -> 全量数据 (x, y)，均为连续数组：x 为 float64，y 为 float64 或 float32（紧凑存储）
+        self._curve_data = {}
+        # LOD：curve -> MinMaxPyramid，缩放/平移后按可见范围重新切片
+        self._lod = {}
+        self._lod_generation = 0  # 丢弃过期的后台构建结果
+        self._lod_timer = QTimer(self, singleShot=True, interval=30)
+        self._lod_timer.timeout.connect(self._apply_lod)
+        self.plotItem.vb.sigXRangeChanged.connect(self._schedule_lod)
+        self.plotItem.vb.sigResized.connect(self._schedule_lod)
+
         def update_views():
             # 让额外的 viewbox 与主 viewbox 对齐
             vb_rect = self.plotItem.vb.sceneBoundingRect()
@@ -176,6 +253,10 @@ class TrendPlotWidget(pg.PlotWidget):
         # 保存以便后续切换模式时重绘
         self._last_data = data
         self._last_mode = mode
+        self._reset_lod()
+        self._curve_data.clear()
+        self._invalidate_hover()
+        arrays = {}
         # 先清除旧曲线（主 plotItem / 额外 viewboxes 中都清理）
         for c in self.curves:
             try:
@@ -212,7 +293,7 @@ class TrendPlotWidget(pg.PlotWidget):
         if not self.independent_y and (self.extra_vbs or self.right_axes):
             self.set_independent_y(False)  # 清理所有额外控件
 
-        all_y = []
+        y_ranges = []
         x = None
 
         if not self.independent_y:
@@ -220,7 +301,8 @@ class TrendPlotWidget(pg.PlotWidget):
             for i, (tag, points) in enumerate(data.items()):
                 if not points:
                     continue
-                x, y = points
+                x, y = self._as_arrays(points)
+                arrays[tag] = (x, y)
                 hue = i / max(1, len(data))
                 qcolor = QColor.fromHsvF(hue, 0.7, 0.9)
                 color_str = qcolor.name()
@@ -230,7 +312,7 @@ class TrendPlotWidget(pg.PlotWidget):
                         pen=pg.mkPen(color_str, width=2),
                         name=tag,
                         **{
-                            "fillLevel": min(y),
+                            "fillLevel": np.nanmin(y),
                             "fillBrush": pg.mkBrush(QColor(color_str).lighter(180))
                         }
                     )
@@ -253,15 +335,19 @@ class TrendPlotWidget(pg.PlotWidget):
                 curve.setZValue(0)
                 self.plotItem.addItem(curve)
                 self.curves.append(curve)
-                all_y.append(np.array(y))
+                self._curve_data[curve] = (x, y)
+                y_range = self._finite_range(y)
+                if y_range is not None:
+                    y_ranges.append(y_range)
 
             # X 范围与 Y 范围
             if x is not None:
                 self.plotItem.setXRange(x[0] - 2500, x[-1] + 1000, padding=0)
 
-            if all_y:
-                arr = np.hstack(all_y)
-                mn, mx = arr.min(), arr.max()
+            if y_ranges:
+                # 逐曲线取极值，避免拼接全部数据
+                mn = min(r[0] for r in y_ranges)
+                mx = max(r[1] for r in y_ranges)
                 pad = (mx - mn) * 0.1 if mx != mn else 1.0
                 self.plotItem.vb.setYRange(mn - pad, mx + pad, padding=0)
         else:
@@ -288,7 +374,8 @@ class TrendPlotWidget(pg.PlotWidget):
             for i, (tag, points) in enumerate(data.items()):
                 if not points:
                     continue
-                x, y = points
+                x, y = self._as_arrays(points)
+                arrays[tag] = (x, y)
                 hue = i / max(1, num_curves)
                 qcolor = QColor.fromHsvF(hue, 0.7, 0.9)
                 color_str = qcolor.name()
@@ -326,7 +413,7 @@ class TrendPlotWidget(pg.PlotWidget):
                 if mode == "fill":
                     curve = pg.PlotDataItem(
                         x=x, y=y, pen=pg.mkPen(color_str, width=2), name=tag,
-                        fillLevel=min(y),
+                        fillLevel=np.nanmin(y),
                         fillBrush=pg.mkBrush(QColor(color_str).lighter(180))
                     )
                 elif mode == "line":
@@ -356,9 +443,10 @@ class TrendPlotWidget(pg.PlotWidget):
 
                 vb_extra.addItem(curve)
                 self.curves.append(curve)
+                self._curve_data[curve] = (x, y)
 
                 # 设置 y 范围
-                mn, mx = np.min(y), np.max(y)
+                mn, mx = self._finite_range(y) or (0.0, 0.0)
                 pad = (mx - mn) * 0.1 if mx != mn else 1.0
                 vb_extra.setYRange(mn - pad, mx + pad, padding=0)
 
@@ -372,6 +460,152 @@ class TrendPlotWidget(pg.PlotWidget):
         self.region.setZValue(1000)
         self.crosshair.setZValue(1001)
 
+        if mode != "scatter":
+            self._build_lod(arrays)
+
+    @staticmethod
+    def _as_arrays(points):
+        # 紧凑存储直接取绘图点（游程编码时只有游程首末点），float32 数值不再展开为 float64
+        x, y = points.plot_xy() if isinstance(points, CompactSeries) else points
+        y_dtype = np.float32 if getattr(y, "dtype", None) == np.float32 else np.float64
+        return (np.ascontiguousarray(x, dtype=np.float64),
+                np.ascontiguousarray(y, dtype=y_dtype))
+
+    @staticmethod
+    def _finite_range(y):
+        y = np.asarray(y)
+        finite = y[np.isfinite(y)]
+        if finite.size == 0:
+            return None
+        return float(finite.min()), float(finite.max())
+
+    # ===== 实时模式 =====
+    def update_curves(self, data: dict, follow: bool = True):
+        """
+        原地更新已有曲线的数据，不重建曲线、图例与坐标轴。
+
+        data 为 {tag: (x, y)}，可以是环形缓冲区的视图。follow 为 True 且视图右边界
+        已到达原数据末端时，x 范围随新数据向右平移；y 范围只在新数据越界时扩展。
+        """
+        if not self.curves:
+            return
+        vb = self.plotItem.vb
+        x0, x1 = vb.viewRange()[0]
+        old_end = max(
+            (float(x[-1]) for x, _ in self._curve_data.values() if x is not None and len(x)),
+            default=None
+        )
+        by_name = {curve.name(): curve for curve in self.curves}
+        new_end, shared_range = None, None
+        for tag, points in data.items():
+            curve = by_name.get(tag)
+            if curve is None or not points or points[0] is None:
+                continue
+            x, y = self._as_arrays(points)
+            if self._lod.pop(curve, None) is not None:
+                # 实时窗口数据量小，交还给 pyqtgraph 自带降采样
+                curve.setDownsampling(auto=True, method='peak')
+                curve.setClipToView(True)
+            curve.setData(x=x, y=y)
+            self._curve_data[curve] = (x, y)
+            if len(x):
+                new_end = float(x[-1]) if new_end is None else max(new_end, float(x[-1]))
+            y_range = self._finite_range(y)
+            if y_range is None:
+                continue
+            if self.independent_y and curve.getViewBox() is not None:
+                self._expand_y_range(curve.getViewBox(), *y_range)
+            elif shared_range is None:
+                shared_range = y_range
+            else:
+                shared_range = (min(shared_range[0], y_range[0]), max(shared_range[1], y_range[1]))
+        if shared_range is not None:
+            self._expand_y_range(vb, *shared_range)
+        self._invalidate_hover()
+        if follow and old_end is not None and new_end is not None and new_end > old_end and x1 >= old_end:
+            shift = new_end - old_end
+            vb.setXRange(x0 + shift, x1 + shift, padding=0)
+
+    @staticmethod
+    def _expand_y_range(vb, mn, mx):
+        lo, hi = vb.viewRange()[1]
+        if mn >= lo and mx <= hi:
+            return
+        pad = (mx - mn) * 0.1 if mx != mn else 1.0
+        vb.setYRange(min(lo, mn - pad), max(hi, mx + pad), padding=0)
+
+    # ===== LOD 金字塔 =====
+    def _reset_lod(self):
+        self._lod_generation += 1
+        self._lod.clear()
+        self._lod_timer.stop()
+
+    def _build_lod(self, data):
+        """数据量较大时在后台线程构建金字塔，构建完成前沿用 pyqtgraph 自带降采样"""
+        total = sum(len(points[0]) for points in data.values() if points and points[0] is not None)
+        if total < self.LOD_MIN_POINTS:
+            return
+        generation = self._lod_generation
+        worker = Worker(build_pyramids, dict(data))
+        worker.signals.finished.connect(lambda result, g=generation: self._on_lod_ready(g, result))
+        worker.signals.error.connect(lambda e: logger.error(f"LOD 金字塔构建失败: {e}"))
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_lod_ready(self, generation, pyramids):
+        if generation != self._lod_generation or not pyramids:
+            return
+        for curve in self.curves:
+            if not isinstance(curve, pg.PlotDataItem):
+                continue
+            pyramid = pyramids.get(curve.name())
+            if pyramid is None or not pyramid.levels:
+                continue
+            # 由金字塔负责降采样与裁剪，关闭 pyqtgraph 的逐帧降采样
+            curve.setDownsampling(auto=False, ds=1)
+            curve.setClipToView(False)
+            self._lod[curve] = pyramid
+        self._apply_lod()
+
+    def _schedule_lod(self, *args):
+        if self._lod:
+            self._lod_timer.start()
+
+    def _apply_lod(self):
+        """按当前可见 x 范围与视图像素宽度，为每条曲线选取金字塔层级并更新数据"""
+        if not self._lod:
+            return
+        vb = self.plotItem.vb
+        x0, x1 = vb.viewRange()[0]
+        pixels = max(int(vb.width()), 100)
+        for curve, pyramid in self._lod.items():
+            xs, ys = pyramid.select(x0, x1, pixels)
+            curve.setData(x=xs, y=ys)
+
+    def _curve_arrays(self, curve):
+        """曲线的全量数据；显示数据可能是降采样切片，取值需用原始数组"""
+        data = self._curve_data.get(curve)
+        if data is not None:
+            return data
+        return curve.getData()
+
+    # ===== 十字光标取值 =====
+    def _invalidate_hover(self):
+        self._hover_index = None
+        self._tooltip_key = None
+
+    def _get_hover_index(self):
+        if self._hover_index is None:
+            entries = []
+            for curve in self.curves:
+                x, y = self._curve_arrays(curve)
+                try:
+                    color = curve.opts["pen"].color().name()
+                except Exception:
+                    color = "#444444"
+                entries.append((curve.name(), color, x, y))
+            self._hover_index = CurveHoverIndex(entries)
+        return self._hover_index
+
     def _on_mouse_move(self, pos):
         mp = self.plotItem.vb.mapSceneToView(pos)
         if not self.viewRect().contains(mp):
@@ -405,44 +639,49 @@ class TrendPlotWidget(pg.PlotWidget):
             if ts is None:
                 return
 
-            tstr = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+            index = self._get_hover_index()
+            nearest = index.nearest(ts, self.TOOLTIP_TOLERANCE)
+            hits = np.flatnonzero(nearest >= 0)
+            # 最近采样点不变时只移动提示框，不重建 HTML
+            key = tuple(nearest) if len(hits) else int(ts)
+            if key == self._tooltip_key:
+                self.tooltip_widget.follow_cursor()
+                return
+            self._tooltip_key = key
+
+            # 有命中时显示采样点时间，否则显示光标时间
+            header_ts = index.times[hits[0]][nearest[hits[0]]] if len(hits) else ts
+            tstr = datetime.fromtimestamp(header_ts).strftime('%Y-%m-%d %H:%M:%S')
             lines = [
                 f"<div style='font-size:13px; font-weight:bold; margin-bottom:8px;'>🕒 {tstr}</div>",
                 "<div style='height:6px;'></div>",  # 垂直间距
                 "<table style='border-collapse:collapse; font-size:12px;'>",
             ]
 
-            for curve in self.curves:
-                x, y = curve.getData()
-                if x is None or len(x) == 0:
-                    continue
-                idx = np.searchsorted(x, ts)
-                idx = min(max(idx, 0), len(x) - 1)
-                if abs(x[idx - 1] - ts) < abs(x[idx] - ts):
-                    idx -= 1
-                if abs(x[idx] - ts) <= 1200:
-                    color = curve.opts["pen"].color().name()
-                    value_str = f"{y[idx]:.2f}"
-                    # 可在此加单位，如 "°C"
-                    lines.append(
-                        f"""
-                        <tr style="line-height: 1.2;">
-                            <td style="padding-right:6px;">
-                                <span style="color:{color}; font-size:14px;">&#9679;</span>
-                            </td>
-                            <td style="padding-right:6px; color:#444;">{curve.name()}</td>
-                            <td style="font-weight:bold; color:#222;">{value_str}</td>
-                        </tr>
-                        """
-                    )
+            for i in hits:
+                value_str = f"{index.values[i][nearest[i]]:.2f}"
+                # 可在此加单位，如 "°C"
+                lines.append(
+                    f"""
+                    <tr style="line-height: 1.2;">
+                        <td style="padding-right:6px;">
+                            <span style="color:{index.colors[i]}; font-size:14px;">&#9679;</span>
+                        </td>
+                        <td style="padding-right:6px; color:#444;">{index.names[i]}</td>
+                        <td style="font-weight:bold; color:#222;">{value_str}</td>
+                    </tr>
+                    """
+                )
 
             lines.append("</table>")
-            self.tooltip_widget.show_tooltip("".join(lines))
+            self._tooltip_html = "".join(lines)
+            self.tooltip_widget.show_tooltip(self._tooltip_html)
         except Exception as e:
             logger.error(f"工具提示更新错误: {e}")
 
     def _stop_tooltip(self):
         self._tooltip_active = False
+        self._tooltip_key = None
         self.tooltip_timer.stop()
         self.tooltip_widget.hide()
 
@@ -518,6 +757,9 @@ class TrendPlotWidget(pg.PlotWidget):
         super().leaveEvent(ev)
 
     def clear_all(self):
+        self._reset_lod()
+        self._curve_data.clear()
+        self._invalidate_hover()
         for c in self.curves:
             self.plotItem.removeItem(c)
         self.curves.clear()
@@ -533,13 +775,12 @@ class TrendPlotWidget(pg.PlotWidget):
         mp = vb.mapSceneToView(self.mapToScene(pos))
         ts = mp.x()
 
-        res = {}
-        for curve in self.curves:
-            x, y = curve.getData()
-            if len(x) == 0:
-                continue
-            idx = int(np.abs(np.array(x) - ts).argmin())
-            res[curve.name()] = float(y[idx])
+        index = self._get_hover_index()
+        nearest = index.nearest(ts)
+        res = {
+            name: float(values[idx])
+            for name, values, idx in zip(index.names, index.values, nearest)
+        }
 
         if res:
             json_str = json.dumps({"data": res}, ensure_ascii=False)
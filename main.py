@@ -1,5 +1,9 @@
+import multiprocessing
+
 from application import run_app
 
 
 if __name__ == "__main__":
-    run_app()
\ No newline at end of file
+    # 打包为单文件后，算法进程池的子进程需要由此进入
+    multiprocessing.freeze_support()
+    run_app()
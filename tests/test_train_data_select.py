@@ -0,0 +1,69 @@
+"""
+@author: mading
+@license: (C) Copyright: LUCULENT Corporation Limited.
+@contact: mading@luculent.net
+@file: test_train_data_select.py
+@time: 2026/10/19 08:00
+@desc: TrainDataSelect 向量化滑窗熵与原逐窗口实现的一致性测试
+"""
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from application.tools.algorithm.train_data_select import TrainDataSelect
+
+
+def reference_dynamic_window(tool: TrainDataSelect, ys_mat: np.ndarray, win: int) -> np.ndarray:
+    """原逐窗口、逐列调用 _entropy 的实现（NaN 样本先剔除，原实现遇到 NaN 会抛出异常）"""
+    ys_norm = MinMaxScaler().fit_transform(ys_mat)
+    ent = np.zeros(len(ys_mat))
+    weights = np.exp(-tool.win_weight * np.linspace(0, 1, win))
+    for i in range(1, len(ys_mat)):
+        seg = ys_norm[max(0, i - win):i]
+        if len(seg) < 2:
+            continue
+        weighted_seg = seg * weights[:len(seg), None]
+        with np.errstate(invalid="ignore"):  # 整列为 NaN 时直方图为空
+            ent[i] = sum(
+                tool._entropy(col[~np.isnan(col)]) if np.isnan(col).any() else tool._entropy(col)
+                for col in weighted_seg.T
+            )
+    return ent
+
+
+@pytest.fixture
+def tool():
+    return TrainDataSelect()
+
+
+@pytest.mark.parametrize("n, k, win", [(400, 3, 50), (120, 2, 7), (60, 1, 2)])
+def test_random_data(tool, n, k, win):
+    ys = np.random.default_rng(n).normal(size=(n, k)).cumsum(axis=0)
+    np.testing.assert_allclose(tool._dynamic_window(ys, win), reference_dynamic_window(tool, ys, win), atol=1e-12)
+
+
+def test_tied_values(tool):
+    # 大量重复值落在区间边界上，检验浮点边界修正
+    ys = np.random.default_rng(1).integers(0, 5, size=(300, 3)).astype(float)
+    np.testing.assert_allclose(tool._dynamic_window(ys, 40), reference_dynamic_window(tool, ys, 40), atol=1e-12)
+
+
+def test_constant_columns(tool):
+    rng = np.random.default_rng(2)
+    ys = np.column_stack([np.full(200, 3.0), rng.normal(size=200), np.r_[np.zeros(100), np.ones(100)]])
+    np.testing.assert_allclose(tool._dynamic_window(ys, 30), reference_dynamic_window(tool, ys, 30), atol=1e-12)
+
+
+def test_nan_samples(tool):
+    rng = np.random.default_rng(3)
+    ys = rng.normal(size=(250, 3))
+    ys[rng.random(ys.shape) < 0.1] = np.nan
+    ys[100:140, 1] = np.nan  # 整个窗口都是 NaN 的列
+    np.testing.assert_allclose(tool._dynamic_window(ys, 25), reference_dynamic_window(tool, ys, 25), atol=1e-12)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10, 30])
+def test_short_series(tool, n):
+    # 样本数不足一个窗口（n < win）时只有早期窗口
+    ys = np.random.default_rng(n).normal(size=(n, 2))
+    np.testing.assert_allclose(tool._dynamic_window(ys, 30), reference_dynamic_window(tool, ys, 30), atol=1e-12)